@@ -14,51 +14,103 @@ const AdminDashboard = () => {
   })
   const [users, setUsers] = useState([])
   const [providers, setProviders] = useState([])
+  // page, page_size and total of the page shown in each list
+  const [usersPage, setUsersPage] = useState({ page: 1, page_size: 50, total: 0 })
+  const [providersPage, setProvidersPage] = useState({ page: 1, page_size: 50, total: 0 })
   const [loading, setLoading] = useState(true)
+  const [selectedUsers, setSelectedUsers] = useState(new Set())
+  const [selectedProviders, setSelectedProviders] = useState(new Set())
 
   useEffect(() => {
     fetchDashboardData()
+
+    // New bookings are pushed by the server instead of reloading the stats
+    const events = new EventSource('http://localhost:5000/api/admin/stream', { withCredentials: true })
+    events.addEventListener('booking_created', () => {
+      setStats(stats => ({ ...stats, totalBookings: stats.totalBookings + 1 }))
+    })
+    return () => events.close()
   }, [])
 
+  const parseProvider = (provider) => ({
+    ...provider,
+    skills: typeof provider.skills === 'string' ? JSON.parse(provider.skills) : provider.skills
+  })
+
   const fetchDashboardData = async () => {
     try {
-      // Fetch stats
-      const statsResponse = await fetch('http://localhost:5000/api/admin/stats', {
+      // Stats plus the first page of users and providers in one request
+      const response = await fetch('http://localhost:5000/api/admin/dashboard', {
         credentials: 'include'
       })
-      if (statsResponse.ok) {
-        const statsData = await statsResponse.json()
-        setStats(statsData)
+      if (response.ok) {
+        const data = await response.json()
+        setStats(data.stats)
+        setUsers(data.users.items)
+        setUsersPage(pageInfo(data.users))
+        setProviders(data.providers.items.map(parseProvider))
+        setProvidersPage(pageInfo(data.providers))
       }
+    } catch (error) {
+      console.error('Failed to fetch dashboard data:', error)
+    } finally {
+      setLoading(false)
+    }
+  }
+
+  const pageInfo = ({ page, page_size, total }) => ({ page, page_size, total })
 
-      // Fetch users
-      const usersResponse = await fetch('http://localhost:5000/api/admin/users', {
+  const fetchUsersPage = async (page) => {
+    try {
+      const response = await fetch(`http://localhost:5000/api/admin/users?page=${page}&page_size=${usersPage.page_size}`, {
         credentials: 'include'
       })
-      if (usersResponse.ok) {
-        const usersData = await usersResponse.json()
-        setUsers(Array.isArray(usersData) ? usersData : [])
+      if (response.ok) {
+        const data = await response.json()
+        setUsers(data.items)
+        setUsersPage(pageInfo(data))
+        setSelectedUsers(new Set())
       }
+    } catch (error) {
+      console.error('Failed to fetch users:', error)
+    }
+  }
 
-      // Fetch providers
-      const providersResponse = await fetch('http://localhost:5000/api/services/providers', {
+  const fetchProvidersPage = async (page) => {
+    try {
+      const response = await fetch(`http://localhost:5000/api/admin/providers?page=${page}&page_size=${providersPage.page_size}`, {
         credentials: 'include'
       })
-      if (providersResponse.ok) {
-        const providersData = await providersResponse.json()
-        const processedProviders = (Array.isArray(providersData) ? providersData : []).map(provider => ({
-          ...provider,
-          skills: typeof provider.skills === 'string' ? JSON.parse(provider.skills) : provider.skills
-        }))
-        setProviders(processedProviders)
+      if (response.ok) {
+        const data = await response.json()
+        setProviders(data.items.map(parseProvider))
+        setProvidersPage(pageInfo(data))
+        setSelectedProviders(new Set())
       }
     } catch (error) {
-      console.error('Failed to fetch dashboard data:', error)
-    } finally {
-      setLoading(false)
+      console.error('Failed to fetch providers:', error)
     }
   }
 
+  const PageControls = ({ info, onPage }) => {
+    const pages = Math.max(1, Math.ceil(info.total / info.page_size))
+    return (
+      <div className="flex items-center justify-between pt-4">
+        <span className="text-sm text-gray-600">
+          Page {info.page} of {pages} • {info.total} total
+        </span>
+        <div className="flex items-center space-x-2">
+          <Button variant="outline" size="sm" disabled={info.page <= 1} onClick={() => onPage(info.page - 1)}>
+            Previous
+          </Button>
+          <Button variant="outline" size="sm" disabled={info.page >= pages} onClick={() => onPage(info.page + 1)}>
+            Next
+          </Button>
+        </div>
+      </div>
+    )
+  }
+
   const toggleUserStatus = async (userId, currentStatus) => {
     try {
       const response = await fetch(`http://localhost:5000/api/admin/users/${userId}/toggle-status`, {
@@ -66,7 +118,10 @@ const AdminDashboard = () => {
         credentials: 'include'
       })
       if (response.ok) {
-        fetchDashboardData() // Refresh data
+        // Patch the changed row and counters instead of reloading everything
+        const data = await response.json()
+        setUsers(users => users.map(u => (u.id === data.user.id ? data.user : u)))
+        setStats(data.stats)
       }
     } catch (error) {
       console.error('Failed to toggle user status:', error)
@@ -80,13 +135,63 @@ const AdminDashboard = () => {
         credentials: 'include'
       })
       if (response.ok) {
-        fetchDashboardData() // Refresh data
+        const data = await response.json()
+        setProviders(providers => providers.map(p => (p.id === data.provider.id ? parseProvider(data.provider) : p)))
+        setStats(data.stats)
       }
     } catch (error) {
       console.error('Failed to toggle provider verification:', error)
     }
   }
 
+  const toggleSelected = (setSelected, id) => {
+    setSelected(selected => {
+      const next = new Set(selected)
+      next.has(id) ? next.delete(id) : next.add(id)
+      return next
+    })
+  }
+
+  const bulkUserStatus = async (isActive) => {
+    try {
+      const response = await fetch('http://localhost:5000/api/admin/users/bulk-status', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        credentials: 'include',
+        body: JSON.stringify({ ids: [...selectedUsers], is_active: isActive })
+      })
+      if (response.ok) {
+        const data = await response.json()
+        const changed = new Set(data.ids)
+        setUsers(users => users.map(u => (changed.has(u.id) ? { ...u, is_active: isActive } : u)))
+        setStats(data.stats)
+        setSelectedUsers(new Set())
+      }
+    } catch (error) {
+      console.error('Failed to update users:', error)
+    }
+  }
+
+  const bulkProviderVerification = async (isVerified) => {
+    try {
+      const response = await fetch('http://localhost:5000/api/admin/providers/bulk-verification', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        credentials: 'include',
+        body: JSON.stringify({ ids: [...selectedProviders], is_verified: isVerified })
+      })
+      if (response.ok) {
+        const data = await response.json()
+        const changed = new Set(data.ids)
+        setProviders(providers => providers.map(p => (changed.has(p.id) ? { ...p, is_verified: isVerified } : p)))
+        setStats(data.stats)
+        setSelectedProviders(new Set())
+      }
+    } catch (error) {
+      console.error('Failed to update providers:', error)
+    }
+  }
+
   if (loading) {
     return (
       <div className="flex justify-center items-center min-h-64">
@@ -152,12 +257,25 @@ const AdminDashboard = () => {
           <Card>
             <CardHeader>
               <CardTitle>User Management</CardTitle>
+              {selectedUsers.size > 0 && (
+                <div className="flex items-center space-x-2 pt-2">
+                  <span className="text-sm text-gray-600">{selectedUsers.size} selected</span>
+                  <Button variant="outline" size="sm" onClick={() => bulkUserStatus(false)}>Deactivate selected</Button>
+                  <Button variant="outline" size="sm" onClick={() => bulkUserStatus(true)}>Activate selected</Button>
+                </div>
+              )}
             </CardHeader>
             <CardContent>
               <div className="space-y-4">
                 {users.map((user) => (
                   <div key={user.id} className="flex items-center justify-between p-4 border rounded-lg">
-                    <div>
+                    <input
+                      type="checkbox"
+                      className="mr-4"
+                      checked={selectedUsers.has(user.id)}
+                      onChange={() => toggleSelected(setSelectedUsers, user.id)}
+                    />
+                    <div className="flex-1">
                       <h3 className="font-medium">{user.full_name}</h3>
                       <p className="text-sm text-gray-600">{user.email}</p>
                       <p className="text-sm text-gray-500">
@@ -181,6 +299,7 @@ const AdminDashboard = () => {
                   </div>
                 ))}
               </div>
+              <PageControls info={usersPage} onPage={fetchUsersPage} />
             </CardContent>
           </Card>
         </TabsContent>
@@ -189,12 +308,25 @@ const AdminDashboard = () => {
           <Card>
             <CardHeader>
               <CardTitle>Service Provider Management</CardTitle>
+              {selectedProviders.size > 0 && (
+                <div className="flex items-center space-x-2 pt-2">
+                  <span className="text-sm text-gray-600">{selectedProviders.size} selected</span>
+                  <Button variant="outline" size="sm" onClick={() => bulkProviderVerification(true)}>Verify selected</Button>
+                  <Button variant="outline" size="sm" onClick={() => bulkProviderVerification(false)}>Unverify selected</Button>
+                </div>
+              )}
             </CardHeader>
             <CardContent>
               <div className="space-y-4">
                 {providers.map((provider) => (
                   <div key={provider.id} className="flex items-center justify-between p-4 border rounded-lg">
-                    <div>
+                    <input
+                      type="checkbox"
+                      className="mr-4"
+                      checked={selectedProviders.has(provider.id)}
+                      onChange={() => toggleSelected(setSelectedProviders, provider.id)}
+                    />
+                    <div className="flex-1">
                       <h3 className="font-medium">{provider.user.full_name}</h3>
                       <p className="text-sm text-gray-600">{provider.user.email}</p>
                       <p className="text-sm text-gray-500">
@@ -225,6 +357,7 @@ const AdminDashboard = () => {
                   </div>
                 ))}
               </div>
+              <PageControls info={providersPage} onPage={fetchProvidersPage} />
             </CardContent>
           </Card>
         </TabsContent>
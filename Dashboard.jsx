@@ -1,9 +1,48 @@
-import React from 'react'
+import React, { useState, useEffect } from 'react'
 import { useAuth } from '../contexts/AuthContext'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 
+const STATUS_STYLES = {
+  pending: 'bg-yellow-100 text-yellow-800',
+  confirmed: 'bg-blue-100 text-blue-800',
+  in_progress: 'bg-purple-100 text-purple-800',
+  completed: 'bg-green-100 text-green-800',
+  cancelled: 'bg-red-100 text-red-800'
+}
+
 const Dashboard = () => {
   const { user, isCustomer, isServiceProvider } = useAuth()
+  const [bookings, setBookings] = useState([])
+  const [loading, setLoading] = useState(true)
+
+  useEffect(() => {
+    fetchBookings()
+
+    // Booking changes are pushed by the server; the list is loaded once and patched from the stream
+    const events = new EventSource('http://localhost:5000/api/bookings/stream', { withCredentials: true })
+    const upsertBooking = (event) => {
+      const booking = JSON.parse(event.data)
+      setBookings(bookings => [booking, ...bookings.filter(b => b.id !== booking.id)])
+    }
+    events.addEventListener('booking_created', upsertBooking)
+    events.addEventListener('booking_status_changed', upsertBooking)
+    return () => events.close()
+  }, [])
+
+  const fetchBookings = async () => {
+    try {
+      const response = await fetch('http://localhost:5000/api/bookings/', {
+        credentials: 'include'
+      })
+      if (response.ok) {
+        setBookings(await response.json())
+      }
+    } catch (error) {
+      console.error('Failed to fetch bookings:', error)
+    } finally {
+      setLoading(false)
+    }
+  }
 
   return (
     <div className="space-y-6">
@@ -15,18 +54,41 @@ const Dashboard = () => {
           {isCustomer ? 'Manage your bookings and find services' : 'Manage your services and bookings'}
         </p>
       </div>
-      
+
       <Card>
         <CardHeader>
           <CardTitle>
-            {isCustomer ? 'Customer Dashboard' : 'Service Provider Dashboard'}
+            {isCustomer ? 'Your Bookings' : 'Incoming Bookings'}
           </CardTitle>
         </CardHeader>
         <CardContent>
-          <p>
-            This dashboard will show {isCustomer ? 'your bookings, favorite providers, and booking history' : 'your profile, incoming bookings, earnings, and reviews'}.
-          </p>
-          <p className="mt-2 text-sm text-gray-600">Coming soon in the next development phase...</p>
+          {loading ? (
+            <p className="text-gray-600">Loading bookings...</p>
+          ) : bookings.length === 0 ? (
+            <p className="text-gray-600">No bookings yet.</p>
+          ) : (
+            <div className="space-y-4">
+              {bookings.map((booking) => {
+                const other = isServiceProvider ? booking.customer : booking.provider
+                return (
+                  <div key={booking.id} className="flex items-center justify-between p-4 border rounded-lg">
+                    <div className="flex-1">
+                      <h3 className="font-medium">{booking.title}</h3>
+                      <p className="text-sm text-gray-600">
+                        {booking.service_category?.name} • {other?.full_name}
+                      </p>
+                      <p className="text-sm text-gray-500">
+                        {booking.scheduled_date && new Date(booking.scheduled_date).toLocaleString()} • NPR {booking.total_amount}
+                      </p>
+                    </div>
+                    <span className={`px-2 py-1 rounded-full text-xs ${STATUS_STYLES[booking.status] || 'bg-gray-100 text-gray-800'}`}>
+                      {booking.status.replace('_', ' ')}
+                    </span>
+                  </div>
+                )
+              })}
+            </div>
+          )}
         </CardContent>
       </Card>
     </div>
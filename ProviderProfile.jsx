@@ -1,16 +1,155 @@
-import React from 'react'
+import React, { useState, useEffect } from 'react'
+import { useParams, Link } from 'react-router-dom'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
+import { Button } from '@/components/ui/button'
+
+const API = 'http://localhost:5000/api'
+const RECENT_REVIEWS = 5
 
 const ProviderProfile = () => {
+  const { id } = useParams()
+  const [provider, setProvider] = useState(null)
+  const [summary, setSummary] = useState(null)
+  const [reviews, setReviews] = useState([])
+  const [loading, setLoading] = useState(true)
+
+  useEffect(() => {
+    fetchProfile()
+  }, [id])
+
+  const fetchProfile = async () => {
+    setLoading(true)
+    try {
+      const response = await fetch(`${API}/services/providers/${id}`, { credentials: 'include' })
+      if (!response.ok) {
+        setProvider(null)
+        return
+      }
+      const data = await response.json()
+      setProvider(data)
+
+      // The summary row stands in for the full review history; only the newest few reviews are listed
+      const [summaryResponse, reviewsResponse] = await Promise.all([
+        fetch(`${API}/reviews/provider/${data.user_id}/summary`, { credentials: 'include' }),
+        fetch(`${API}/services/providers/${id}/reviews?limit=${RECENT_REVIEWS}`, { credentials: 'include' })
+      ])
+      if (summaryResponse.ok) {
+        setSummary(await summaryResponse.json())
+      }
+      if (reviewsResponse.ok) {
+        setReviews(await reviewsResponse.json())
+      }
+    } catch (error) {
+      console.error('Failed to fetch provider profile:', error)
+    } finally {
+      setLoading(false)
+    }
+  }
+
+  const renderStars = (rating) => '★'.repeat(Math.round(rating || 0)) + '☆'.repeat(5 - Math.round(rating || 0))
+
+  if (loading) {
+    return <div className="text-center py-12 text-gray-600">Loading provider...</div>
+  }
+
+  if (!provider) {
+    return <div className="text-center py-12 text-gray-600">Provider not found.</div>
+  }
+
+  const highlights = summary?.highlights || {}
+
   return (
     <div className="space-y-6">
       <Card>
         <CardHeader>
-          <CardTitle>Provider Profile Page</CardTitle>
+          <div className="flex items-center justify-between">
+            <CardTitle>{provider.user?.full_name}</CardTitle>
+            {provider.is_verified && (
+              <span className="bg-green-100 text-green-800 text-xs px-2 py-1 rounded-full">
+                ✓ Verified
+              </span>
+            )}
+          </div>
+          <div className="flex items-center space-x-2">
+            <span className="text-yellow-500">{renderStars(provider.rating)}</span>
+            <span className="text-sm text-gray-600">
+              {provider.rating} ({provider.total_reviews} reviews)
+            </span>
+          </div>
         </CardHeader>
         <CardContent>
-          <p>This page will show detailed provider information, reviews, and booking options.</p>
-          <p className="mt-2 text-sm text-gray-600">Coming soon in the next development phase...</p>
+          <div className="space-y-3">
+            <div className="flex flex-wrap gap-1">
+              {(provider.skills || []).map((skill, index) => (
+                <span key={index} className="bg-blue-100 text-blue-800 text-xs px-2 py-1 rounded">
+                  {skill}
+                </span>
+              ))}
+            </div>
+            <p className="text-lg font-bold text-green-600">NPR {provider.hourly_rate}/hour</p>
+            <p className="text-sm text-gray-600">
+              {provider.experience_years} years experience • {provider.user?.location}
+            </p>
+            <p className="text-sm text-gray-600">{provider.description}</p>
+            <Link to={`/book/${provider.id}`}>
+              <Button className="w-full">Book Now</Button>
+            </Link>
+          </div>
+        </CardContent>
+      </Card>
+
+      {summary && summary.total_reviews > 0 && (
+        <Card>
+          <CardHeader>
+            <CardTitle>What customers say</CardTitle>
+          </CardHeader>
+          <CardContent>
+            <div className="space-y-4">
+              <div className="flex flex-wrap gap-1">
+                {summary.keywords.map(({ term, count }) => (
+                  <span key={term} className="bg-gray-100 text-gray-800 text-xs px-2 py-1 rounded">
+                    {term} ({count})
+                  </span>
+                ))}
+              </div>
+              {highlights.positive && (
+                <blockquote className="border-l-4 border-green-400 pl-3 text-sm text-gray-700">
+                  {renderStars(highlights.positive.rating)} “{highlights.positive.snippet}”
+                </blockquote>
+              )}
+              {highlights.negative && (
+                <blockquote className="border-l-4 border-red-400 pl-3 text-sm text-gray-700">
+                  {renderStars(highlights.negative.rating)} “{highlights.negative.snippet}”
+                </blockquote>
+              )}
+            </div>
+          </CardContent>
+        </Card>
+      )}
+
+      <Card>
+        <CardHeader>
+          <CardTitle>Recent Reviews</CardTitle>
+        </CardHeader>
+        <CardContent>
+          {reviews.length === 0 ? (
+            <p className="text-gray-600">No reviews yet.</p>
+          ) : (
+            <div className="space-y-4">
+              {reviews.map((review) => (
+                <div key={review.id} className="p-4 border rounded-lg">
+                  <div className="flex items-center justify-between">
+                    <span className="font-medium">{review.customer?.full_name}</span>
+                    <span className="text-yellow-500">{renderStars(review.rating)}</span>
+                  </div>
+                  {review.comment && <p className="text-sm text-gray-600 mt-1">{review.comment}</p>}
+                  <p className="text-xs text-gray-500 mt-1">
+                    {review.created_at && new Date(review.created_at).toLocaleDateString()}
+                  </p>
+                </div>
+              ))}
+            </div>
+          )}
         </CardContent>
       </Card>
     </div>
@@ -18,4 +157,3 @@ const ProviderProfile = () => {
 }
 
 export default ProviderProfile
-
@@ -7,6 +7,7 @@ import { Button } from '@/components/ui/button'
 const ServiceProviders = () => {
   const [providers, setProviders] = useState([])
   const [searchTerm, setSearchTerm] = useState('')
+  const [suggestions, setSuggestions] = useState([])
   const [loading, setLoading] = useState(true)
   const [searchParams] = useSearchParams()
   const categoryFilter = searchParams.get('category')
@@ -41,6 +42,28 @@ const ServiceProviders = () => {
     }
   }
 
+  useEffect(() => {
+    if (!searchTerm.trim()) {
+      setSuggestions([])
+      return
+    }
+    // Debounced so fast typing sends one request per pause, not per keystroke
+    const timer = setTimeout(async () => {
+      try {
+        const response = await fetch(
+          `http://localhost:5000/api/services/providers/suggest?q=${encodeURIComponent(searchTerm)}`,
+          { credentials: 'include' }
+        )
+        if (response.ok) {
+          setSuggestions(await response.json())
+        }
+      } catch (error) {
+        console.error('Failed to fetch suggestions:', error)
+      }
+    }, 150)
+    return () => clearTimeout(timer)
+  }, [searchTerm])
+
   const filteredProviders = providers.filter(provider =>
     provider.user.full_name.toLowerCase().includes(searchTerm.toLowerCase()) ||
     provider.skills.some(skill => skill.toLowerCase().includes(searchTerm.toLowerCase())) ||
@@ -85,6 +108,26 @@ const ServiceProviders = () => {
             onChange={(e) => setSearchTerm(e.target.value)}
             className="w-full"
           />
+          {suggestions.length > 0 && (
+            <ul className="mt-1 border rounded-md bg-white shadow-lg text-left">
+              {suggestions.map((suggestion) => (
+                <li key={suggestion.provider_id}>
+                  <Link
+                    to={`/provider/${suggestion.provider_id}`}
+                    className="flex justify-between px-3 py-2 hover:bg-gray-100"
+                  >
+                    <span>
+                      {suggestion.full_name}
+                      {suggestion.matched.type !== 'name' && (
+                        <span className="text-sm text-gray-500"> · {suggestion.matched.text}</span>
+                      )}
+                    </span>
+                    <span className="text-sm text-gray-600">⭐ {suggestion.rating}</span>
+                  </Link>
+                </li>
+              ))}
+            </ul>
+          )}
         </div>
       </div>
       
@@ -1,9 +1,44 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import event, func, or_, select
 from src.models.user import db, User, ServiceProvider, ServiceCategory, Booking
+from src.models.ranking import refresh_provider_ranks
+from src.models.typeahead import refresh_typeahead
+from src.models.pricing import refresh_price_estimates
+from src.models.projection import ADMIN_USER_PROJECTION, json_response
+from src.models.listing import ProviderListing, ADMIN_LISTING_PROJECTION, admin_listing_rows, refresh_user_listings
+from src.models.analytics import BUCKET_SECONDS, run_analytics_rollup, rollup_is_stale, get_platform_series
+from src.events import ADMIN_CHANNEL, event_stream
+from src.sharding import fan_out, select_shard, shard_for_id, shard_names
 from functools import wraps
+from datetime import datetime
+from itertools import chain
+import heapq
+import json
+
+# Analytics older than this are brought up to date before serving
+ANALYTICS_MAX_AGE_SECONDS = 60
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
 admin_bp = Blueprint('admin', __name__)
 
+def begin_snapshot(conn):
+    """Open SERIALIZABLE transactions on SQLite with BEGIN.
+
+    pysqlite only begins a transaction before a write, so without this the
+    reads of one transaction would each see the latest commit.
+    """
+    if conn.dialect.name == 'sqlite' and conn.get_execution_options().get('isolation_level') == 'SERIALIZABLE':
+        conn.exec_driver_sql('BEGIN')
+
+def init_admin_snapshots(app):
+    """Listen for SERIALIZABLE transactions on the app's global database engine only"""
+    with app.app_context():
+        if not event.contains(db.engine, 'begin', begin_snapshot):
+            event.listen(db.engine, 'begin', begin_snapshot)
+
+
 def admin_required(f):
     """Decorator to require admin access"""
     @wraps(f)
@@ -13,49 +48,185 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def platform_stats():
+    """Platform counters, read in one query for the global tables and one per shard"""
+    def count(model, *criteria):
+        return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+    
+    users, active_users, categories = db.session.query(
+        count(User),
+        count(User, User.is_active == True),
+        count(ServiceCategory)
+    ).one()
+    sharded = fan_out(lambda: db.session.query(
+        count(ServiceProvider),
+        count(ServiceProvider, ServiceProvider.is_verified == True),
+        count(Booking)
+    ).one())
+    providers, verified_providers, bookings = (sum(column) for column in zip(*sharded))
+    
+    return {
+        'totalUsers': users,
+        'activeUsers': active_users,
+        'totalProviders': providers,
+        'verifiedProviders': verified_providers,
+        'totalBookings': bookings,
+        'totalCategories': categories
+    }
+
+def bulk_criteria(data, id_column, filter_criteria):
+    """WHERE criteria for a bulk action given {"ids": [...]} or {"filter": {...}}; None if neither is usable"""
+    if 'ids' in data:
+        ids = data['ids']
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return None
+        # One JSON parameter however long the list; SQLite caps the number of bound parameters
+        return [id_column.in_(select(func.json_each(json.dumps(ids)).table_valued('value').c.value))]
+    spec = data.get('filter')
+    criteria = filter_criteria(spec) if isinstance(spec, dict) else []
+    # An empty filter would select every row; that has to be asked for explicitly with ids
+    return criteria or None
+
+def changes(column, value):
+    """Rows where setting column to value is a change; NULL never compares unequal in SQL"""
+    return or_(column.is_(None), column != value)
+
+def user_filter_criteria(spec):
+    criteria = []
+    if spec.get('location'):
+        criteria.append(User.location.contains(spec['location']))
+    if spec.get('user_type'):
+        criteria.append(User.user_type == spec['user_type'])
+    if 'is_active' in spec:
+        criteria.append(User.is_active == bool(spec['is_active']))
+    return criteria
+
+def provider_filter_criteria(spec):
+    criteria = []
+    if spec.get('location'):
+        criteria.append(ServiceProvider.user_id.in_(select(User.id).where(User.location.contains(spec['location']))))
+    if spec.get('skill'):
+        criteria.append(ServiceProvider.skills.contains(spec['skill']))
+    if 'is_verified' in spec:
+        criteria.append(ServiceProvider.is_verified == bool(spec['is_verified']))
+    return criteria
+
+def paginate(projection, rows, id_column, sharded=False):
+    """Apply ?page and ?page_size (by id) and return one page with its total.
+
+    For sharded rows each shard returns its first page * page_size rows and
+    the page is cut from their merge by id.
+    """
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = min(max(request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    if not sharded or len(shard_names()) == 1:
+        total = rows.order_by(None).count()
+        items = projection.serialize_all(rows.order_by(id_column).limit(page_size).offset((page - 1) * page_size))
+        return {'items': items, 'total': total, 'page': page, 'page_size': page_size}
+    
+    total = sum(fan_out(rows.order_by(None).count))
+    # The id goes last, after the projection's own columns, to drive the merge
+    heads = fan_out(lambda: rows.add_columns(id_column).order_by(id_column).limit(page * page_size).all())
+    merged = list(heapq.merge(*heads, key=lambda row: row[-1]))[(page - 1) * page_size:page * page_size]
+    return {'items': projection.serialize_all(merged), 'total': total, 'page': page, 'page_size': page_size}
+
 @admin_bp.route('/stats', methods=['GET'])
 @admin_required
 def get_admin_stats():
     """Get platform statistics"""
     try:
-        total_users = User.query.count()
-        total_providers = ServiceProvider.query.count()
-        total_bookings = Booking.query.count() if hasattr(Booking, 'query') else 0
-        total_categories = ServiceCategory.query.count()
+        return jsonify(platform_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/dashboard', methods=['GET'])
+@admin_required
+def get_admin_dashboard():
+    """Get stats and the first page of users and providers.
+
+    Reads of the global database (users, and everything when sharding is
+    off) share one snapshot. Counts and providers fanned out to region
+    shards are read from each shard separately, at the moment they run.
+    """
+    try:
+        # A SERIALIZABLE connection (see begin_snapshot) makes the global reads below see one snapshot
+        db.session.rollback()
+        db.session.connection(execution_options={'isolation_level': 'SERIALIZABLE'})
+        try:
+            dashboard = {
+                'stats': platform_stats(),
+                'users': paginate(ADMIN_USER_PROJECTION, ADMIN_USER_PROJECTION.query(), User.id),
+                'providers': paginate(ADMIN_LISTING_PROJECTION, admin_listing_rows(), ProviderListing.provider_id, sharded=True)
+            }
+        finally:
+            db.session.rollback()
         
-        stats = {
-            'totalUsers': total_users,
-            'totalProviders': total_providers,
-            'totalBookings': total_bookings,
-            'totalCategories': total_categories
-        }
+        return json_response(dashboard)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/stream', methods=['GET'])
+@admin_required
+def stream_admin_events():
+    """Server-Sent Events stream of every booking created or changed, for the live dashboard"""
+    return event_stream(ADMIN_CHANNEL)
+
+@admin_bp.route('/analytics', methods=['GET'])
+@admin_required
+def get_admin_analytics():
+    """Get daily or hourly bookings, booking value, signups and cancellation rates"""
+    try:
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in BUCKET_SECONDS:
+            return jsonify({'error': 'Granularity must be day or hour'}), 400
         
-        return jsonify(stats)
+        start = request.args.get('start')
+        end = request.args.get('end')
+        category_id = request.args.get('category_id', type=int)
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+        
+        if rollup_is_stale(ANALYTICS_MAX_AGE_SECONDS):
+            run_analytics_rollup()
+        
+        return jsonify({
+            'granularity': granularity,
+            'series': get_platform_series(granularity, start, end, category_id)
+        })
+    except ValueError:
+        return jsonify({'error': 'Dates must be in ISO format'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/analytics/refresh', methods=['POST'])
+@admin_required
+def refresh_admin_analytics():
+    """Fold new and changed rows into the analytics tables now"""
+    try:
+        applied = run_analytics_rollup()
+        return jsonify({'message': 'Analytics updated' if applied else 'Analytics already being updated'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/payload-metrics', methods=['GET'])
+@admin_required
+def get_payload_metrics():
+    """Get response bytes per endpoint before and after compression, as counted by this worker"""
+    try:
+        metrics = current_app.extensions['payload_metrics']
+        return jsonify(metrics.snapshot(current_app.config['PAYLOAD_BUDGETS']))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/users', methods=['GET'])
 @admin_required
 def get_all_users():
-    """Get all users for admin management"""
+    """Get all users for admin management, or one page of them with ?page"""
     try:
-        users = User.query.all()
-        users_data = []
-        
-        for user in users:
-            users_data.append({
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'full_name': user.full_name,
-                'phone': user.phone,
-                'user_type': user.user_type,
-                'location': user.location,
-                'is_active': user.is_active,
-                'created_at': user.created_at.isoformat()
-            })
-        
-        return jsonify(users_data)
+        rows = ADMIN_USER_PROJECTION.query()
+        if 'page' in request.args:
+            return json_response(paginate(ADMIN_USER_PROJECTION, rows, User.id))
+        return json_response(ADMIN_USER_PROJECTION.serialize_all(rows))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -66,27 +237,114 @@ def toggle_user_status(user_id):
     try:
         user = User.query.get_or_404(user_id)
         user.is_active = not user.is_active
+        refresh_user_listings([user.id])
         db.session.commit()
+        refresh_typeahead([user.id])
+        refresh_price_estimates([user.id])
         
+        # Return the updated row and counters so the dashboard can patch its state
         return jsonify({
             'message': f'User status updated to {"active" if user.is_active else "inactive"}',
-            'is_active': user.is_active
+            'is_active': user.is_active,
+            'user': ADMIN_USER_PROJECTION.serialize(ADMIN_USER_PROJECTION.query().filter(User.id == user_id).one()),
+            'stats': platform_stats()
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/users/bulk-status', methods=['POST'])
+@admin_required
+def bulk_user_status():
+    """Activate or deactivate users by id list or filter, in one transaction"""
+    try:
+        data = request.json or {}
+        is_active = data.get('is_active')
+        if not isinstance(is_active, bool):
+            return jsonify({'error': 'is_active must be true or false'}), 400
+        
+        criteria = bulk_criteria(data, User.id, user_filter_criteria)
+        if criteria is None:
+            return jsonify({'error': 'Provide a list of ids or a non-empty filter'}), 400
+        
+        # Only rows that actually change, so the count and the caches refreshed below are exact
+        user_ids = list(db.session.execute(
+            User.__table__.update().where(*criteria, changes(User.is_active, is_active))
+            .values(is_active=is_active).returning(User.id)
+        ).scalars())
+        affected = len(user_ids)
+        if user_ids:
+            refresh_user_listings(user_ids)
+        db.session.commit()
+        refresh_typeahead(user_ids)
+        refresh_price_estimates(user_ids)
+        
+        return jsonify({
+            'message': f'{affected} users {"activated" if is_active else "deactivated"}',
+            'affected': affected,
+            'ids': user_ids,
+            'stats': platform_stats()
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/providers/bulk-verification', methods=['POST'])
+@admin_required
+def bulk_provider_verification():
+    """Verify or unverify providers by id list or filter, in one transaction per shard"""
+    try:
+        data = request.json or {}
+        is_verified = data.get('is_verified')
+        if not isinstance(is_verified, bool):
+            return jsonify({'error': 'is_verified must be true or false'}), 400
+        
+        criteria = bulk_criteria(data, ServiceProvider.id, provider_filter_criteria)
+        if criteria is None:
+            return jsonify({'error': 'Provide a list of ids or a non-empty filter'}), 400
+        
+        def verify():
+            provider_ids = list(db.session.execute(
+                ServiceProvider.__table__.update().where(*criteria, changes(ServiceProvider.is_verified, is_verified))
+                .values(is_verified=is_verified).returning(ServiceProvider.id)
+            ).scalars())
+            if provider_ids:
+                # Verification feeds the ranking score; rescored in the same transaction
+                refresh_provider_ranks(provider_ids)
+            db.session.commit()
+            return provider_ids
+        
+        provider_ids = list(chain.from_iterable(fan_out(verify)))
+        affected = len(provider_ids)
+        
+        return jsonify({
+            'message': f'{affected} providers {"verified" if is_verified else "unverified"}',
+            'affected': affected,
+            'ids': provider_ids,
+            'stats': platform_stats()
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @admin_bp.route('/providers/<int:provider_id>/toggle-verification', methods=['POST'])
 @admin_required
 def toggle_provider_verification(provider_id):
     """Toggle service provider verification status"""
     try:
+        select_shard(shard_for_id(provider_id))
         provider = ServiceProvider.query.get_or_404(provider_id)
         provider.is_verified = not provider.is_verified
+        refresh_provider_ranks([provider.id])
         db.session.commit()
         
-        return jsonify({
+        # Return the updated row and counters so the dashboard can patch its state
+        return json_response({
             'message': f'Provider verification updated to {"verified" if provider.is_verified else "unverified"}',
-            'is_verified': provider.is_verified
+            'is_verified': provider.is_verified,
+            'provider': ADMIN_LISTING_PROJECTION.serialize(
+                admin_listing_rows().filter(ProviderListing.provider_id == provider_id).one()
+            ),
+            'stats': platform_stats()
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -94,35 +352,12 @@ def toggle_provider_verification(provider_id):
 @admin_bp.route('/providers', methods=['GET'])
 @admin_required
 def get_all_providers_admin():
-    """Get all service providers for admin management"""
+    """Get all service providers for admin management, or one page of them with ?page"""
     try:
-        providers = ServiceProvider.query.join(User).all()
-        providers_data = []
-        
-        for provider in providers:
-            providers_data.append({
-                'id': provider.id,
-                'user_id': provider.user_id,
-                'skills': provider.skills,
-                'hourly_rate': provider.hourly_rate,
-                'experience_years': provider.experience_years,
-                'description': provider.description,
-                'rating': provider.rating,
-                'total_reviews': provider.total_reviews,
-                'is_verified': provider.is_verified,
-                'created_at': provider.created_at.isoformat(),
-                'user': {
-                    'id': provider.user.id,
-                    'username': provider.user.username,
-                    'email': provider.user.email,
-                    'full_name': provider.user.full_name,
-                    'phone': provider.user.phone,
-                    'location': provider.user.location,
-                    'is_active': provider.user.is_active
-                }
-            })
-        
-        return jsonify(providers_data)
+        rows = admin_listing_rows()
+        if 'page' in request.args:
+            return json_response(paginate(ADMIN_LISTING_PROJECTION, rows, ProviderListing.provider_id, sharded=True))
+        return json_response(list(chain.from_iterable(fan_out(lambda: ADMIN_LISTING_PROJECTION.serialize_all(rows)))))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
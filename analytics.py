@@ -0,0 +1,331 @@
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db, User, Booking, ServiceCategory
+from src.sharding import shard_names, use_shard
+
+BUCKET_SECONDS = {'day': 86400, 'hour': 3600}
+BATCH_SIZE = 5000
+# updated_at is stamped before commit, so a row can appear behind the watermark; the rollup re-reads this far back
+ROLLUP_OVERLAP_SECONDS = 300
+
+
+class PlatformBookingStat(db.Model):
+    """Bookings and booking value per time bucket, category and current status"""
+    __tablename__ = 'platform_booking_stat'
+    __table_args__ = (
+        db.UniqueConstraint('bucket_type', 'bucket_start', 'service_category_id', 'status',
+                            name='uq_platform_booking_stat_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    bucket_type = db.Column(db.String(10), nullable=False)  # 'day' or 'hour'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    service_category_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    booking_count = db.Column(db.Integer, nullable=False, default=0)
+    gross_value = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class PlatformSignupStat(db.Model):
+    """New users per time bucket and user type"""
+    __tablename__ = 'platform_signup_stat'
+    __table_args__ = (
+        db.UniqueConstraint('bucket_type', 'bucket_start', 'user_type', name='uq_platform_signup_stat_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    bucket_type = db.Column(db.String(10), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    user_type = db.Column(db.String(20), nullable=False)
+    user_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AnalyticsBookingState(db.Model):
+    """Last status and amount counted for each booking, so status changes can be moved between buckets"""
+    __tablename__ = 'analytics_booking_state'
+
+    booking_id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class AnalyticsWatermark(db.Model):
+    """How far the rollup job has read each source table"""
+    __tablename__ = 'analytics_watermark'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.String(50), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def _epoch_seconds(timestamps):
+    return np.array(timestamps, dtype='datetime64[s]').astype(np.int64)
+
+
+def _group(keys):
+    """Vectorized GROUP BY over integer key columns: unique key rows and each input row's group"""
+    unique_keys, inverse = np.unique(np.column_stack(keys), axis=0, return_inverse=True)
+    return unique_keys, inverse.reshape(-1)
+
+
+def _aggregate_bookings(created_at, category_ids, statuses, amounts, signs):
+    """Booking stat deltas keyed by (bucket_type, bucket_start, category, status)"""
+    if not len(created_at):
+        return {}
+    seconds = _epoch_seconds(created_at)
+    status_names, status_codes = np.unique(np.array(statuses, dtype=str), return_inverse=True)
+    status_codes = status_codes.reshape(-1)
+    category_ids = np.asarray(category_ids, dtype=np.int64)
+    signs = np.asarray(signs, dtype=np.float64)
+    amounts = np.asarray(amounts, dtype=np.float64) * signs
+
+    deltas = {}
+    for bucket_type, width in BUCKET_SECONDS.items():
+        keys, inverse = _group([seconds // width * width, category_ids, status_codes])
+        # Signs make removals of a booking's previous state count as -1
+        counts = np.rint(np.bincount(inverse, weights=signs, minlength=len(keys)))
+        sums = np.bincount(inverse, weights=amounts, minlength=len(keys))
+        for (bucket, category_id, status_code), count, total in zip(keys, counts, sums):
+            if count == 0 and total == 0:
+                continue
+            key = (bucket_type, datetime.utcfromtimestamp(int(bucket)), int(category_id), str(status_names[status_code]))
+            deltas[key] = (int(count), float(total))
+    return deltas
+
+
+def _aggregate_signups(created_at, user_types):
+    if not len(created_at):
+        return {}
+    seconds = _epoch_seconds(created_at)
+    type_names, type_codes = np.unique(np.array(user_types, dtype=str), return_inverse=True)
+
+    deltas = {}
+    for bucket_type, width in BUCKET_SECONDS.items():
+        keys, inverse = _group([seconds // width * width, type_codes.reshape(-1)])
+        counts = np.bincount(inverse, minlength=len(keys))
+        for (bucket, type_code), count in zip(keys, counts):
+            key = (bucket_type, datetime.utcfromtimestamp(int(bucket)), str(type_names[type_code]))
+            deltas[key] = int(count)
+    return deltas
+
+
+def _apply_booking_deltas(deltas):
+    table = PlatformBookingStat.__table__
+    for (bucket_type, bucket_start, category_id, status), (count, total) in deltas.items():
+        stmt = insert(table).values(
+            bucket_type=bucket_type, bucket_start=bucket_start, service_category_id=category_id,
+            status=status, booking_count=count, gross_value=total
+        )
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['bucket_type', 'bucket_start', 'service_category_id', 'status'],
+            set_={
+                'booking_count': table.c.booking_count + stmt.excluded.booking_count,
+                'gross_value': table.c.gross_value + stmt.excluded.gross_value
+            }
+        ))
+
+
+def _apply_signup_deltas(deltas):
+    table = PlatformSignupStat.__table__
+    for (bucket_type, bucket_start, user_type), count in deltas.items():
+        stmt = insert(table).values(
+            bucket_type=bucket_type, bucket_start=bucket_start, user_type=user_type, user_count=count
+        )
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['bucket_type', 'bucket_start', 'user_type'],
+            set_={'user_count': table.c.user_count + stmt.excluded.user_count}
+        ))
+
+
+def _advance_watermark(name, old_value, new_value):
+    """Compare-and-set so two workers running the job at once cannot both apply the same rows"""
+    if old_value is None:
+        db.session.add(AnalyticsWatermark(name=name, value=new_value))
+        db.session.flush()
+        return True
+    result = db.session.execute(
+        AnalyticsWatermark.__table__.update()
+        .where(AnalyticsWatermark.name == name)
+        .where(AnalyticsWatermark.value == old_value)
+        .values(value=new_value, updated_at=datetime.utcnow())
+    )
+    return result.rowcount == 1
+
+
+def _touch_watermark(name, value):
+    """Record a run that found nothing new, so rollup_is_stale() does not keep asking for another"""
+    return _advance_watermark(name, value, value) if value is not None else True
+
+
+def remove_booking_from_analytics(booking):
+    """Take a deleted booking's counted status and amount back out of the booking stats.
+
+    Bookings the rollup has not counted yet have no state row and need
+    nothing. Runs inside the caller's session; the caller commits.
+    """
+    state = AnalyticsBookingState.query.get(booking.id)
+    if state is None or booking.created_at is None:
+        return
+    _apply_booking_deltas(_aggregate_bookings(
+        [booking.created_at], [booking.service_category_id], [state.status], [state.total_amount], [-1]
+    ))
+    db.session.delete(state)
+
+
+def _roll_up_bookings(watermark_name='booking_updated_at'):
+    watermark = AnalyticsWatermark.query.get(watermark_name)
+    old_value = watermark.value if watermark else None
+    since = datetime.fromisoformat(old_value) if old_value else None
+
+    query = db.session.query(
+        Booking.id, Booking.created_at, Booking.updated_at, Booking.service_category_id,
+        Booking.status, Booking.total_amount
+    )
+    if since:
+        # Rows stamped shortly before the watermark may have committed after it was taken,
+        # so the window is re-read; the state diff below turns already-counted rows into no-ops
+        query = query.filter(Booking.updated_at >= since - timedelta(seconds=ROLLUP_OVERLAP_SECONDS))
+    rows = query.order_by(Booking.updated_at).all()
+    if not rows:
+        return _touch_watermark(watermark_name, old_value)
+
+    known = {}
+    ids = [row.id for row in rows]
+    for i in range(0, len(ids), BATCH_SIZE):
+        for state in AnalyticsBookingState.query.filter(AnalyticsBookingState.booking_id.in_(ids[i:i + BATCH_SIZE])):
+            known[state.booking_id] = (state.status, state.total_amount)
+
+    created_at, category_ids, statuses, amounts, signs, new_states = [], [], [], [], [], []
+    for row in rows:
+        current = (row.status or 'pending', row.total_amount or 0.0)
+        previous = known.get(row.id)
+        if previous == current:
+            continue
+        if previous is not None:
+            created_at.append(row.created_at)
+            category_ids.append(row.service_category_id)
+            statuses.append(previous[0])
+            amounts.append(previous[1])
+            signs.append(-1)
+        created_at.append(row.created_at)
+        category_ids.append(row.service_category_id)
+        statuses.append(current[0])
+        amounts.append(current[1])
+        signs.append(1)
+        new_states.append({'booking_id': row.id, 'status': current[0], 'total_amount': current[1]})
+
+    _apply_booking_deltas(_aggregate_bookings(created_at, category_ids, statuses, amounts, signs))
+    if new_states:
+        stmt = insert(AnalyticsBookingState.__table__)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['booking_id'],
+            set_={'status': stmt.excluded.status, 'total_amount': stmt.excluded.total_amount}
+        ), new_states)
+
+    # A run that only re-read the overlap window must not move the watermark back
+    new_value = max([row.updated_at for row in rows if row.updated_at] + ([since] if since else [])).isoformat()
+    return _advance_watermark(watermark_name, old_value, new_value)
+
+
+def _roll_up_signups():
+    watermark = AnalyticsWatermark.query.get('user_id')
+    old_value = watermark.value if watermark else None
+    last_id = int(old_value) if old_value else 0
+
+    rows = db.session.query(User.id, User.created_at, User.user_type) \
+        .filter(User.id > last_id, User.created_at.isnot(None)) \
+        .order_by(User.id).all()
+    if not rows:
+        return _touch_watermark('user_id', old_value)
+
+    _apply_signup_deltas(_aggregate_signups([r.created_at for r in rows], [r.user_type for r in rows]))
+    return _advance_watermark('user_id', old_value, str(rows[-1].id))
+
+
+def _commit_if_applied(roll_up, *args):
+    try:
+        if roll_up(*args):
+            db.session.commit()
+            return True
+        db.session.rollback()
+        return False
+    except IntegrityError:
+        # Another worker created the first watermark concurrently
+        db.session.rollback()
+        return False
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def run_analytics_rollup():
+    """Fold rows added or changed since the last run into the analytics tables.
+
+    The first run backfills from scratch using the same vectorized path.
+    Each shard's bookings are read against their own watermark and committed
+    separately. Returns False when another worker advanced a watermark first
+    and that part of this run was discarded.
+    """
+    applied = True
+    for shard in shard_names():
+        with use_shard(shard):
+            name = f'booking_updated_at:{shard}' if shard else 'booking_updated_at'
+            applied = _commit_if_applied(_roll_up_bookings, name) and applied
+    return _commit_if_applied(_roll_up_signups) and applied
+
+
+def rollup_is_stale(max_age_seconds):
+    last_run = db.session.query(db.func.min(AnalyticsWatermark.updated_at)).scalar()
+    return last_run is None or (datetime.utcnow() - last_run).total_seconds() > max_age_seconds
+
+
+def get_platform_series(bucket_type, start=None, end=None, category_id=None):
+    """Per-bucket bookings by category and status, booking value, signups and cancellation rate"""
+    booking_query = PlatformBookingStat.query.filter_by(bucket_type=bucket_type)
+    signup_query = PlatformSignupStat.query.filter_by(bucket_type=bucket_type)
+    if start:
+        booking_query = booking_query.filter(PlatformBookingStat.bucket_start >= start)
+        signup_query = signup_query.filter(PlatformSignupStat.bucket_start >= start)
+    if end:
+        booking_query = booking_query.filter(PlatformBookingStat.bucket_start <= end)
+        signup_query = signup_query.filter(PlatformSignupStat.bucket_start <= end)
+    if category_id:
+        booking_query = booking_query.filter_by(service_category_id=category_id)
+
+    category_names = dict(db.session.query(ServiceCategory.id, ServiceCategory.name))
+    series = {}
+
+    def point(bucket_start):
+        key = bucket_start.isoformat()
+        return series.setdefault(key, {
+            'bucket_start': key,
+            'bookings': 0,
+            'cancelled': 0,
+            'cancellation_rate': 0.0,
+            'gross_value': 0.0,
+            'by_category': {},
+            'signups': {}
+        })
+
+    for row in booking_query:
+        if row.booking_count == 0:
+            continue
+        p = point(row.bucket_start)
+        p['bookings'] += row.booking_count
+        if row.status == 'cancelled':
+            p['cancelled'] += row.booking_count
+        else:
+            p['gross_value'] += row.gross_value
+        category = category_names.get(row.service_category_id, str(row.service_category_id))
+        p['by_category'].setdefault(category, {})[row.status] = row.booking_count
+
+    for row in signup_query:
+        point(row.bucket_start)['signups'][row.user_type] = row.user_count
+
+    for p in series.values():
+        p['gross_value'] = round(p['gross_value'], 2)
+        p['cancellation_rate'] = round(p['cancelled'] / p['bookings'], 4) if p['bookings'] else 0.0
+
+    return [series[key] for key in sorted(series)]
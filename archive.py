@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, literal, select
+from src.models.user import db, Booking, ArchivedBooking
+
+ARCHIVABLE_STATUSES = ('completed', 'cancelled')
+DEFAULT_ARCHIVE_AFTER_DAYS = 90
+BATCH_SIZE = 5000
+
+# Columns copied verbatim from booking to booking_archive
+_COLUMNS = [c.name for c in Booking.__table__.columns]
+
+
+def archive_bookings(older_than_days=DEFAULT_ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE, verbose=False):
+    """Move completed and cancelled bookings last updated before the cutoff into booking_archive.
+
+    Works in batches, each copied and deleted in its own transaction, so the
+    booking table is never locked for long. Reviews keep their booking_id and
+    resolve it against the archive. Returns the number of bookings moved.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    booking = Booking.__table__
+    archive = ArchivedBooking.__table__
+    moved = 0
+
+    while True:
+        ids = [i for (i,) in db.session.query(Booking.id)
+               .filter(Booking.status.in_(ARCHIVABLE_STATUSES), Booking.updated_at < cutoff)
+               .order_by(Booking.id)
+               .limit(batch_size)]
+        if not ids:
+            break
+
+        try:
+            db.session.execute(
+                archive.insert().from_select(
+                    _COLUMNS + ['archived_at'],
+                    select(*[booking.c[name] for name in _COLUMNS], literal(datetime.utcnow(), DateTime))
+                    .where(booking.c.id.in_(ids))
+                )
+            )
+            db.session.execute(booking.delete().where(booking.c.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        moved += len(ids)
+        if verbose:
+            print(f"Archived {moved} bookings")
+        if len(ids) < batch_size:
+            break
+
+    return moved
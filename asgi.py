@@ -0,0 +1,303 @@
+"""
+ASGI entry point serving the public read endpoints from async handlers.
+
+GET /api/services/categories, /api/services/providers, /api/services/providers/<id>,
+/api/services/providers/<id>/reviews and /api/reviews/provider/<id>/stats are
+answered here with the aiosqlite driver, so a waiting query holds a coroutine
+instead of a worker thread. Every other request goes to the Flask app, which
+runs unchanged behind asgiref's WSGI adapter. Responses are byte-for-byte the
+ones the Flask endpoints produce, compressed under the same endpoint names and
+settings (src/compression.py).
+
+    python manage.py asgi --workers 4
+"""
+
+import asyncio
+import math
+import re
+import sqlite3
+from urllib.parse import parse_qsl
+from sqlalchemy import event, func, select
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import NotFound
+from werkzeug.http import parse_cookie
+from src.main import create_app
+from src.models.user import ServiceProvider, ServiceCategory, Review, User
+from src.models.projection import Projection, REVIEW_PROJECTION, RawJSON, category_fields, review_rows, encode_json
+from src.models.listing import ProviderListing, PROVIDER_LISTING_PROJECTION, listing_rows
+from src.routes.services import PROVIDER_SEARCH_LIMIT, provider_search, merge_provider_rows, review_page
+from src.ratelimit import MemoryBackend, forwarded_client
+from src.compression import compress_payload
+from src.sharding import shard_router, shard_names, shard_for_id, shard_for_location
+
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine
+    import aiosqlite  # noqa: F401
+except ImportError:  # aiosqlite is optional; without it every endpoint is served by Flask
+    create_async_engine = None
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+# One event loop interleaves many requests; this caps how many provider searches it queues
+# on the database at once, where each sync worker thread is capped at PROVIDER_SEARCH_LIMIT
+ASYNC_SEARCH_MAX_IN_FLIGHT = 64
+POOL_SIZE = 20
+
+CATEGORY_PROJECTION = Projection(category_fields(ServiceCategory))
+
+
+class AsyncDatabase:
+    """Async engines for the main database and, when sharding is on, each region shard"""
+
+    def __init__(self, uri):
+        self.uri = uri.replace('sqlite:///', 'sqlite+aiosqlite:///', 1)
+        self._engines = {}
+
+    def engine(self, shard=None):
+        engine = self._engines.get(shard)
+        if engine is None:
+            uri = self.uri if shard is None else f'sqlite+aiosqlite:///{shard_router.path(shard)}'
+            engine = create_async_engine(uri, pool_size=POOL_SIZE, max_overflow=POOL_SIZE)
+            if shard is not None:
+                event.listen(engine.sync_engine, 'connect', shard_router.attach_global)
+            self._engines[shard] = engine
+        return engine
+
+    async def all(self, statement, shard=None):
+        async with self.engine(shard).connect() as conn:
+            return (await conn.execute(statement)).all()
+
+    async def fan_out(self, statement, shards=None):
+        """Run a statement on every shard at once; results in shard order"""
+        shards = shard_names() if shards is None else shards
+        return await asyncio.gather(*(self.all(statement, shard) for shard in shards))
+
+    async def home_shard(self, user_id):
+        if not shard_router.enabled:
+            return None
+        rows = await self.all(select(User.home_shard, User.location).where(User.id == user_id))
+        if not rows:
+            return None
+        return rows[0].home_shard or shard_for_location(rows[0].location)
+
+    async def dispose(self):
+        for engine in self._engines.values():
+            await engine.dispose()
+        self._engines = {}
+
+
+class Request:
+    def __init__(self, scope):
+        self.scope = scope
+        self.args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        self.headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+
+
+class Response:
+    def __init__(self, body, status=200, content_type='application/json', headers=None):
+        self.body = body.encode() if isinstance(body, str) else body
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers or {}
+
+
+def json_response(data, status=200, headers=None):
+    return Response(encode_json(data), status, headers=headers)
+
+
+def not_found():
+    """The same page Flask's get_or_404() sends"""
+    error = NotFound()
+    return Response(error.get_body(), 404, content_type='text/html; charset=utf-8')
+
+
+def _client_key(app, request):
+    """Same client identity as src/ratelimit.py: the logged-in user from the Flask session cookie, else the IP"""
+    cookie = parse_cookie(request.headers.get('cookie', '')).get(app.config['SESSION_COOKIE_NAME'])
+    if cookie:
+        serializer = app.session_interface.get_signing_serializer(app)
+        try:
+            user_id = serializer.loads(cookie, max_age=int(app.permanent_session_lifetime.total_seconds())).get('user_id')
+        except Exception:
+            user_id = None
+        if user_id:
+            return f'user:{user_id}'
+    client = request.scope.get('client')
+    forwarded = forwarded_client(request.headers.get('x-forwarded-for'), app.config['TRUSTED_PROXIES'])
+    return f"ip:{forwarded or (client[0] if client else None)}"
+
+
+def _reject(status, message, retry_after):
+    return json_response({'error': message}, status, {'Retry-After': str(max(1, math.ceil(retry_after)))})
+
+
+def _rate_limited(app):
+    return app.extensions.get('rate_limiter') is not None and app.config['RATE_LIMIT_ENABLED']
+
+
+async def _check_rate_limit(app, name, request, rate, burst):
+    """The token bucket check of src/ratelimit.py's rate_limit(); a rejection response, or None"""
+    if not _rate_limited(app):
+        return None
+    rate, burst = app.config['RATE_LIMITS'].get(name, (rate, burst))
+    buckets = app.extensions['rate_limiter']['buckets']
+    key = f'{name}:{_client_key(app, request)}'
+    try:
+        if isinstance(buckets, MemoryBackend):
+            wait = buckets.take(key, rate, burst)
+        else:
+            # The shared SQLite bucket store blocks; keep it off the event loop
+            wait = await asyncio.to_thread(buckets.take, key, rate, burst)
+    except sqlite3.Error as e:
+        print(f"Rate limiter unavailable: {e}")
+        wait = 0.0
+    if wait > 0:
+        return _reject(429, 'Too many requests, please slow down', wait)
+    return None
+
+
+class AsyncReadApp:
+    """ASGI app: async handlers for the public read endpoints, Flask for the rest"""
+
+    def __init__(self, app):
+        self.app = app
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        usable = create_async_engine is not None and uri.startswith('sqlite:///') and uri != 'sqlite:///:memory:'
+        self.db = AsyncDatabase(uri) if usable else None
+        self.wsgi = WsgiToAsgi(app) if WsgiToAsgi is not None else None
+        self.search_in_flight = 0
+        # Named after the Flask endpoints they stand in for, which key compression settings and metrics
+        self.routes = [
+            (re.compile(r'/api/services/categories'), 'services.get_categories', self.get_categories),
+            (re.compile(r'/api/services/providers'), 'services.get_providers', self.get_providers),
+            (re.compile(r'/api/services/providers/(\d+)'), 'services.get_provider', self.get_provider),
+            (re.compile(r'/api/services/providers/(\d+)/reviews'), 'services.get_provider_reviews',
+             self.get_provider_reviews),
+            (re.compile(r'/api/reviews/provider/(\d+)/stats'), 'reviews.get_provider_review_stats',
+             self.get_provider_review_stats),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET' and self.db is not None:
+            for pattern, endpoint, handler in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match:
+                    request = Request(scope)
+                    try:
+                        response = await handler(request, *(int(g) for g in match.groups()))
+                    except Exception as e:
+                        response = json_response({'error': str(e)}, 500)
+                    return await self._send(request, endpoint, response, send)
+        if self.wsgi is None:
+            raise RuntimeError('asgiref is required to serve the Flask endpoints over ASGI')
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.db is not None:
+                    await self.db.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _send(self, request, endpoint, response, send):
+        body, encoding, vary_encoding = compress_payload(
+            self.app, endpoint, request.headers.get('accept-encoding', ''),
+            response.content_type.split(';')[0], response.status, response.body
+        )
+        headers = [
+            (b'content-type', response.content_type.encode()),
+            (b'content-length', str(len(body)).encode())
+        ]
+        if encoding is not None:
+            headers.append((b'content-encoding', encoding.encode()))
+        headers += [(name.lower().encode(), value.encode()) for name, value in response.headers.items()]
+        vary = ['Accept-Encoding'] if vary_encoding else []
+        origin = request.headers.get('origin')
+        if origin:
+            # What flask-cors adds for CORS(app, origins="*", supports_credentials=True)
+            headers += [
+                (b'access-control-allow-origin', origin.encode('latin-1')),
+                (b'access-control-allow-credentials', b'true')
+            ]
+            vary.append('Origin')
+        if vary:
+            headers.append((b'vary', ', '.join(vary).encode()))
+        await send({'type': 'http.response.start', 'status': response.status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def get_categories(self, request):
+        rows = await self.db.all(CATEGORY_PROJECTION.select().where(ServiceCategory.is_active == True))
+        return json_response(CATEGORY_PROJECTION.serialize_all(rows))
+
+    async def get_providers(self, request):
+        rejected = await _check_rate_limit(self.app, 'provider_search', request,
+                                           PROVIDER_SEARCH_LIMIT['rate'], PROVIDER_SEARCH_LIMIT['burst'])
+        if rejected is not None:
+            return rejected
+        if _rate_limited(self.app) and self.search_in_flight >= ASYNC_SEARCH_MAX_IN_FLIGHT:
+            return _reject(503, 'Server is busy, please retry shortly', 1)
+
+        # No lock needed: the counter is only touched from this event loop
+        self.search_in_flight += 1
+        try:
+            statement, limit, ranked = provider_search(listing_rows(core=True), request.args)
+            rows = merge_provider_rows(await self.db.fan_out(statement), limit, ranked)
+            return json_response(PROVIDER_LISTING_PROJECTION.serialize_all(rows))
+        finally:
+            self.search_in_flight -= 1
+
+    async def get_provider(self, request, provider_id):
+        rows = await self.db.all(
+            select(ProviderListing.fragment).where(ProviderListing.provider_id == provider_id), shard_for_id(provider_id)
+        )
+        if not rows:
+            return not_found()
+        return json_response(RawJSON(rows[0].fragment))
+
+    async def get_provider_reviews(self, request, provider_id):
+        shard = shard_for_id(provider_id)
+        providers = await self.db.all(select(ServiceProvider.user_id).where(ServiceProvider.id == provider_id), shard)
+        if not providers:
+            return not_found()
+        limit, offset = review_page(request.args)
+        rows = await self.db.all(
+            review_rows(core=True).where(Review.provider_id == providers[0].user_id)
+            .order_by(Review.created_at.desc(), Review.id.desc()).limit(limit).offset(offset),
+            shard
+        )
+        return json_response(REVIEW_PROJECTION.serialize_all(rows))
+
+    async def get_provider_review_stats(self, request, provider_id):
+        shard = await self.db.home_shard(provider_id)
+        rating_stats, totals = await asyncio.gather(
+            self.db.all(select(Review.rating, func.count(Review.id))
+                        .where(Review.provider_id == provider_id).group_by(Review.rating), shard),
+            self.db.all(select(func.avg(Review.rating), func.count(Review.id))
+                        .where(Review.provider_id == provider_id), shard)
+        )
+        avg_rating, total_reviews = totals[0]
+
+        # Format rating distribution
+        rating_distribution = {str(i): 0 for i in range(1, 6)}
+        for rating, count in rating_stats:
+            rating_distribution[str(rating)] = count
+
+        return json_response({
+            'provider_id': provider_id,
+            'average_rating': round(avg_rating, 2) if avg_rating else 0,
+            'total_reviews': total_reviews or 0,
+            'rating_distribution': rating_distribution
+        })
+
+
+# Each uvicorn worker imports this module and builds its own Flask app
+app = AsyncReadApp(create_app())
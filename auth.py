@@ -1,10 +1,16 @@
 from flask import Blueprint, jsonify, request, session
 from src.models.user import User, ServiceProvider, db
+from src.models.ranking import refresh_provider_ranks
+from src.models.typeahead import refresh_typeahead
+from src.models.pricing import refresh_price_estimates
+from src.ratelimit import rate_limit
+from src.sharding import home_shard, select_shard, shard_for_location
 import json
 
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit('register', rate=5 / 60, burst=3, max_in_flight=4)
 def register():
     try:
         data = request.json
@@ -23,7 +29,8 @@ def register():
             full_name=data['full_name'],
             phone=data.get('phone'),
             user_type=data['user_type'],
-            location=data.get('location')
+            location=data.get('location'),
+            home_shard=shard_for_location(data.get('location'))
         )
         user.set_password(data['password'])
         
@@ -32,6 +39,7 @@ def register():
         
         # If user is a service provider, create service provider profile
         if data['user_type'] == 'service_provider':
+            select_shard(user.home_shard)
             provider_data = data.get('provider_profile', {})
             service_provider = ServiceProvider(
                 user_id=user.id,
@@ -42,7 +50,11 @@ def register():
                 availability=json.dumps(provider_data.get('availability', {}))
             )
             db.session.add(service_provider)
+            db.session.flush()
+            refresh_provider_ranks([service_provider.id])
             db.session.commit()
+            refresh_typeahead([user.id])
+            refresh_price_estimates([user.id])
         
         # Store user in session
         session['user_id'] = user.id
@@ -58,6 +70,7 @@ def register():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('login', rate=10 / 60, burst=5, max_in_flight=4)
 def login():
     try:
         data = request.json
@@ -98,8 +111,10 @@ def get_current_user():
     user_data = user.to_dict()
     
     # Include service provider profile if applicable
-    if user.user_type == 'service_provider' and user.service_provider_profile:
-        user_data['provider_profile'] = user.service_provider_profile.to_dict()
+    if user.user_type == 'service_provider':
+        select_shard(home_shard(user.id))
+        if user.service_provider_profile:
+            user_data['provider_profile'] = user.service_provider_profile.to_dict()
     
     return jsonify({'user': user_data}), 200
 
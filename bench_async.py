@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Load test for the async read path in src/asgi.py against the threaded
+preforked Flask server. Seeds a database, starts both servers with the
+same number of worker processes, and drives the public read endpoints
+(provider detail, provider reviews, review stats, categories) from N
+concurrent connections, reporting throughput, tail latency and failures.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import asyncio
+import json
+import random
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+WORKERS = 2
+PROVIDERS = 500
+REVIEWS_PER_PROVIDER = 10
+CONCURRENCY = [50, 200, 800]
+DURATION_SECONDS = 5
+REQUEST_TIMEOUT_SECONDS = 10
+SYNC_PORT = 5101
+ASYNC_PORT = 5102
+
+
+def seed(directory):
+    from src.main import create_app, prepare_database
+    from src.models.user import db, User, ServiceProvider, Review
+
+    database = os.path.join(directory, 'app.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'})
+    prepare_database(app)
+    rng = random.Random(7)
+    with app.app_context():
+        customer = User(username='customer', email='customer@example.com', full_name='Customer',
+                        user_type='customer', location='Thamel, Kathmandu', password_hash='x')
+        db.session.add(customer)
+        db.session.flush()
+        for i in range(PROVIDERS):
+            user = User(username=f'provider{i}', email=f'provider{i}@example.com', full_name=f'Provider {i}',
+                        user_type='service_provider', location='Baneshwor, Kathmandu', password_hash='x')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(ServiceProvider(user_id=user.id, skills=json.dumps(['Plumbing']), hourly_rate=500 + i,
+                                           rating=round(rng.uniform(3, 5), 2), total_reviews=REVIEWS_PER_PROVIDER))
+            for j in range(REVIEWS_PER_PROVIDER):
+                db.session.add(Review(customer_id=customer.id, provider_id=user.id, booking_id=0,
+                                      rating=rng.randint(1, 5), comment='Good work',
+                                      created_at=datetime.utcnow() - timedelta(days=j)))
+        db.session.commit()
+        provider_ids = [(p.id, p.user_id) for p in ServiceProvider.query]
+        db.engine.dispose()
+    return database, provider_ids
+
+
+def start_server(command, port, database):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}')
+    manage = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'manage.py')
+    return subprocess.Popen([sys.executable, manage, command, '--port', str(port), '--workers', str(WORKERS),
+                             '--skip-migrate'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def fetch(port, path):
+    """One GET on a fresh connection; returns the status code"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if await fetch(port, '/api/services/categories') == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+async def load(port, concurrency, paths):
+    latencies, failures = [], 0
+    deadline = time.monotonic() + DURATION_SECONDS
+
+    async def connection():
+        nonlocal failures
+        rng = random.Random()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(fetch(port, rng.choice(paths)), REQUEST_TIMEOUT_SECONDS)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                failures += 1
+                continue
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connection() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else float('nan')
+
+    return len(latencies) / elapsed, percentile(0.5), percentile(0.99), failures
+
+
+async def run(paths):
+    for name, port in (('sync (threads)', SYNC_PORT), ('async (asgi)', ASYNC_PORT)):
+        await wait_until_up(port)
+        for concurrency in CONCURRENCY:
+            rate, p50, p99, failures = await load(port, concurrency, paths)
+            print(f"  {name:15} {concurrency:5d} conns  {rate:7.0f} req/s  p50 {p50:7.1f} ms  "
+                  f"p99 {p99:7.1f} ms  failed {failures}")
+
+
+def main():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 8192)), hard))
+
+    directory = tempfile.mkdtemp(prefix='bench_async_')
+    servers = []
+    try:
+        database, provider_ids = seed(directory)
+        paths = ['/api/services/categories']
+        for provider_id, user_id in provider_ids:
+            paths += [f'/api/services/providers/{provider_id}', f'/api/services/providers/{provider_id}/reviews',
+                      f'/api/reviews/provider/{user_id}/stats']
+        servers = [start_server('serve', SYNC_PORT, database), start_server('asgi', ASYNC_PORT, database)]
+        print(f"{WORKERS} worker processes each, {DURATION_SECONDS}s per level, {PROVIDERS} providers")
+        asyncio.run(run(paths))
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
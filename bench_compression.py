@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark for API response compression in src/compression.py.
+Seeds a database and fetches the large list endpoints (provider search,
+reviews, admin users and providers) plain and with each available encoding
+at several levels. Reports the bytes on the wire, the time to produce each
+response and the transfer time on a slow mobile link, and checks that every
+compressed body decodes to the plain one.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import gzip
+import json
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROVIDERS = 1000
+REVIEWS_PER_PROVIDER = 5
+LEVELS = [1, 5, 9]
+REPEAT = 5
+# Effective downlink of a congested 3G/4G connection, in bytes per second
+SLOW_LINK_BYTES_PER_SECOND = 1_000_000 / 8
+
+ENDPOINTS = [
+    '/api/services/providers',
+    '/api/services/providers?sort=rank&limit=100',
+    '/api/reviews/',
+    '/api/admin/users',
+    '/api/admin/providers',
+]
+
+COMMENTS = [
+    'Fixed the leaking kitchen pipe quickly and cleaned up afterwards.',
+    'Arrived late but the wiring work was neat and safe.',
+    'Very professional, explained the problem and the cost before starting.',
+    'राम्रो काम, समयमै आउनुभयो।',
+    'Would book again for the bathroom fittings.',
+]
+
+
+def seed(directory):
+    from src.main import create_app, prepare_database
+    from src.models.user import db, User, ServiceProvider, Review
+    from src.models.listing import refresh_provider_listings
+
+    database = os.path.join(directory, 'app.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}', 'RATE_LIMIT_ENABLED': False})
+    prepare_database(app)
+    rng = random.Random(11)
+    with app.app_context():
+        customer = User(username='customer', email='customer@example.com', full_name='Customer',
+                        user_type='customer', location='Thamel, Kathmandu', password_hash='x')
+        db.session.add(customer)
+        db.session.flush()
+        for i in range(PROVIDERS):
+            user = User(username=f'provider{i}', email=f'provider{i}@example.com', full_name=f'Provider Sharma {i}',
+                        phone='+977-9841234567', user_type='service_provider',
+                        location=rng.choice(['Baneshwor, Kathmandu', 'Lalitpur', 'Lakeside, Pokhara']),
+                        password_hash='x')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(ServiceProvider(user_id=user.id, skills=json.dumps(['Plumbing', 'Electrical work']),
+                                           hourly_rate=float(rng.randint(300, 1500)),
+                                           experience_years=rng.randint(0, 20),
+                                           description='Experienced professional serving the valley.',
+                                           availability=json.dumps({'monday': '9:00-17:00', 'friday': '9:00-13:00'}),
+                                           rating=round(rng.uniform(3, 5), 2), total_reviews=REVIEWS_PER_PROVIDER))
+            for j in range(REVIEWS_PER_PROVIDER):
+                db.session.add(Review(customer_id=customer.id, provider_id=user.id, booking_id=0,
+                                      rating=rng.randint(1, 5), comment=rng.choice(COMMENTS),
+                                      created_at=datetime.utcnow() - timedelta(days=j)))
+        refresh_provider_listings()
+        db.session.commit()
+    return app
+
+
+def decode(body, encoding):
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'br':
+        import brotli
+        return brotli.decompress(body)
+    return body
+
+
+def measure(client, path, accept_encoding):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        response = client.get(path, headers={'Accept-Encoding': accept_encoding})
+        body = response.get_data()
+        timings.append(time.perf_counter() - started)
+    return body, response.headers.get('Content-Encoding'), min(timings)
+
+
+def main():
+    from src.compression import ENCODINGS
+
+    directory = tempfile.mkdtemp()
+    try:
+        app = seed(directory)
+        client = app.test_client()
+        print(f'{"endpoint":<46}{"encoding":>10}{"level":>7}{"bytes":>11}{"ratio":>8}{"ms":>9}{"slow link ms":>14}')
+        for path in ENDPOINTS:
+            plain, _, plain_time = measure(client, path, 'identity')
+            runs = [('identity', None, plain, plain_time)]
+            for encoding in ENCODINGS:
+                for level in LEVELS:
+                    app.config['COMPRESSION_LEVEL'] = level
+                    body, used, elapsed = measure(client, path, encoding)
+                    assert used == encoding and decode(body, encoding) == plain, (path, encoding, level)
+                    runs.append((encoding, level, body, elapsed))
+            for encoding, level, body, elapsed in runs:
+                transfer = len(body) / SLOW_LINK_BYTES_PER_SECOND * 1000
+                print(f'{path:<46}{encoding:>10}{level or "-":>7}{len(body):>11}{len(body) / len(plain):>8.3f}'
+                      f'{elapsed * 1000:>9.1f}{transfer:>14.0f}')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
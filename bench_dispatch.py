@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Simulation benchmark for the batch dispatcher in src/models/dispatch.py.
+Generates providers and open requests across the Kathmandu valley and
+compares today's behaviour (every customer picks the best-rated provider
+in reach) with the greedy and, when scipy is installed, optimal solvers.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import json
+import random
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from src.models.dispatch import (
+    MAX_ACTIVE_BOOKINGS, WEEKDAYS, haversine_km, linear_sum_assignment,
+    request_arrays, provider_arrays, score_candidates, solve
+)
+
+SCENARIOS = [(1000, 400), (5000, 1500)]
+OPTIMAL_MAX_REQUESTS = 1000
+AREAS = ['Thamel', 'Baneshwor', 'Koteshwor', 'Kalanki', 'Boudha', 'Maharajgunj',
+         'Kirtipur', 'Patan', 'Lalitpur', 'Bhaktapur', 'Kathmandu']
+
+
+def simulate(n_requests, n_providers, seed=42):
+    rng = random.Random(seed)
+    monday = datetime(2024, 6, 3)
+
+    availabilities = []
+    for _ in range(n_providers):
+        start = rng.choice([7, 8, 9, 10])
+        days = rng.sample(WEEKDAYS, rng.randint(4, 6))
+        availabilities.append(json.dumps({day: f'{start}:00-{start + rng.choice([6, 8, 10])}:00' for day in days}))
+    providers = provider_arrays(
+        list(range(1, n_providers + 1)),
+        [f'{rng.choice(AREAS)}, Kathmandu' for _ in range(n_providers)],
+        availabilities,
+        [round(min(5.0, max(1.0, rng.gauss(4.0, 0.6))), 2) for _ in range(n_providers)],
+        [rng.choice([0, 0, 1, 2, 3]) for _ in range(n_providers)]
+    )
+    requests = request_arrays(
+        list(range(n_providers + 1, n_providers + n_requests + 1)),
+        [f'{rng.choice(AREAS)}, Kathmandu' for _ in range(n_requests)],
+        [monday + timedelta(days=rng.randint(0, 6), hours=rng.randint(8, 16)) for _ in range(n_requests)],
+        [rng.choice([1, 2, 2, 3, 4]) for _ in range(n_requests)]
+    )
+    return requests, providers
+
+
+def customer_choice(scores, providers):
+    """Today: each customer books the best-rated provider they can reach, whatever that provider's load"""
+    rating = np.where(np.isfinite(scores), providers['rating'][None, :], -np.inf)
+    picks = np.argmax(rating, axis=1)
+    reachable = np.isfinite(rating[np.arange(len(picks)), picks])
+    # Bookings beyond a provider's capacity go unanswered
+    remaining = np.maximum(providers['capacity'] - providers['load'], 0)
+    pairs = []
+    for r in np.flatnonzero(reachable).tolist():
+        p = int(picks[r])
+        if remaining[p] > 0:
+            remaining[p] -= 1
+            pairs.append((r, p))
+    return pairs
+
+
+def report(name, pairs, elapsed, requests, providers):
+    if pairs:
+        r, p = (np.array(x) for x in zip(*pairs))
+        distance = haversine_km(requests['lat'][r], requests['lon'][r], providers['lat'][p], providers['lon'][p])
+        per_provider = np.bincount(p, minlength=len(providers['user_id']))
+        rating = providers['rating'][p].mean()
+    else:
+        distance, per_provider, rating = np.zeros(1), np.zeros(1, dtype=int), 0.0
+    print(f"  {name:16} {elapsed * 1000:8.1f} ms  assigned {len(pairs) / len(requests['start']):6.1%}  "
+          f"distance {distance.mean():5.2f} km  rating {rating:4.2f}  "
+          f"providers with work {np.count_nonzero(per_provider) / len(per_provider):6.1%}  max jobs {per_provider.max():2d}")
+
+
+def main():
+    for n_requests, n_providers in SCENARIOS:
+        requests, providers = simulate(n_requests, n_providers)
+        print(f"{n_requests} requests, {n_providers} providers (capacity {MAX_ACTIVE_BOOKINGS} each)")
+
+        start = time.perf_counter()
+        scores = score_candidates(requests, providers)
+        print(f"  {'scoring':16} {(time.perf_counter() - start) * 1000:8.1f} ms")
+        slots = np.maximum(providers['capacity'] - providers['load'], 0)
+
+        start = time.perf_counter()
+        pairs = customer_choice(scores, providers)
+        report('customer choice', pairs, time.perf_counter() - start, requests, providers)
+
+        start = time.perf_counter()
+        pairs = solve(scores, slots, 'greedy', requests)
+        report('greedy', pairs, time.perf_counter() - start, requests, providers)
+
+        if linear_sum_assignment is not None and n_requests <= OPTIMAL_MAX_REQUESTS:
+            start = time.perf_counter()
+            pairs = solve(scores, slots, 'optimal', requests)
+            report('optimal', pairs, time.perf_counter() - start, requests, providers)
+
+
+if __name__ == '__main__':
+    main()
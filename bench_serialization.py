@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the list endpoint serialization paths.
+Compares ORM hydration + to_dict() + jsonify() against the column-projected
+path in src/models/projection.py and the pre-encoded provider listing in
+src/models/listing.py, and checks both produce identical bytes.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from flask import Flask, jsonify
+from src.models.user import db, User, ServiceProvider, ServiceCategory, Booking, Review
+from src.models.projection import (
+    PROVIDER_PROJECTION, BOOKING_PROJECTION, REVIEW_PROJECTION, ADMIN_USER_PROJECTION,
+    provider_rows, booking_rows, review_rows, json_response
+)
+from src.models.listing import ProviderListing, PROVIDER_LISTING_PROJECTION, listing_rows, refresh_provider_listings
+
+PROVIDERS = 2000
+CUSTOMERS = 2000
+BOOKINGS = 10000
+REPEAT = 5
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed():
+    rng = random.Random(42)
+    now = datetime(2024, 1, 1)
+    db.session.bulk_insert_mappings(ServiceCategory, [
+        {'id': i + 1, 'name': name, 'description': f'{name} services', 'icon': 'wrench', 'is_active': True}
+        for i, name in enumerate(['Plumber', 'Electrician', 'Cleaner', 'Tutor', 'Mechanic', 'Handyman'])
+    ])
+    db.session.bulk_insert_mappings(User, [
+        {
+            'id': i, 'username': f'user{i}', 'email': f'user{i}@demo.com', 'password_hash': 'x',
+            'full_name': f'User Sharma {i}', 'phone': '+977-9841234567',
+            'user_type': 'service_provider' if i <= PROVIDERS else 'customer',
+            'location': rng.choice(['Thamel, Kathmandu', 'Lalitpur', 'Baneshwor, Kathmandu', 'Bhaktapur']),
+            'created_at': now - timedelta(days=rng.randint(0, 700)), 'is_active': True
+        }
+        for i in range(1, PROVIDERS + CUSTOMERS + 1)
+    ])
+    db.session.bulk_insert_mappings(ServiceProvider, [
+        {
+            'id': i, 'user_id': i, 'skills': json.dumps(['Plumbing', 'Electrical work']),
+            'hourly_rate': float(rng.randint(300, 1500)), 'experience_years': rng.randint(0, 20),
+            'description': 'Experienced professional in Kathmandu.', 'availability': json.dumps({'monday': '9:00-17:00'}),
+            'rating': round(rng.uniform(1, 5), 2), 'total_reviews': rng.randint(0, 50),
+            'is_verified': rng.random() < 0.5, 'created_at': now - timedelta(days=rng.randint(0, 700))
+        }
+        for i in range(1, PROVIDERS + 1)
+    ])
+    db.session.bulk_insert_mappings(Booking, [
+        {
+            'id': i, 'customer_id': rng.randint(PROVIDERS + 1, PROVIDERS + CUSTOMERS), 'provider_id': rng.randint(1, PROVIDERS),
+            'service_category_id': rng.randint(1, 6), 'title': 'Fix kitchen sink', 'description': 'Leaking pipe',
+            'scheduled_date': now + timedelta(hours=i), 'estimated_hours': 2.0, 'total_amount': 1600.0,
+            'status': 'completed', 'customer_location': 'Thamel, Kathmandu',
+            'created_at': now - timedelta(minutes=i), 'updated_at': now
+        }
+        for i in range(1, BOOKINGS + 1)
+    ])
+    bookings = db.session.query(Booking.id, Booking.customer_id, Booking.provider_id).all()
+    db.session.bulk_insert_mappings(Review, [
+        {
+            'customer_id': customer_id, 'provider_id': provider_id, 'booking_id': booking_id,
+            'rating': rng.randint(1, 5), 'comment': 'Good work', 'created_at': now - timedelta(minutes=booking_id)
+        }
+        for booking_id, customer_id, provider_id in bookings
+    ])
+    db.session.commit()
+
+
+def best_of(fn):
+    best = None
+    for _ in range(REPEAT):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        body = fn().get_data()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def decoded(provider):
+    """ServiceProvider.to_dict() with skills and availability decoded, the shape the listing serves"""
+    data = provider.to_dict()
+    for key in ('skills', 'availability'):
+        data[key] = json.loads(data[key]) if data[key] else data[key]
+    return data
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed()
+        refresh_provider_listings()
+        db.session.commit()
+
+        cases = [
+            ('get_providers',
+             lambda: jsonify([p.to_dict() for p in ServiceProvider.query.join(User).filter(User.is_active == True).all()]),
+             lambda: json_response(PROVIDER_PROJECTION.serialize_all(provider_rows().filter(User.is_active == True)))),
+            ('get_providers (listing)',
+             lambda: jsonify([decoded(p) for p in ServiceProvider.query.join(User).filter(User.is_active == True).all()]),
+             lambda: json_response(PROVIDER_LISTING_PROJECTION.serialize_all(
+                 listing_rows().filter(ProviderListing.is_active == True)))),
+            ('get_bookings (provider 1..50)',
+             lambda: jsonify([b.to_dict() for b in Booking.query.filter(Booking.provider_id <= 50).order_by(Booking.created_at.desc()).all()]),
+             lambda: json_response(BOOKING_PROJECTION.serialize_all(
+                 booking_rows().filter(Booking.provider_id <= 50).order_by(Booking.created_at.desc())))),
+            ('get_reviews',
+             lambda: jsonify([r.to_dict() for r in Review.query.order_by(Review.created_at.desc()).all()]),
+             lambda: json_response(REVIEW_PROJECTION.serialize_all(review_rows().order_by(Review.created_at.desc())))),
+            ('admin users',
+             lambda: jsonify([{
+                 'id': u.id, 'username': u.username, 'email': u.email, 'full_name': u.full_name, 'phone': u.phone,
+                 'user_type': u.user_type, 'location': u.location, 'is_active': u.is_active,
+                 'created_at': u.created_at.isoformat()
+             } for u in User.query.all()]),
+             lambda: json_response(ADMIN_USER_PROJECTION.serialize_all(ADMIN_USER_PROJECTION.query()))),
+        ]
+
+        print(f'{"endpoint":<32}{"orm (ms)":>12}{"projected (ms)":>16}{"speedup":>10}  identical')
+        for name, orm_path, fast_path in cases:
+            with app.test_request_context():
+                orm_time, orm_body = best_of(orm_path)
+                fast_time, fast_body = best_of(fast_path)
+            print(f'{name:<32}{orm_time * 1000:>12.1f}{fast_time * 1000:>16.1f}{orm_time / fast_time:>9.1f}x  {orm_body == fast_body}')
+            if orm_body != fast_body:
+                sys.exit(f'{name}: projected output differs from to_dict() output')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Write throughput benchmark for region shards (src/sharding.py).
+Several writer processes each commit bookings, one per transaction, the
+way create_booking does: into a single database file, then spread over
+2 and 4 shard files. SQLite allows one writer per file at a time, so the
+single file serializes every commit while shards commit side by side.
+Both layouts run in WAL mode, so only the number of files differs.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import multiprocessing
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+WRITERS = 4
+WRITES_PER_WRITER = 300
+SHARD_COUNTS = [None, 2, 4]
+
+
+def make_app(directory, shard_count):
+    from src.main import create_app
+    from src.sharding import SHARD_NAMES
+    config = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'app.db')}"}
+    if shard_count:
+        config['SHARD_DIRECTORY'] = os.path.join(directory, 'shards')
+        config['SHARD_NAMES'] = SHARD_NAMES[:shard_count]
+    return create_app(config)
+
+
+def writer(directory, shard_count, index, start_event, results):
+    from src.models.user import db, Booking
+    from src.models.earnings import booking_snapshot, apply_booking_rollup
+    from src.sharding import shard_names, use_shard
+
+    app = make_app(directory, shard_count)
+    shards = shard_names()
+    shard = shards[index % len(shards)]
+    scheduled = datetime.utcnow() + timedelta(days=1)
+    start_event.wait()
+    started = time.perf_counter()
+    with app.app_context(), use_shard(shard):
+        for i in range(WRITES_PER_WRITER):
+            booking = Booking(
+                customer_id=1, provider_id=2 + index, service_category_id=1, title=f'Job {i}',
+                description='Benchmark', scheduled_date=scheduled + timedelta(hours=i),
+                estimated_hours=2, total_amount=1000.0, customer_location='Thamel, Kathmandu'
+            )
+            db.session.add(booking)
+            apply_booking_rollup(booking_snapshot(booking))
+            db.session.commit()
+    results.put(time.perf_counter() - started)
+
+
+def run(shard_count):
+    from src.main import prepare_database
+    from src.models.user import db
+
+    directory = tempfile.mkdtemp(prefix='bench_sharding_')
+    try:
+        app = make_app(directory, shard_count)
+        prepare_database(app)
+        with app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(text('PRAGMA journal_mode=WAL'))
+            db.engine.dispose()
+
+        start_event = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=writer, args=(directory, shard_count, i, start_event, results))
+                     for i in range(WRITERS)]
+        for process in processes:
+            process.start()
+        time.sleep(0.5)
+        started = time.perf_counter()
+        start_event.set()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+        slowest = max(results.get() for _ in processes)
+
+        label = f'{shard_count} shards' if shard_count else 'single file'
+        print(f"  {label:12} {WRITERS * WRITES_PER_WRITER / elapsed:8.0f} commits/s  "
+              f"slowest writer {slowest:6.2f} s")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    print(f"{WRITERS} writer processes, {WRITES_PER_WRITER} booking commits each")
+    for shard_count in SHARD_COUNTS:
+        run(shard_count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for Sajilo Sewa.
+Measures, in fresh interpreters, how long importing src.main and building
+the app with create_app() take, how long the one-off prepare_database()
+step takes, and the latency of the first API request; then how quickly a
+forked worker from a preloaded parent answers its first request.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import json
+import statistics
+import subprocess
+import tempfile
+
+RUNS = 5
+
+COLD_START = r'''
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+from src.main import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+client = app.test_client()
+response = client.get('/api/services/categories')
+t3 = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({{'import_ms': (t1 - t0) * 1000, 'create_app_ms': (t2 - t1) * 1000,
+                  'first_request_ms': (t3 - t2) * 1000}}))
+'''
+
+PREPARE = r'''
+import json, sys, time
+sys.path.insert(0, {root!r})
+from src.main import create_app, prepare_database
+app = create_app()
+t0 = time.perf_counter()
+prepare_database(app)
+print(json.dumps({{'prepare_ms': (time.perf_counter() - t0) * 1000}}))
+'''
+
+FORKED_WORKER = r'''
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+from src.main import create_app
+app = create_app()
+read_fd, write_fd = os.pipe()
+t0 = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    response = app.test_client().get('/api/services/categories')
+    os.write(write_fd, str(response.status_code).encode())
+    os._exit(0)
+status = os.read(read_fd, 16)
+t1 = time.perf_counter()
+os.waitpid(pid, 0)
+assert status == b'200', status
+print(json.dumps({{'forked_first_request_ms': (t1 - t0) * 1000}}))
+'''
+
+
+def run(snippet, env):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', snippet.format(root=root)], env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'app.db')}")
+
+        print(f"prepare_database (once per deploy): {run(PREPARE, env)['prepare_ms']:.1f} ms")
+
+        results = {}
+        for snippet in (COLD_START, FORKED_WORKER):
+            for _ in range(RUNS):
+                for key, value in run(snippet, env).items():
+                    results.setdefault(key, []).append(value)
+
+        print(f"\n{'measurement':<28}{'median (ms)':>14}{'min (ms)':>12}")
+        for key, values in results.items():
+            print(f"{key:<28}{statistics.median(values):>14.1f}{min(values):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark for static asset serving.
+Compares the previous os.path.exists + send_from_directory route with the
+startup manifest in src/static_assets.py on a synthetic frontend build.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import random
+import shutil
+import string
+import tempfile
+import time
+from flask import Flask, send_from_directory
+from src.static_assets import StaticManifest, serve_asset
+
+REQUESTS = 2000
+
+
+def build_static_folder():
+    folder = tempfile.mkdtemp()
+    os.makedirs(os.path.join(folder, 'assets'))
+    rng = random.Random(42)
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(2000)]
+    with open(os.path.join(folder, 'index.html'), 'w') as f:
+        f.write('<!doctype html><html><head><script type="module" src="/assets/index-4f9a1c2e.js"></script>'
+                '</head><body><div id="root"></div></body></html>')
+    with open(os.path.join(folder, 'assets', 'index-4f9a1c2e.js'), 'w') as f:
+        f.write(';'.join(f'const {rng.choice(words)}_{i}="{rng.choice(words)}"' for i in range(40000)))
+    with open(os.path.join(folder, 'assets', 'index-8b2d7e11.css'), 'w') as f:
+        f.write('\n'.join(f'.{rng.choice(words)}-{i}{{margin:{i % 16}px}}' for i in range(5000)))
+    return folder
+
+
+def legacy_app(folder):
+    app = Flask(__name__, static_folder=folder)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if path != "" and os.path.exists(os.path.join(folder, path)):
+            return send_from_directory(folder, path)
+        return send_from_directory(folder, 'index.html')
+
+    return app
+
+
+def manifest_app(folder):
+    app = Flask(__name__, static_folder=folder)
+    manifest = StaticManifest(folder)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        return serve_asset(manifest.lookup(path))
+
+    return app
+
+
+def run(app, path, headers):
+    client = app.test_client()
+    transferred = 0
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = client.get(path, headers=headers)
+        transferred = len(response.get_data())
+        response.close()
+    return (time.perf_counter() - start) / REQUESTS * 1e6, transferred
+
+
+def main():
+    folder = build_static_folder()
+    try:
+        start = time.perf_counter()
+        apps = {'legacy': legacy_app(folder), 'manifest': manifest_app(folder)}
+        print(f'manifest built in {(time.perf_counter() - start) * 1000:.1f} ms\n')
+
+        headers = {'Accept-Encoding': 'gzip, deflate, br'}
+        cases = [('/assets/index-4f9a1c2e.js', 'bundle'), ('/assets/index-8b2d7e11.css', 'stylesheet'),
+                 ('/', 'index'), ('/provider/42', 'SPA route')]
+        print(f'{"request":<14}{"route":<10}{"us/request":>12}{"bytes sent":>12}')
+        for path, label in cases:
+            for name, app in apps.items():
+                per_request, size = run(app, path, headers)
+                print(f'{label:<14}{name:<10}{per_request:>12.1f}{size:>12}')
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
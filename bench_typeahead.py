@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the provider typeahead index in src/models/typeahead.py.
+Seeds an in-memory database, builds the index and reports lookup latency
+per prefix length, plus the cost of an incremental update.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import json
+import random
+import time
+from flask import Flask
+from src.models.user import db, User, ServiceProvider
+from src.models.typeahead import PrefixIndex
+
+PROVIDERS = 20000
+LOOKUPS = 2000
+BUDGET_MS = 1.0
+
+FIRST_NAMES = ['Ram', 'Sita', 'Hari', 'Gita', 'Bikash', 'Anita', 'Suresh', 'Puja', 'Rajesh', 'Sunita']
+LAST_NAMES = ['Sharma', 'Thapa', 'Shrestha', 'Gurung', 'Tamang', 'Rai', 'Karki', 'Adhikari', 'Magar', 'Poudel']
+SKILLS = ['Plumbing', 'Pipe fitting', 'Electrical work', 'Wiring', 'House cleaning', 'Math tutoring',
+          'English tutoring', 'Bike repair', 'Car repair', 'Carpentry', 'Painting', 'Furniture assembly']
+LOCATIONS = ['Thamel, Kathmandu', 'Baneshwor, Kathmandu', 'Lalitpur', 'Bhaktapur', 'Pokhara', 'Biratnagar']
+QUERIES = ['p', 'pl', 'plu', 'plumb', 'sh', 'sharma', 'ram sh', 'kath', 'lalitpur', 'e', 'eng', 'wiring', 'xyz']
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed():
+    rng = random.Random(42)
+    db.session.bulk_insert_mappings(User, [
+        {
+            'id': i, 'username': f'user{i}', 'email': f'user{i}@demo.com', 'password_hash': 'x',
+            'full_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'user_type': 'service_provider', 'location': rng.choice(LOCATIONS), 'is_active': rng.random() < 0.95
+        }
+        for i in range(1, PROVIDERS + 1)
+    ])
+    db.session.bulk_insert_mappings(ServiceProvider, [
+        {
+            'id': i, 'user_id': i, 'skills': json.dumps(rng.sample(SKILLS, rng.randint(1, 3))),
+            'hourly_rate': float(rng.randint(300, 1500)),
+            'rating': round(rng.uniform(1, 5), 2), 'total_reviews': rng.randint(0, 50)
+        }
+        for i in range(1, PROVIDERS + 1)
+    ])
+    db.session.commit()
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed()
+
+        index = PrefixIndex()
+        start = time.perf_counter()
+        index.rebuild()
+        print(f"Built index over {PROVIDERS} providers in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        rng = random.Random(7)
+        over_budget = False
+        for query in QUERIES:
+            index.search(query)  # fills the short-prefix cache, as the first real request would
+            samples = []
+            for _ in range(LOOKUPS):
+                start = time.perf_counter()
+                results = index.search(query)
+                samples.append((time.perf_counter() - start) * 1000)
+            p50, p99 = percentile(samples, 0.5), percentile(samples, 0.99)
+            over_budget |= p99 > BUDGET_MS
+            print(f"  {query!r:10} {len(results):2} results  p50 {p50 * 1000:6.1f} us  p99 {p99 * 1000:6.1f} us")
+
+        samples = []
+        for _ in range(50):
+            user_id = rng.randint(1, PROVIDERS)
+            db.session.execute(
+                ServiceProvider.__table__.update()
+                .where(ServiceProvider.__table__.c.user_id == user_id)
+                .values(rating=round(rng.uniform(1, 5), 2))
+            )
+            db.session.commit()
+            start = time.perf_counter()
+            index.update([user_id])
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"Incremental update: p50 {percentile(samples, 0.5):.2f} ms  p99 {percentile(samples, 0.99):.2f} ms")
+
+    if over_budget:
+        print(f"Some lookups exceeded the {BUDGET_MS} ms budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,24 @@
 from flask import Blueprint, jsonify, request, session
-from src.models.user import User, Booking, ServiceCategory, db
+from src.models.user import User, Booking, ArchivedBooking, ServiceCategory, db
+from src.models.earnings import (
+    PERIOD_TYPES, booking_snapshot, apply_booking_rollup, move_booking_rollup, get_provider_series
+)
+from src.models.projection import (
+    BOOKING_PROJECTION, ARCHIVED_BOOKING_PROJECTION, booking_rows, archived_booking_rows, json_response
+)
+from src.models.dispatch import ServiceRequest
+from src.models.analytics import remove_booking_from_analytics
+from src.idempotency import idempotent
+from src.sharding import fan_out, home_shard, select_shard, shard_for_id, shard_for_location
+from src.events import event_stream, publish_booking_event
 from datetime import datetime
+import heapq
 
 bookings_bp = Blueprint('bookings', __name__)
 
+def created_at_key(item):
+    return item['created_at'] or ''
+
 @bookings_bp.route('/', methods=['GET'])
 def get_bookings():
     if 'user_id' not in session:
@@ -16,24 +31,87 @@ def get_bookings():
         # Get query parameters
         status = request.args.get('status')
         role = request.args.get('role')  # 'customer' or 'provider'
+        history = request.args.get('history', type=int)  # include archived bookings
         
         # Base query based on user role
-        if role == 'provider' or (not role and user.user_type == 'service_provider'):
-            query = Booking.query.filter_by(provider_id=user_id)
-        else:
-            query = Booking.query.filter_by(customer_id=user_id)
-        
-        # Apply status filter
-        if status:
-            query = query.filter_by(status=status)
-        
-        bookings = query.order_by(Booking.created_at.desc()).all()
-        return jsonify([booking.to_dict() for booking in bookings])
+        as_provider = role == 'provider' or (not role and user.user_type == 'service_provider')
+        
+        def load():
+            if as_provider:
+                query = booking_rows().filter(Booking.provider_id == user_id)
+            else:
+                query = booking_rows().filter(Booking.customer_id == user_id)
+            
+            # Apply status filter
+            if status:
+                query = query.filter(Booking.status == status)
+            
+            rows = query.order_by(Booking.created_at.desc())
+            bookings = BOOKING_PROJECTION.serialize_all(rows)
+            
+            if history:
+                # Only history views pay for reading the archive
+                if as_provider:
+                    archived = archived_booking_rows().filter(ArchivedBooking.provider_id == user_id)
+                else:
+                    archived = archived_booking_rows().filter(ArchivedBooking.customer_id == user_id)
+                if status:
+                    archived = archived.filter(ArchivedBooking.status == status)
+                archived = ARCHIVED_BOOKING_PROJECTION.serialize_all(archived.order_by(ArchivedBooking.created_at.desc()))
+                bookings = list(heapq.merge(bookings, archived, key=created_at_key, reverse=True))
+            return bookings
+        
+        # A provider's bookings all live in their home shard; a customer's may be in any
+        shards = [home_shard(user_id)] if as_provider else None
+        bookings = list(heapq.merge(*fan_out(load, shards), key=created_at_key, reverse=True))
+        
+        return json_response(bookings)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bookings_bp.route('/earnings', methods=['GET'])
+def get_provider_earnings():
+    """Earnings, completed jobs and hours by week or month for the current provider"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    try:
+        user = User.query.get(session['user_id'])
+        if user.user_type != 'service_provider':
+            return jsonify({'error': 'Not a service provider'}), 403
+        
+        period = request.args.get('period', 'week')
+        if period not in PERIOD_TYPES:
+            return jsonify({'error': 'Period must be week or month'}), 400
+        
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.fromisoformat(start).date() if start else None
+        end = datetime.fromisoformat(end).date() if end else None
+        
+        select_shard(home_shard(session['user_id']))
+        return jsonify({
+            'provider_id': session['user_id'],
+            'period': period,
+            'series': get_provider_series(session['user_id'], period, start, end)
+        })
+        
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bookings_bp.route('/stream', methods=['GET'])
+def stream_bookings():
+    """Server-Sent Events stream of booking changes for the current user"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    return event_stream(session['user_id'])
+
 @bookings_bp.route('/', methods=['POST'])
+@idempotent
 def create_booking():
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
@@ -56,6 +134,9 @@ def create_booking():
         if not category:
             return jsonify({'error': 'Invalid service category'}), 400
         
+        # The booking is stored with its provider's profile and rollups
+        select_shard(home_shard(provider.id))
+        
         # Parse scheduled date
         scheduled_date = datetime.fromisoformat(data['scheduled_date'].replace('Z', '+00:00'))
         
@@ -76,21 +157,100 @@ def create_booking():
             booking.total_amount = booking.estimated_hours * provider.service_provider_profile.hourly_rate
         
         db.session.add(booking)
+        apply_booking_rollup(booking_snapshot(booking))
         db.session.commit()
         
+        publish_booking_event('booking_created', booking)
+        
         return jsonify(booking.to_dict()), 201
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+# Open requests: the customer names category, time and place; the dispatch job picks the provider
+@bookings_bp.route('/requests', methods=['POST'])
+@idempotent
+def create_service_request():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    try:
+        data = request.json
+        
+        # Validate service category exists
+        category = ServiceCategory.query.get(data['service_category_id'])
+        if not category:
+            return jsonify({'error': 'Invalid service category'}), 400
+        
+        scheduled_date = datetime.fromisoformat(data['scheduled_date'].replace('Z', '+00:00'))
+        
+        # Dispatched from the shard of the area it is in, among the providers stored there
+        select_shard(shard_for_location(data['customer_location']))
+        service_request = ServiceRequest(
+            customer_id=session['user_id'],
+            service_category_id=data['service_category_id'],
+            title=data['title'],
+            description=data['description'],
+            scheduled_date=scheduled_date,
+            estimated_hours=data.get('estimated_hours'),
+            customer_location=data['customer_location']
+        )
+        db.session.add(service_request)
+        db.session.commit()
+        
+        return jsonify(service_request.to_dict()), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bookings_bp.route('/requests', methods=['GET'])
+def get_service_requests():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    def load():
+        service_requests = ServiceRequest.query.filter(ServiceRequest.customer_id == session['user_id']) \
+            .order_by(ServiceRequest.created_at.desc()).all()
+        return [service_request.to_dict() for service_request in service_requests]
+    
+    return jsonify(list(heapq.merge(*fan_out(load), key=created_at_key, reverse=True)))
+
+@bookings_bp.route('/requests/<int:request_id>', methods=['DELETE'])
+def cancel_service_request(request_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    try:
+        select_shard(shard_for_id(request_id))
+        service_request = ServiceRequest.query.get_or_404(request_id)
+        if service_request.customer_id != session['user_id']:
+            return jsonify({'error': 'Access denied'}), 403
+        
+        # Conditional, so a request the dispatch job has just assigned is not cancelled under it
+        cancelled = ServiceRequest.query.filter(
+            ServiceRequest.id == request_id, ServiceRequest.status == 'open'
+        ).update({'status': 'cancelled'}, synchronize_session=False)
+        db.session.commit()
+        
+        if not cancelled:
+            return jsonify({'error': 'Request is no longer open'}), 409
+        return '', 204
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @bookings_bp.route('/<int:booking_id>', methods=['GET'])
 def get_booking(booking_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
     user_id = session['user_id']
-    booking = Booking.query.get_or_404(booking_id)
+    select_shard(shard_for_id(booking_id))
+    # Old completed and cancelled bookings are looked up in the archive only on a miss
+    booking = Booking.query.get(booking_id) or ArchivedBooking.query.get_or_404(booking_id)
     
     # Check if user is involved in this booking
     if booking.customer_id != user_id and booking.provider_id != user_id:
@@ -99,16 +259,16 @@ def get_booking(booking_id):
     return jsonify(booking.to_dict())
 
 @bookings_bp.route('/<int:booking_id>/status', methods=['PUT'])
-def update_booking_status():
+def update_booking_status(booking_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
     try:
         data = request.json
         user_id = session['user_id']
-        booking_id = data.get('booking_id')
         new_status = data.get('status')
         
+        select_shard(shard_for_id(booking_id))
         booking = Booking.query.get_or_404(booking_id)
         
         # Check permissions based on status change
@@ -133,10 +293,14 @@ def update_booking_status():
         if new_status not in valid_transitions.get(booking.status, []):
             return jsonify({'error': f'Invalid status transition from {booking.status} to {new_status}'}), 400
         
+        before = booking_snapshot(booking)
         booking.status = new_status
         booking.updated_at = datetime.utcnow()
+        move_booking_rollup(before, booking_snapshot(booking))
         db.session.commit()
         
+        publish_booking_event('booking_status_changed', booking)
+        
         return jsonify(booking.to_dict())
         
     except Exception as e:
@@ -151,6 +315,7 @@ def update_booking(booking_id):
     try:
         data = request.json
         user_id = session['user_id']
+        select_shard(shard_for_id(booking_id))
         booking = Booking.query.get_or_404(booking_id)
         
         # Only customer can update booking details, and only if pending
@@ -160,6 +325,8 @@ def update_booking(booking_id):
         if booking.status != 'pending':
             return jsonify({'error': 'Can only update pending bookings'}), 400
         
+        before = booking_snapshot(booking)
+        
         # Update allowed fields
         if 'title' in data:
             booking.title = data['title']
@@ -177,6 +344,7 @@ def update_booking(booking_id):
             booking.customer_location = data['customer_location']
         
         booking.updated_at = datetime.utcnow()
+        move_booking_rollup(before, booking_snapshot(booking))
         db.session.commit()
         
         return jsonify(booking.to_dict())
@@ -192,6 +360,7 @@ def delete_booking(booking_id):
     
     try:
         user_id = session['user_id']
+        select_shard(shard_for_id(booking_id))
         booking = Booking.query.get_or_404(booking_id)
         
         # Only customer can delete booking, and only if pending
@@ -201,6 +370,8 @@ def delete_booking(booking_id):
         if booking.status != 'pending':
             return jsonify({'error': 'Can only delete pending bookings'}), 400
         
+        apply_booking_rollup(booking_snapshot(booking), -1)
+        remove_booking_from_analytics(booking)
         db.session.delete(booking)
         db.session.commit()
         
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check for Sajilo Sewa.
+Builds the schema through the migrations, runs EXPLAIN QUERY PLAN for the
+queries each endpoint issues, and exits non-zero if any of them does a
+full table scan that is not expected for that endpoint.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import re
+import tempfile
+from flask import Flask
+from sqlalchemy import func
+from sqlalchemy.dialects import sqlite
+from src.models.user import db, User, ServiceProvider, Booking, Review
+from src.models.projection import booking_rows, review_rows
+from src.models.listing import ProviderListing, listing_rows
+from src.models.earnings import ProviderRollup
+from src.models.analytics import PlatformBookingStat
+from src.models.migrations import migrate
+
+SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?')
+
+
+def endpoint_queries():
+    """(name, query, tables allowed to be scanned in full)"""
+    return [
+        ('get_providers', listing_rows().filter(ProviderListing.is_active == True), {'provider_listing'}),
+        ('get_providers?sort=rank',
+         listing_rows().filter(ProviderListing.is_active == True)
+         .order_by(ProviderListing.rank_score.desc(), ProviderListing.provider_id).limit(20),
+         set()),
+        ('get_provider', listing_rows().filter(ProviderListing.provider_id == 1), set()),
+        ('get_bookings (customer)',
+         booking_rows().filter(Booking.customer_id == 1).order_by(Booking.created_at.desc()), set()),
+        ('get_bookings (provider, status)',
+         booking_rows().filter(Booking.provider_id == 1, Booking.status == 'pending').order_by(Booking.created_at.desc()), set()),
+        ('get_reviews', review_rows().order_by(Review.created_at.desc()), {'review'}),
+        ('get_reviews?provider_id',
+         review_rows().filter(Review.provider_id == 1).order_by(Review.created_at.desc()), set()),
+        ('get_reviews?customer_id',
+         review_rows().filter(Review.customer_id == 1).order_by(Review.created_at.desc()), set()),
+        ('get_reviews?booking_id', review_rows().filter(Review.booking_id == 1), set()),
+        ('create_review (existing review)', Review.query.filter_by(booking_id=1).limit(1), set()),
+        ('get_provider_review_stats',
+         db.session.query(Review.rating, func.count(Review.id)).filter_by(provider_id=1).group_by(Review.rating), set()),
+        ('update_provider_rating (profile)', ServiceProvider.query.filter_by(user_id=1).limit(1), set()),
+        ('get_my_provider_profile', ServiceProvider.query.filter_by(user_id=1), set()),
+        ('get_provider_earnings',
+         ProviderRollup.query.filter_by(provider_id=1, period_type='week').order_by(ProviderRollup.period_start), set()),
+        ('analytics rollup (changed bookings)',
+         db.session.query(Booking.id, Booking.status).filter(Booking.updated_at >= '2024-01-01').order_by(Booking.updated_at),
+         set()),
+        ('get_admin_analytics',
+         PlatformBookingStat.query.filter_by(bucket_type='day').filter(PlatformBookingStat.bucket_start >= '2024-01-01'),
+         set()),
+    ]
+
+
+def full_scans(plan, allowed):
+    scans = []
+    for detail in plan:
+        match = SCAN.match(detail)
+        if not match or 'USING' in detail:
+            continue
+        table = match.group(1)
+        if table not in allowed:
+            scans.append(detail)
+    return scans
+
+
+def main():
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_file.name}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    failures = 0
+    try:
+        with app.app_context():
+            migrate(db.engine)
+            for name, query, allowed in endpoint_queries():
+                sql = str(query.statement.compile(dialect=sqlite.dialect(), compile_kwargs={'literal_binds': True}))
+                plan = [row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}'))]
+                scans = full_scans(plan, allowed)
+                status = 'FULL SCAN' if scans else 'ok'
+                print(f'{name:<40}{status}')
+                for detail in plan:
+                    print(f'    {detail}')
+                failures += bool(scans)
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        os.unlink(db_file.name)
+
+    if failures:
+        sys.exit(f'{failures} query plan(s) regressed to a full table scan')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+import gzip
+import os
+import threading
+import zlib
+from datetime import datetime
+from flask import current_app, request
+from src.static_assets import COMPRESSIBLE_TYPES, choose_encoding
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Level 1-11 is the brotli quality and the gzip level, capped at 9; 0 leaves the endpoint uncompressed
+DEFAULT_LEVEL = 5
+# Below this a compressed body plus its headers is rarely smaller than the plain one
+DEFAULT_MIN_SIZE = 1024
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+class PayloadMetrics:
+    """Response bytes per endpoint in this worker, as produced and as sent"""
+
+    def __init__(self):
+        self.since = datetime.utcnow()
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, endpoint):
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = {
+                'responses': 0, 'compressed_responses': 0, 'uncompressed_bytes': 0, 'sent_bytes': 0,
+                'max_sent_bytes': 0, 'over_budget': 0
+            }
+        return stats
+
+    def record(self, endpoint, uncompressed, sent, encoding=None, budget=None):
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats['responses'] += 1
+            stats['compressed_responses'] += encoding is not None
+            stats['uncompressed_bytes'] += uncompressed
+            stats['sent_bytes'] += sent
+            stats['max_sent_bytes'] = max(stats['max_sent_bytes'], sent)
+            if budget is not None and sent > budget:
+                stats['over_budget'] += 1
+
+    def add_bytes(self, endpoint, uncompressed, sent):
+        """Bytes of a streamed response, counted as its chunks go out"""
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats['uncompressed_bytes'] += uncompressed
+            stats['sent_bytes'] += sent
+
+    def snapshot(self, budgets):
+        with self._lock:
+            endpoints = {endpoint: dict(stats) for endpoint, stats in self._endpoints.items()}
+        result = []
+        for endpoint, stats in sorted(endpoints.items()):
+            stats['endpoint'] = endpoint
+            stats['compression_ratio'] = round(stats['sent_bytes'] / stats['uncompressed_bytes'], 3) \
+                if stats['uncompressed_bytes'] else None
+            stats['budget_bytes'] = budgets.get(endpoint)
+            result.append(stats)
+        return {'worker': os.getpid(), 'since': self.since.isoformat(), 'endpoints': result}
+
+
+def init_compression(app):
+    """Compress /api responses for clients that accept gzip or brotli.
+
+    COMPRESSION_LEVEL and COMPRESSION_MIN_SIZE are the defaults; override them
+    per endpoint with app.config['COMPRESSION_ENDPOINTS'][endpoint] = (level, min_size).
+    PAYLOAD_BUDGETS maps an endpoint to the bytes a response may take on the wire.
+    """
+    app.config.setdefault('COMPRESSION_ENABLED', True)
+    app.config.setdefault('COMPRESSION_LEVEL', DEFAULT_LEVEL)
+    app.config.setdefault('COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+    app.config.setdefault('COMPRESSION_ENDPOINTS', {})
+    app.config.setdefault('PAYLOAD_BUDGETS', {})
+    app.extensions['payload_metrics'] = PayloadMetrics()
+    app.after_request(compress_response)
+
+
+def endpoint_settings(app, endpoint):
+    """(level, min_size) of an endpoint, or None when its responses are sent as they are"""
+    if not app.config['COMPRESSION_ENABLED']:
+        return None
+    level, min_size = app.config['COMPRESSION_ENDPOINTS'].get(
+        endpoint, (app.config['COMPRESSION_LEVEL'], app.config['COMPRESSION_MIN_SIZE'])
+    )
+    return (level, min_size) if level > 0 else None
+
+
+def compressible(mimetype, status):
+    return 200 <= status and status not in (204, 304) and (mimetype or '').startswith(COMPRESSIBLE_TYPES)
+
+
+def compress_body(body, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=min(level, 9), mtime=0)
+
+
+def compress_payload(app, endpoint, accept_encoding, mimetype, status, body):
+    """Compress a complete response body when the endpoint, the content and the client allow it.
+
+    Returns (body, encoding, vary): encoding is None for a body sent as is,
+    and vary tells whether the response depends on Accept-Encoding.
+    Records the bytes in the payload metrics either way.
+    """
+    settings = endpoint_settings(app, endpoint)
+    vary = settings is not None and compressible(mimetype, status)
+    encoding = choose_encoding(accept_encoding, ENCODINGS) if vary else None
+    sent = body
+    if encoding is not None and len(body) >= settings[1]:
+        sent = compress_body(body, encoding, settings[0])
+    if len(sent) >= len(body):
+        sent, encoding = body, None
+
+    metrics = app.extensions.get('payload_metrics')
+    if metrics is not None:
+        metrics.record(endpoint, len(body), len(sent), encoding, app.config['PAYLOAD_BUDGETS'].get(endpoint))
+    return sent, encoding, vary
+
+
+class StreamCompressor:
+    """Compresses a response as it is generated, flushing after every chunk so events are not held back"""
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=min(level, 11))
+        else:
+            # wbits 31 writes the gzip header and trailer around the deflate stream
+            self._compressor = zlib.compressobj(min(level, 9), zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def _stream(chunks, compressor, metrics, endpoint):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            sent = compressor.compress(chunk) if compressor is not None else chunk
+            if metrics is not None:
+                metrics.add_bytes(endpoint, len(chunk), len(sent))
+            if sent:
+                yield sent
+        if compressor is not None:
+            tail = compressor.finish()
+            if metrics is not None:
+                metrics.add_bytes(endpoint, 0, len(tail))
+            yield tail
+    finally:
+        # Runs when the client goes away too, so the generator's own cleanup still happens
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response):
+    """after_request hook compressing /api responses"""
+    if not request.path.startswith('/api/') or request.method == 'HEAD' or response.direct_passthrough \
+            or 'Content-Encoding' in response.headers:
+        return response
+    app = current_app._get_current_object()
+    # Keyed by endpoint, never by path, so the metrics stay bounded whatever URLs clients send
+    endpoint = request.endpoint or 'unmatched'
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+
+    # Error pages from abort() arrive as an iterator too, but with their length known: they are buffered below
+    if response.is_streamed and response.content_length is None:
+        # The length is unknown up front, so streams skip the minimum size and the budget
+        settings = endpoint_settings(app, endpoint)
+        encoding = None
+        if settings is not None and compressible(response.mimetype, response.status_code):
+            response.vary.add('Accept-Encoding')
+            encoding = choose_encoding(accept_encoding, ENCODINGS)
+        metrics = app.extensions.get('payload_metrics')
+        if metrics is not None:
+            metrics.record(endpoint, 0, 0, encoding)
+        compressor = StreamCompressor(encoding, settings[0]) if encoding is not None else None
+        response.response = _stream(response.response, compressor, metrics, endpoint)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+            response.headers.pop('Content-Length', None)
+        return response
+
+    body, encoding, vary = compress_payload(app, endpoint, accept_encoding, response.mimetype,
+                                            response.status_code, response.get_data())
+    if vary:
+        response.vary.add('Accept-Encoding')
+    if encoding is not None:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # Each encoding is a separate representation and needs its own strong ETag
+            response.set_etag(f'{etag}-{encoding}')
+    return response
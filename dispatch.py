@@ -0,0 +1,449 @@
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func
+from src.models.user import db, User, ServiceProvider, ServiceCategory, Booking
+from src.models.earnings import booking_snapshot, apply_booking_rollup
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy is optional; the greedy solver needs only NumPy
+    linear_sum_assignment = None
+
+BATCH_SIZE = 5000
+# Each request only competes for its best few providers, which keeps solving linear in the batch size
+CANDIDATES_PER_REQUEST = 20
+MAX_DISTANCE_KM = 15.0
+DISTANCE_SCALE_KM = 5.0
+# Used when either side's location is not a known area
+UNKNOWN_DISTANCE_KM = 10.0
+MAX_ACTIVE_BOOKINGS = 8
+ACTIVE_STATUSES = ('pending', 'confirmed', 'in_progress')
+# Largest cost matrix handed to the optimal solver before falling back to greedy
+OPTIMAL_MAX_CELLS = 4000000
+
+DISPATCH_WEIGHTS = {
+    'distance': 0.45,
+    'rating': 0.30,
+    'load': 0.25
+}
+
+# Request and booking times are compared as whole minutes since this instant
+EPOCH = datetime(1970, 1, 1)
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+# Approximate centres of the areas customers and providers write in their locations
+AREA_COORDINATES = {
+    'thamel': (27.7153, 85.3123),
+    'baneshwor': (27.6915, 85.3420),
+    'koteshwor': (27.6789, 85.3494),
+    'kalanki': (27.6933, 85.2817),
+    'boudha': (27.7215, 85.3620),
+    'maharajgunj': (27.7383, 85.3317),
+    'kirtipur': (27.6787, 85.2775),
+    'patan': (27.6727, 85.3247),
+    'lalitpur': (27.6644, 85.3188),
+    'bhaktapur': (27.6710, 85.4298),
+    'kathmandu': (27.7172, 85.3240),
+    'pokhara': (28.2096, 83.9856),
+    'bharatpur': (27.6833, 84.4333),
+    'chitwan': (27.5291, 84.3542),
+    'butwal': (27.7006, 83.4484),
+    'hetauda': (27.4287, 85.0322),
+    'birgunj': (27.0104, 84.8770),
+    'janakpur': (26.7288, 85.9263),
+    'biratnagar': (26.4525, 87.2718),
+    'dharan': (26.8126, 87.2830),
+    'nepalgunj': (28.0500, 81.6167)
+}
+
+
+class ServiceRequest(db.Model):
+    """An open request: the customer names a category, time and place, and dispatch picks the provider"""
+    __tablename__ = 'service_request'
+    __table_args__ = (
+        db.Index('ix_service_request_status_created', 'status', 'created_at'),
+        db.Index('ix_service_request_customer_created', 'customer_id', 'created_at'),
+        {'sqlite_autoincrement': True}
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    service_category_id = db.Column(db.Integer, db.ForeignKey('service_category.id'), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    scheduled_date = db.Column(db.DateTime, nullable=False)
+    estimated_hours = db.Column(db.Float, nullable=True)
+    customer_location = db.Column(db.String(200), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='open')  # open, assigned, expired, cancelled
+    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    assigned_at = db.Column(db.DateTime, nullable=True)
+
+    # Relationships
+    service_category = db.relationship('ServiceCategory')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'customer_id': self.customer_id,
+            'service_category_id': self.service_category_id,
+            'title': self.title,
+            'description': self.description,
+            'scheduled_date': self.scheduled_date.isoformat() if self.scheduled_date else None,
+            'estimated_hours': self.estimated_hours,
+            'customer_location': self.customer_location,
+            'status': self.status,
+            'booking_id': self.booking_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'assigned_at': self.assigned_at.isoformat() if self.assigned_at else None,
+            'service_category': self.service_category.to_dict() if self.service_category else None
+        }
+
+
+def locate(text):
+    """(lat, lon) of the most specific known area in a free-text location, or None.
+
+    Addresses are written most specific first ("Thamel, Kathmandu"), so the
+    earliest area named wins.
+    """
+    if not text:
+        return None
+    lowered = text.casefold()
+    best = None
+    for area, coordinates in AREA_COORDINATES.items():
+        position = lowered.find(area)
+        if position >= 0 and (best is None or position < best[0]):
+            best = (position, coordinates)
+    return best[1] if best else None
+
+
+def _minutes(clock):
+    hours, _, minutes = clock.strip().partition(':')
+    return int(hours) * 60 + int(minutes or 0)
+
+
+def availability_windows(availability):
+    """(7, 2) array of working (start, end) minutes per weekday, -1 on days off.
+
+    Providers who have not filled in their availability are treated as always available.
+    """
+    try:
+        parsed = json.loads(availability) if availability else None
+    except ValueError:
+        parsed = None
+    windows = np.full((7, 2), -1, dtype=np.int32)
+    if not isinstance(parsed, dict) or not parsed:
+        windows[:] = (0, 24 * 60)
+        return windows
+    for day, hours in parsed.items():
+        if not isinstance(day, str) or day.casefold() not in WEEKDAYS or not isinstance(hours, str):
+            continue
+        try:
+            start, end = (_minutes(part) for part in hours.split('-'))
+        except ValueError:
+            continue
+        windows[WEEKDAYS.index(day.casefold())] = (start, end)
+    return windows
+
+
+def category_stem(name):
+    """What a provider's skills must contain to serve a category: "Plumber" matches "Plumbing" """
+    words = name.casefold().split()
+    return words[0][:5] if words else ''
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(a) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _coordinates(locations):
+    points = [locate(location) for location in locations]
+    lat = np.array([p[0] if p else np.nan for p in points], dtype=np.float64)
+    lon = np.array([p[1] if p else np.nan for p in points], dtype=np.float64)
+    return lat, lon
+
+
+def _epoch_minutes(dates):
+    return np.array([(d - EPOCH) // timedelta(minutes=1) for d in dates], dtype=np.int64)
+
+
+def request_arrays(customer_ids, locations, scheduled_dates, estimated_hours):
+    """Column arrays describing a batch of requests, as score_candidates() and solve() expect them"""
+    lat, lon = _coordinates(locations)
+    start = np.array([d.hour * 60 + d.minute for d in scheduled_dates], dtype=np.int32)
+    hours = np.array([h or 1.0 for h in estimated_hours], dtype=np.float64)
+    begins = _epoch_minutes(scheduled_dates)
+    return {
+        'customer_id': np.asarray(customer_ids, dtype=np.int64),
+        'lat': lat,
+        'lon': lon,
+        'weekday': np.array([d.weekday() for d in scheduled_dates], dtype=np.int32),
+        'start': start,
+        'end': np.minimum(start + np.ceil(hours * 60).astype(np.int32), 24 * 60),
+        # The job's whole time slot, for telling which requests one provider cannot take together
+        'begins': begins,
+        'ends': begins + np.ceil(hours * 60).astype(np.int64)
+    }
+
+
+def provider_arrays(user_ids, locations, availabilities, ratings, loads, capacity=MAX_ACTIVE_BOOKINGS):
+    """Column arrays describing candidate providers; 'load' is updated as the batch assigns work"""
+    lat, lon = _coordinates(locations)
+    windows = np.stack([availability_windows(a) for a in availabilities]) if len(availabilities) else np.empty((0, 7, 2), dtype=np.int32)
+    return {
+        'user_id': np.asarray(user_ids, dtype=np.int64),
+        'lat': lat,
+        'lon': lon,
+        'windows': windows,
+        'rating': np.array([r or 0.0 for r in ratings], dtype=np.float64),
+        'load': np.asarray(loads, dtype=np.int64),
+        'capacity': np.full(len(user_ids), capacity, dtype=np.int64)
+    }
+
+
+def score_candidates(requests, providers):
+    """(requests x providers) suitability scores in 0-1, -inf where a pair is infeasible.
+
+    A pair is feasible when the provider is close enough, works at the
+    scheduled time, has spare capacity and is not the customer themselves.
+    """
+    distance = haversine_km(requests['lat'][:, None], requests['lon'][:, None],
+                            providers['lat'][None, :], providers['lon'][None, :])
+    distance = np.where(np.isnan(distance), UNKNOWN_DISTANCE_KM, distance)
+
+    available = np.zeros(distance.shape, dtype=bool)
+    for weekday in np.unique(requests['weekday']):
+        rows = requests['weekday'] == weekday
+        opens, closes = providers['windows'][:, weekday, 0], providers['windows'][:, weekday, 1]
+        available[rows] = (opens[None, :] <= requests['start'][rows, None]) & (requests['end'][rows, None] <= closes[None, :])
+
+    load_ratio = providers['load'] / np.maximum(providers['capacity'], 1)
+    feasible = (available
+                & (distance <= MAX_DISTANCE_KM)
+                & (load_ratio < 1.0)[None, :]
+                & (requests['customer_id'][:, None] != providers['user_id'][None, :]))
+
+    score = (DISPATCH_WEIGHTS['distance'] * np.exp(-distance / DISTANCE_SCALE_KM)
+             + DISPATCH_WEIGHTS['rating'] * (providers['rating'] / 5.0)[None, :]
+             + DISPATCH_WEIGHTS['load'] * (1.0 - load_ratio)[None, :])
+    return np.where(feasible, score, -np.inf)
+
+
+def _candidates(scores):
+    """Each request's CANDIDATES_PER_REQUEST best feasible providers, as flat (request, provider, score) arrays"""
+    n_requests, n_providers = scores.shape
+    k = min(CANDIDATES_PER_REQUEST, n_providers)
+    columns = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    values = np.take_along_axis(scores, columns, axis=1).ravel()
+    rows = np.repeat(np.arange(n_requests), k)
+    keep = np.isfinite(values)
+    return rows[keep], columns.ravel()[keep], values[keep]
+
+
+def greedy_assign(scores, slots):
+    """Take the highest-scoring pairs first; each request once, each provider up to slots[p] times"""
+    if scores.size == 0:
+        return []
+    rows, columns, values = _candidates(scores)
+    order = np.argsort(-values, kind='stable')
+    remaining = slots.copy()
+    assigned = np.zeros(scores.shape[0], dtype=bool)
+    pairs = []
+    for r, p in zip(rows[order].tolist(), columns[order].tolist()):
+        if assigned[r] or remaining[p] <= 0:
+            continue
+        assigned[r] = True
+        remaining[p] -= 1
+        pairs.append((r, p))
+    return pairs
+
+
+def optimal_assign(scores, slots):
+    """Maximum total score, solved as an assignment problem over providers' capacity slots"""
+    if scores.size == 0:
+        return []
+    rows, columns, _ = _candidates(scores)
+    # Only providers some request shortlisted, each with no more slots than shortlists it appears in
+    shortlisted, appearances = np.unique(columns, return_counts=True)
+    slot_columns = np.repeat(shortlisted, np.minimum(slots[shortlisted], appearances))
+    if slot_columns.size == 0:
+        return []
+
+    shortlist = np.zeros(scores.shape, dtype=bool)
+    shortlist[rows, columns] = True
+    cost = np.where(shortlist[:, slot_columns], -scores[:, slot_columns], np.inf)
+    infeasible = ~np.isfinite(cost)
+    cost[infeasible] = 1e6
+    request_index, slot_index = linear_sum_assignment(cost)
+    return [(int(r), int(slot_columns[s])) for r, s in zip(request_index, slot_index) if not infeasible[r, s]]
+
+
+def exclude_overlapping(scores, requests, p, begins, ends):
+    """Make provider column p infeasible for every request whose time slot overlaps [begins, ends)"""
+    clash = (requests['begins'] < ends) & (requests['ends'] > begins)
+    scores[clash, p] = -np.inf
+
+
+def solve(scores, slots, solver='greedy', requests=None):
+    """Assign requests (rows) to providers (columns); returns (request, provider) index pairs.
+
+    With the batch's request arrays, a provider is never given two requests
+    whose time slots overlap. The solver then runs in rounds of at most one
+    request per provider, and after each round the requests clashing with a
+    provider's new job are taken off that provider.
+    """
+    if solver == 'optimal':
+        if linear_sum_assignment is None:
+            print("scipy is not installed, using the greedy dispatch solver")
+            solver = 'greedy'
+        elif scores.shape[0] * min(scores.shape[1], int(slots.sum())) > OPTIMAL_MAX_CELLS:
+            print("Batch too large for the optimal dispatch solver, using greedy")
+            solver = 'greedy'
+    elif solver != 'greedy':
+        raise ValueError(f'Unknown dispatch solver: {solver}')
+    assign = optimal_assign if solver == 'optimal' else greedy_assign
+    if requests is None:
+        return assign(scores, slots)
+
+    scores, slots = scores.copy(), slots.copy()
+    pairs = []
+    while True:
+        assigned = assign(scores, np.minimum(slots, 1))
+        if not assigned:
+            return pairs
+        for r, p in assigned:
+            pairs.append((r, p))
+            slots[p] -= 1
+            scores[r, :] = -np.inf
+            exclude_overlapping(scores, requests, p, requests['begins'][r], requests['ends'][r])
+
+
+def _load_providers():
+    load = dict(db.session.query(Booking.provider_id, func.count(Booking.id))
+                .filter(Booking.status.in_(ACTIVE_STATUSES))
+                .group_by(Booking.provider_id))
+    rows = db.session.query(
+        ServiceProvider.user_id, ServiceProvider.skills, ServiceProvider.availability,
+        ServiceProvider.hourly_rate, ServiceProvider.rating, User.location
+    ).join(User, ServiceProvider.user_id == User.id).filter(User.is_active == True).all()
+
+    user_ids, skills, availabilities, rates, ratings, locations = zip(*rows) if rows else ((),) * 6
+    providers = provider_arrays(user_ids, locations, availabilities, ratings, [load.get(u, 0) for u in user_ids])
+    providers['skills'] = [(s or '').casefold() for s in skills]
+    providers['hourly_rate'] = rates
+    return providers
+
+
+def _busy_slots(now):
+    """Time slots, in epoch minutes, that providers' active bookings already take, keyed by provider user id"""
+    rows = db.session.query(Booking.provider_id, Booking.scheduled_date, Booking.estimated_hours).filter(
+        Booking.status.in_(ACTIVE_STATUSES), Booking.scheduled_date >= now - timedelta(days=1)
+    ).all()
+    busy = defaultdict(list)
+    if rows:
+        provider_ids, dates, hours = zip(*rows)
+        begins = _epoch_minutes(dates)
+        ends = begins + np.ceil(np.array([h or 1.0 for h in hours]) * 60).astype(np.int64)
+        for provider_id, begin, end in zip(provider_ids, begins.tolist(), ends.tolist()):
+            busy[provider_id].append((begin, end))
+    return busy
+
+
+def run_dispatch(solver='greedy', batch_size=BATCH_SIZE, now=None, verbose=False):
+    """Match a batch of open requests to providers and create a pending booking for each match.
+
+    Requests whose time has passed are expired first. Categories are solved
+    one after another against the same provider capacity, and no provider
+    gets a request overlapping one of their active bookings or another
+    request matched to them in this batch. Works on the
+    selected shard only, whose providers serve that shard's area. Returns the
+    new bookings (already committed) and a summary.
+    """
+    now = now or datetime.utcnow()
+    expired = ServiceRequest.query.filter(
+        ServiceRequest.status == 'open', ServiceRequest.scheduled_date < now
+    ).update({'status': 'expired'}, synchronize_session=False)
+    db.session.commit()
+
+    batch = ServiceRequest.query.filter(ServiceRequest.status == 'open') \
+        .order_by(ServiceRequest.created_at).limit(batch_size).all()
+    summary = {'requests': len(batch), 'assigned': 0, 'expired': expired, 'solver': solver}
+    if not batch:
+        return [], summary
+
+    providers = _load_providers()
+    busy = _busy_slots(now)
+    by_category = defaultdict(list)
+    for service_request in batch:
+        by_category[service_request.service_category_id].append(service_request)
+    category_names = dict(db.session.query(ServiceCategory.id, ServiceCategory.name)
+                          .filter(ServiceCategory.id.in_(list(by_category))))
+
+    matches = []
+    for category_id, requests in by_category.items():
+        stem = category_stem(category_names.get(category_id, ''))
+        eligible = np.array([i for i, s in enumerate(providers['skills']) if stem and stem in s], dtype=np.int64)
+        if eligible.size == 0:
+            continue
+        candidates = {key: providers[key][eligible] for key in ('user_id', 'lat', 'lon', 'windows', 'rating', 'load', 'capacity')}
+        arrays = request_arrays(
+            [r.customer_id for r in requests], [r.customer_location for r in requests],
+            [r.scheduled_date for r in requests], [r.estimated_hours for r in requests]
+        )
+        scores = score_candidates(arrays, candidates)
+        for p, user_id in enumerate(candidates['user_id'].tolist()):
+            for begins, ends in busy.get(user_id, ()):
+                exclude_overlapping(scores, arrays, p, begins, ends)
+        slots = np.maximum(candidates['capacity'] - candidates['load'], 0)
+        for r, p in solve(scores, slots, solver, arrays):
+            providers['load'][eligible[p]] += 1
+            busy[int(candidates['user_id'][p])].append((int(arrays['begins'][r]), int(arrays['ends'][r])))
+            matches.append((requests[r], int(eligible[p])))
+
+    bookings = []
+    try:
+        for service_request, p in matches:
+            # Claim the request; the customer may have cancelled it since the batch was read
+            claimed = db.session.execute(
+                ServiceRequest.__table__.update()
+                .where(ServiceRequest.__table__.c.id == service_request.id)
+                .where(ServiceRequest.__table__.c.status == 'open')
+                .values(status='assigned', assigned_at=now)
+            ).rowcount
+            if not claimed:
+                continue
+
+            booking = Booking(
+                customer_id=service_request.customer_id,
+                provider_id=int(providers['user_id'][p]),
+                service_category_id=service_request.service_category_id,
+                title=service_request.title,
+                description=service_request.description,
+                scheduled_date=service_request.scheduled_date,
+                estimated_hours=service_request.estimated_hours,
+                customer_location=service_request.customer_location
+            )
+            if booking.estimated_hours and providers['hourly_rate'][p]:
+                booking.total_amount = booking.estimated_hours * providers['hourly_rate'][p]
+            db.session.add(booking)
+            db.session.flush()
+            apply_booking_rollup(booking_snapshot(booking))
+
+            service_request.status = 'assigned'
+            service_request.assigned_at = now
+            service_request.booking_id = booking.id
+            bookings.append(booking)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    summary['assigned'] = len(bookings)
+    if verbose:
+        print(f"Dispatched {len(bookings)} of {len(batch)} open requests ({expired} expired)")
+    return bookings, summary
@@ -0,0 +1,139 @@
+from datetime import timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from src.models.user import db, Booking
+
+PERIOD_TYPES = ('week', 'month')
+
+
+class ProviderRollup(db.Model):
+    """Per-provider booking totals by period and status, maintained on every booking write"""
+    __tablename__ = 'provider_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('provider_id', 'period_type', 'period_start', 'status', name='uq_provider_rollup_key'),
+        {'sqlite_autoincrement': True}
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    provider_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period_type = db.Column(db.String(10), nullable=False)  # 'week' or 'month'
+    period_start = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    booking_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    total_hours = db.Column(db.Float, nullable=False, default=0.0)
+
+
+def period_start(period_type, when):
+    day = when.date() if hasattr(when, 'date') else when
+    if period_type == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def booking_snapshot(booking):
+    """The fields of a booking that contribute to its provider's rollups"""
+    return (booking.provider_id, booking.scheduled_date, booking.status or 'pending',
+            booking.total_amount or 0.0, booking.estimated_hours or 0.0)
+
+
+def apply_booking_rollup(snapshot, sign=1):
+    """Add (sign=1) or remove (sign=-1) one booking's contribution. The caller commits."""
+    provider_id, scheduled_date, status, amount, hours = snapshot
+    if scheduled_date is None:
+        return
+    table = ProviderRollup.__table__
+    for period_type in PERIOD_TYPES:
+        stmt = insert(table).values(
+            provider_id=provider_id,
+            period_type=period_type,
+            period_start=period_start(period_type, scheduled_date),
+            status=status,
+            booking_count=sign,
+            total_amount=sign * amount,
+            total_hours=sign * hours
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['provider_id', 'period_type', 'period_start', 'status'],
+            set_={
+                'booking_count': table.c.booking_count + stmt.excluded.booking_count,
+                'total_amount': table.c.total_amount + stmt.excluded.total_amount,
+                'total_hours': table.c.total_hours + stmt.excluded.total_hours
+            }
+        )
+        db.session.execute(stmt)
+
+
+def move_booking_rollup(before, after):
+    """Move a booking's contribution after its status, date or amount changed"""
+    if before == after:
+        return
+    apply_booking_rollup(before, -1)
+    apply_booking_rollup(after, 1)
+
+
+def get_provider_series(provider_id, period_type, start=None, end=None):
+    """Time series of bookings, earnings and hours for one provider, oldest period first"""
+    query = ProviderRollup.query.filter_by(provider_id=provider_id, period_type=period_type)
+    if start:
+        query = query.filter(ProviderRollup.period_start >= period_start(period_type, start))
+    if end:
+        query = query.filter(ProviderRollup.period_start <= end)
+
+    series = {}
+    for row in query.order_by(ProviderRollup.period_start):
+        if row.booking_count == 0:
+            continue
+        key = row.period_start.isoformat()
+        point = series.setdefault(key, {
+            'period_start': key,
+            'completed_jobs': 0,
+            'earnings': 0.0,
+            'hours': 0.0,
+            'by_status': {}
+        })
+        point['by_status'][row.status] = {
+            'count': row.booking_count,
+            'amount': round(row.total_amount, 2),
+            'hours': round(row.total_hours, 2)
+        }
+        if row.status == 'completed':
+            point['completed_jobs'] = row.booking_count
+            point['earnings'] = round(row.total_amount, 2)
+            point['hours'] = round(row.total_hours, 2)
+    return list(series.values())
+
+
+def rebuild_provider_rollups():
+    """Recompute every rollup from the bookings table, for existing databases"""
+    ProviderRollup.query.delete()
+    rows = db.session.query(
+        Booking.provider_id, Booking.scheduled_date, Booking.status,
+        Booking.total_amount, Booking.estimated_hours
+    ).yield_per(1000)
+
+    totals = {}
+    for provider_id, scheduled_date, status, amount, hours in rows:
+        if scheduled_date is None:
+            continue
+        for period_type in PERIOD_TYPES:
+            key = (provider_id, period_type, period_start(period_type, scheduled_date), status or 'pending')
+            count, amount_sum, hours_sum = totals.get(key, (0, 0.0, 0.0))
+            totals[key] = (count + 1, amount_sum + (amount or 0.0), hours_sum + (hours or 0.0))
+
+    db.session.bulk_insert_mappings(ProviderRollup, [
+        {
+            'provider_id': provider_id, 'period_type': period_type, 'period_start': start, 'status': status,
+            'booking_count': count, 'total_amount': amount_sum, 'total_hours': hours_sum
+        }
+        for (provider_id, period_type, start, status), (count, amount_sum, hours_sum) in totals.items()
+    ])
+    db.session.commit()
+
+
+def backfill_provider_rollups():
+    """Build the rollups once for databases that have bookings but no rollup rows yet"""
+    has_rollups = db.session.query(ProviderRollup.query.exists()).scalar()
+    has_bookings = db.session.query(Booking.query.exists()).scalar()
+    if has_bookings and not has_rollups:
+        rebuild_provider_rollups()
@@ -0,0 +1,175 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from flask import Response
+
+# Subscriber key of the admin dashboard, which sees every booking event
+ADMIN_CHANNEL = 'admin'
+
+
+class EventBus:
+    """In-process pub/sub that fans booking events out to per-user SSE subscribers"""
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self.relay = None
+
+    def subscribe(self, user_id):
+        if self.relay is not None:
+            self.relay.ensure_started()
+        subscriber = queue.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[user_id]
+
+    def publish(self, user_ids, event_type, data):
+        """Deliver an event locally and hand it to the cross-worker relay, if any"""
+        event = {'type': event_type, 'data': data}
+        self.dispatch(user_ids, event)
+        if self.relay is not None:
+            self.relay.forward(user_ids, event)
+
+    def dispatch(self, user_ids, event):
+        with self._lock:
+            targets = [s for user_id in set(user_ids) for s in self._subscribers.get(user_id, ())]
+        for subscriber in targets:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # Slow client: drop the event rather than block the writer
+                pass
+
+
+class SQLiteRelay:
+    """Local broker stand-in that shares events between workers through a SQLite log.
+
+    The connection and tailing thread are per process and start on first use,
+    so a relay configured before workers are forked still works in each worker.
+    """
+
+    def __init__(self, bus, path, poll_interval=0.25, retention_seconds=300):
+        self.bus = bus
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.origin = f'{os.getpid()}-{id(self)}'
+            self._local = threading.local()
+
+            conn = self._connect()
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS booking_event ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, '
+                'user_ids TEXT NOT NULL, payload TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+            self._last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM booking_event').fetchone()[0]
+
+            thread = threading.Thread(target=self._tail, name='booking-event-relay', daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def forward(self, user_ids, event):
+        try:
+            self.ensure_started()
+            self._connect().execute(
+                'INSERT INTO booking_event (origin, user_ids, payload, created_at) VALUES (?, ?, ?, ?)',
+                (self.origin, json.dumps(sorted(set(user_ids), key=str)), json.dumps(event), time.time())
+            )
+        except sqlite3.Error as e:
+            print(f"Error forwarding booking event: {e}")
+
+    def _tail(self):
+        last_purge = 0.0
+        while True:
+            try:
+                conn = self._connect()
+                rows = conn.execute(
+                    'SELECT id, origin, user_ids, payload FROM booking_event WHERE id > ? ORDER BY id',
+                    (self._last_id,)
+                ).fetchall()
+                for event_id, origin, user_ids, payload in rows:
+                    self._last_id = event_id
+                    if origin != self.origin:
+                        self.bus.dispatch(json.loads(user_ids), json.loads(payload))
+
+                now = time.time()
+                if now - last_purge > self.retention_seconds:
+                    conn.execute('DELETE FROM booking_event WHERE created_at < ?', (now - self.retention_seconds,))
+                    last_purge = now
+            except sqlite3.Error as e:
+                print(f"Error reading booking events: {e}")
+            time.sleep(self.poll_interval)
+
+
+event_bus = EventBus()
+
+
+def init_events(app):
+    """Configure the cross-worker relay when EVENT_RELAY_PATH is set; it starts lazily in each worker"""
+    relay_path = app.config.get('EVENT_RELAY_PATH')
+    if relay_path and event_bus.relay is None:
+        event_bus.relay = SQLiteRelay(event_bus, relay_path)
+
+
+def publish_booking_event(event_type, booking):
+    """Push a booking event to both parties of the booking and to the admin dashboard"""
+    event_bus.publish([booking.customer_id, booking.provider_id, ADMIN_CHANNEL], event_type, booking.to_dict())
+
+
+def event_stream(channel):
+    """Server-Sent Events response delivering the events of one user, or of ADMIN_CHANNEL"""
+    def generate():
+        # Subscribed on first iteration, so a response that is never sent leaves no queue behind
+        subscriber = event_bus.subscribe(channel)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = subscriber.get(timeout=15)
+                except queue.Empty:
+                    # Keep idle connections open through proxies
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(event)
+        finally:
+            event_bus.unsubscribe(channel, subscriber)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+def format_sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
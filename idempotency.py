@@ -0,0 +1,113 @@
+import hashlib
+import time
+from functools import wraps
+from flask import current_app, jsonify, make_response, request, session
+from sqlalchemy.dialects.sqlite import insert
+from src.models.user import db
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+# A key still marked in progress after this long belongs to a request that died; a retry may take it over
+IN_PROGRESS_TIMEOUT_SECONDS = 60
+PURGE_INTERVAL_SECONDS = 300
+
+
+class IdempotencyRecord(db.Model):
+    """Stored response for an Idempotency-Key, by hash of (user, method, path, key)"""
+    __tablename__ = 'idempotency_key'
+    __table_args__ = (
+        db.Index('ix_idempotency_key_created_at', 'created_at'),
+    )
+
+    key_hash = db.Column(db.LargeBinary(16), primary_key=True)
+    request_hash = db.Column(db.LargeBinary(8), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)  # NULL while the first request is running
+    mimetype = db.Column(db.String(50), nullable=True)
+    body = db.Column(db.LargeBinary, nullable=True)
+    created_at = db.Column(db.Float, nullable=False)
+
+
+_last_purge = 0.0
+
+
+def _purge_expired(now, ttl):
+    global _last_purge
+    if now - _last_purge < PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = now
+    IdempotencyRecord.query.filter(IdempotencyRecord.created_at < now - ttl).delete(synchronize_session=False)
+
+
+def _replay(record):
+    response = current_app.response_class(record.body, status=record.status_code, mimetype=record.mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(f):
+    """Honour an Idempotency-Key header on a POST endpoint.
+
+    The first request with a key runs normally and its response is stored;
+    retries with the same key get that response back from one primary key
+    lookup, without running the endpoint again. 5xx responses are not
+    stored, so a retry after a server error runs the endpoint again.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key or 'user_id' not in session:
+            return f(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({'error': 'Idempotency-Key is too long'}), 400
+
+        ttl = current_app.config.get('IDEMPOTENCY_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+        now = time.time()
+        key_hash = hashlib.sha256(f"{session['user_id']}:{request.method}:{request.path}:{key}".encode()).digest()[:16]
+        request_hash = hashlib.sha256(request.get_data()).digest()[:8]
+
+        record = IdempotencyRecord.query.get(key_hash)
+        if record is not None and record.created_at >= now - ttl:
+            if record.request_hash != request_hash:
+                return jsonify({'error': 'Idempotency-Key was already used with a different request'}), 422
+            if record.status_code is not None:
+                return _replay(record)
+            if record.created_at >= now - IN_PROGRESS_TIMEOUT_SECONDS:
+                return jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409
+
+        # Claim the key. The conditional upsert lets exactly one concurrent request win, also
+        # when it replaces an expired or abandoned claim
+        table = IdempotencyRecord.__table__
+        stmt = insert(table).values(key_hash=key_hash, request_hash=request_hash, created_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['key_hash'],
+            set_={'request_hash': request_hash, 'status_code': None, 'mimetype': None, 'body': None, 'created_at': now},
+            where=(table.c.created_at < now - ttl) | (
+                table.c.status_code.is_(None) & (table.c.created_at < now - IN_PROGRESS_TIMEOUT_SECONDS)
+            )
+        )
+        claimed = db.session.execute(stmt).rowcount
+        _purge_expired(now, ttl)
+        db.session.commit()
+        if not claimed:
+            # Lost the race to a concurrent retry, which may already have finished
+            record = IdempotencyRecord.query.get(key_hash)
+            if record is not None and record.status_code is not None and record.request_hash == request_hash:
+                return _replay(record)
+            return jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409
+
+        response = make_response(f(*args, **kwargs))
+
+        try:
+            if response.status_code >= 500 or response.is_streamed:
+                stmt = table.delete().where(table.c.key_hash == key_hash)
+            else:
+                stmt = table.update().where(table.c.key_hash == key_hash).values(
+                    status_code=response.status_code, mimetype=response.mimetype, body=response.get_data()
+                )
+            db.session.execute(stmt)
+            db.session.commit()
+        except Exception as e:
+            # The endpoint's own work is committed; a failed store only means a retry runs it again
+            db.session.rollback()
+            print(f"Error storing idempotent response: {e}")
+        return response
+    return decorated_function
@@ -9,14 +9,16 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from src.models.user import db, User, ServiceProvider, ServiceCategory
-from src.main import app
+from src.models.ranking import refresh_provider_ranks
+from src.main import create_app, prepare_database
 import json
 
 def init_database():
     """Initialize database with sample data"""
+    app = create_app()
     with app.app_context():
-        # Create all tables
-        db.create_all()
+        # Create or migrate the schema
+        prepare_database(app)
         
         # Check if data already exists
         if ServiceCategory.query.first():
@@ -122,6 +124,9 @@ def init_database():
         )
         db.session.add(provider_profile2)
         
+        # Compute ranking scores for the sample providers
+        refresh_provider_ranks()
+        
         # Commit all changes
         db.session.commit()
         
@@ -0,0 +1,157 @@
+import json
+from src.models.user import db, ServiceProvider
+from src.models.projection import FragmentProjection, PROVIDER_PROJECTION, provider_rows, encode_fragment
+from src.sharding import fan_out, region_for_location, shard_router
+
+BATCH_SIZE = 1000
+
+# Keys of the admin provider listing, a subset of the public shape
+_ADMIN_KEYS = ('id', 'user_id', 'skills', 'hourly_rate', 'experience_years', 'description',
+               'rating', 'total_reviews', 'is_verified', 'created_at')
+_ADMIN_USER_KEYS = ('id', 'username', 'email', 'full_name', 'phone', 'location', 'is_active')
+
+
+class ProviderListing(db.Model):
+    """One flattened row per provider: its user's fields, rating stats, rank and the encoded JSON.
+
+    Rewritten by refresh_provider_listings() in the transaction of every write
+    to the provider, its user or its reviews, so the public provider reads
+    are single-table queries that never encode per row.
+    """
+    __tablename__ = 'provider_listing'
+    __table_args__ = (
+        # Descending, so the rank sort (rank_score desc, provider_id) is read straight off the index
+        db.Index('ix_provider_listing_active_rank', 'is_active', db.text('rank_score DESC')),
+        db.Index('ix_provider_listing_user_id', 'user_id'),
+        db.Index('ix_provider_listing_hourly_rate', 'hourly_rate'),
+        db.Index('ix_provider_listing_rating', 'rating'),
+    )
+
+    provider_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+    full_name = db.Column(db.String(100), nullable=True)
+    location = db.Column(db.String(100), nullable=True)
+    region = db.Column(db.String(20), nullable=True)  # see src/sharding.py
+    skills = db.Column(db.Text, nullable=True)  # as stored on the provider, for the search filters
+    description = db.Column(db.Text, nullable=True)
+    hourly_rate = db.Column(db.Float, nullable=True)
+    rating = db.Column(db.Float, nullable=True)
+    total_reviews = db.Column(db.Integer, nullable=True)
+    is_verified = db.Column(db.Boolean, nullable=True)
+    rank_score = db.Column(db.Float, nullable=True)
+    fragment = db.Column(db.Text, nullable=False)  # encoded public JSON, skills and availability decoded
+    admin_fragment = db.Column(db.Text, nullable=False)  # encoded admin listing JSON
+
+
+# Rows that serialize to their stored fragment
+PROVIDER_LISTING_PROJECTION = FragmentProjection(ProviderListing.fragment)
+ADMIN_LISTING_PROJECTION = FragmentProjection(ProviderListing.admin_fragment)
+
+
+def listing_rows(core=False):
+    base = PROVIDER_LISTING_PROJECTION.select() if core else PROVIDER_LISTING_PROJECTION.query()
+    return base.select_from(ProviderListing)
+
+
+def admin_listing_rows():
+    return ADMIN_LISTING_PROJECTION.query().select_from(ProviderListing)
+
+
+def _decode(value):
+    try:
+        return json.loads(value) if value else value
+    except ValueError:
+        return value
+
+
+def listing_values(row):
+    """Column values of the listing row for one provider_rows() row followed by its rank_score"""
+    data = PROVIDER_PROJECTION.serialize(row)
+    raw_skills = data['skills']
+    data['skills'] = _decode(raw_skills)
+    data['availability'] = _decode(data['availability'])
+    user = data['user'] or {}
+    admin = {key: data[key] for key in _ADMIN_KEYS}
+    admin['user'] = {key: user[key] for key in _ADMIN_USER_KEYS} if data['user'] else None
+    return {
+        'provider_id': data['id'],
+        'user_id': data['user_id'],
+        'is_active': bool(user.get('is_active')),
+        'full_name': user.get('full_name'),
+        'location': user.get('location'),
+        'region': region_for_location(user.get('location')),
+        'skills': raw_skills,
+        'description': data['description'],
+        'hourly_rate': data['hourly_rate'],
+        'rating': data['rating'],
+        'total_reviews': data['total_reviews'],
+        'is_verified': data['is_verified'],
+        'rank_score': row[-1],
+        'fragment': encode_fragment(data),
+        'admin_fragment': encode_fragment(admin)
+    }
+
+
+def _write(rows):
+    values = [listing_values(row) for row in rows]
+    if values:
+        table = ProviderListing.__table__
+        # Delete and insert rather than upsert: every column is rewritten anyway
+        db.session.execute(table.delete().where(table.c.provider_id.in_([v['provider_id'] for v in values])))
+        db.session.execute(table.insert(), values)
+    return {v['provider_id'] for v in values}
+
+
+def refresh_provider_listings(provider_ids=None, user_ids=None):
+    """Rewrite the listing rows of the given providers, by ServiceProvider id or by user id, or of all.
+
+    Rows of providers that no longer exist are removed. Runs inside the
+    caller's session; the caller commits.
+    """
+    db.session.flush()
+    base = provider_rows().add_columns(ServiceProvider.rank_score)
+    table = ProviderListing.__table__
+
+    if provider_ids is None and user_ids is None:
+        last_id = 0
+        seen = set()
+        while True:
+            rows = base.filter(ServiceProvider.id > last_id).order_by(ServiceProvider.id).limit(BATCH_SIZE).all()
+            if not rows:
+                break
+            written = _write(rows)
+            seen |= written
+            last_id = max(written)
+        db.session.execute(table.delete().where(table.c.provider_id.notin_(seen)) if seen else table.delete())
+        return
+
+    for column, listing_column, ids in ((ServiceProvider.id, table.c.provider_id, provider_ids),
+                                        (ServiceProvider.user_id, table.c.user_id, user_ids)):
+        ids = sorted(set(ids or ()))
+        for i in range(0, len(ids), BATCH_SIZE):
+            batch = ids[i:i + BATCH_SIZE]
+            written = _write(base.filter(column.in_(batch)).all())
+            stale = table.delete().where(listing_column.in_(batch))
+            db.session.execute(stale.where(table.c.provider_id.notin_(written)) if written else stale)
+
+
+def refresh_user_listings(user_ids):
+    """Rewrite the listing rows of the given users' providers after a change to the users; the caller commits.
+
+    With region shards, user rows live in the global database, which shard
+    connections only see once committed; the user change is committed first
+    and each shard's listing follows in its own transaction.
+    """
+    if shard_router.enabled:
+        db.session.commit()
+    fan_out(lambda: refresh_provider_listings(user_ids=user_ids))
+
+
+def backfill_provider_listings():
+    """Build the listing once for databases that have providers but no listing rows yet"""
+    has_listings = db.session.query(ProviderListing.query.exists()).scalar()
+    has_providers = db.session.query(ServiceProvider.query.exists()).scalar()
+    if has_providers and not has_listings:
+        refresh_provider_listings()
+        db.session.commit()
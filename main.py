@@ -3,52 +3,117 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.auth import auth_bp
-from src.routes.services import services_bp
-from src.routes.bookings import bookings_bp
-from src.routes.reviews import reviews_bp
-from src.routes.admin import admin_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'sajilo-sewa-secret-key-2024'
-
-# Enable CORS for all routes with credentials support
-CORS(app, origins="*", supports_credentials=True)
-
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(services_bp, url_prefix='/api/services')
-app.register_blueprint(bookings_bp, url_prefix='/api/bookings')
-app.register_blueprint(reviews_bp, url_prefix='/api/reviews')
-app.register_blueprint(admin_bp, url_prefix='/api/admin')
-
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+
+DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'database', 'app.db')
+
+
+def create_app(config=None):
+    """Build the Flask app without touching the database.
+
+    Schema creation, migrations and backfills run once through
+    prepare_database() (python manage.py migrate), never on worker import.
+    Importing this module builds nothing; callers create the app they serve.
+    """
+    from src.routes.user import user_bp
+    from src.routes.auth import auth_bp
+    from src.routes.services import services_bp
+    from src.routes.bookings import bookings_bp
+    from src.routes.reviews import reviews_bp
+    from src.routes.admin import admin_bp, init_admin_snapshots
+    from src.events import init_events
+    from src.ratelimit import init_rate_limits
+    from src.compression import init_compression
+    from src.sharding import init_sharding
+    from src.static_assets import StaticManifest, serve_asset
+
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'sajilo-sewa-secret-key-2024'
+
+    # Enable CORS for all routes with credentials support
+    CORS(app, origins="*", supports_credentials=True)
+
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(services_bp, url_prefix='/api/services')
+    app.register_blueprint(bookings_bp, url_prefix='/api/bookings')
+    app.register_blueprint(reviews_bp, url_prefix='/api/reviews')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+
+    # uncomment if you need to use database
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f"sqlite:///{DATABASE_PATH}")
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Share booking events between workers through a SQLite log when running more than one process
+    app.config['EVENT_RELAY_PATH'] = os.environ.get('EVENT_RELAY_PATH')
+
+    # Rate limit buckets live in each worker unless a shared SQLite file is given
+    app.config['RATE_LIMIT_STORAGE'] = os.environ.get('RATE_LIMIT_STORAGE')
+
+    # Number of reverse proxies in front of the app whose X-Forwarded-For entries name the client; 0 trusts none
+    app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', 0))
+
+    # Split providers, bookings and reviews into one SQLite file per region under this directory
+    app.config['SHARD_DIRECTORY'] = os.environ.get('SHARD_DIRECTORY')
+
+    if config:
+        app.config.update(config)
+
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+
+    db.init_app(app)
+    init_sharding(app)
+    init_events(app)
+    init_rate_limits(app)
+    init_compression(app)
+    init_admin_snapshots(app)
+
+    # Scan the built frontend once; requests are answered from this in-memory manifest
+    static_manifest = StaticManifest(app.static_folder)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if app.static_folder is None:
+                return "Static folder not configured", 404
+
+        asset = static_manifest.lookup(path)
+        if asset is None:
             return "index.html not found", 404
+        return serve_asset(asset)
+
+    return app
+
+
+def prepare_database(app):
+    """Create or migrate the schema and run one-off backfills. Run once per deploy, not per worker."""
+    from src.models.migrations import migrate
+    from src.models.ranking import refresh_unranked_providers
+    from src.models.earnings import backfill_provider_rollups
+    from src.models.review_summary import backfill_review_summaries
+    from src.models.listing import backfill_provider_listings
+    from src.sharding import prepare_shards, rows_outside_shards, shard_names, use_shard
+
+    with app.app_context():
+        migrate(db.engine)
+        prepare_shards(db.metadata)
+        unsharded = rows_outside_shards(db.metadata)
+        if unsharded:
+            raise RuntimeError(f"The main database still holds {', '.join(unsharded)} rows, which sharded queries "
+                               "never read; move them with 'python manage.py shard-existing'")
+        for shard in shard_names():
+            with use_shard(shard):
+                refresh_unranked_providers()
+                backfill_provider_rollups()
+                backfill_review_summaries()
+                backfill_provider_listings()
 
 
 if __name__ == '__main__':
+    app = create_app()
+    prepare_database(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
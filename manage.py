@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Management commands for Sajilo Sewa
+
+    python manage.py migrate                 Create or migrate the database schema
+    python manage.py serve --workers 4       Production server with preforked workers
+    python manage.py asgi --workers 4        ASGI server with async public read endpoints
+    python manage.py archive --every 3600    Move old completed/cancelled bookings to the archive
+    python manage.py dispatch --every 60     Assign open requests to providers in batches
+    python manage.py rank --every 3600       Rescore every provider against current priors and recency
+    python manage.py shard-existing          Move rows from before SHARD_DIRECTORY was set into the shards
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sajilo Sewa management commands')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('migrate', help='create or migrate the database schema and run backfills')
+
+    serve = commands.add_parser('serve', help='serve the preloaded app from forked workers')
+    serve.add_argument('--host', default='0.0.0.0')
+    serve.add_argument('--port', type=int, default=5000)
+    serve.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    serve.add_argument('--skip-migrate', action='store_true', help='assume the schema is already up to date')
+
+    asgi = commands.add_parser('asgi', help='serve through uvicorn, with the public read endpoints async')
+    asgi.add_argument('--host', default='0.0.0.0')
+    asgi.add_argument('--port', type=int, default=5000)
+    asgi.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    asgi.add_argument('--skip-migrate', action='store_true', help='assume the schema is already up to date')
+
+    archive = commands.add_parser('archive', help='move old completed and cancelled bookings to booking_archive')
+    archive.add_argument('--older-than-days', type=int,
+                         default=int(os.environ.get('ARCHIVE_AFTER_DAYS', 90)))
+    archive.add_argument('--batch-size', type=int, default=5000)
+    archive.add_argument('--every', type=int, metavar='SECONDS', help='keep running, archiving every SECONDS')
+
+    dispatch = commands.add_parser('dispatch', help='assign open service requests to nearby available providers')
+    dispatch.add_argument('--solver', choices=['greedy', 'optimal'], default='greedy')
+    dispatch.add_argument('--batch-size', type=int, default=5000)
+    dispatch.add_argument('--every', type=int, metavar='SECONDS', help='keep running, dispatching every SECONDS')
+
+    rank = commands.add_parser('rank', help='recompute every provider ranking score and listing row')
+    rank.add_argument('--every', type=int, metavar='SECONDS', help='keep running, rescoring every SECONDS')
+
+    commands.add_parser('shard-existing', help='move sharded-table rows left in the main database into their shards')
+
+    args = parser.parse_args()
+
+    from src.main import create_app, prepare_database
+    from src.sharding import shard_names, shard_router, use_shard
+
+    app = create_app()
+
+    if args.command == 'migrate':
+        prepare_database(app)
+        print("Database is up to date")
+    elif args.command == 'serve':
+        from src.prefork import run_prefork
+        if not args.skip_migrate:
+            # Done once in the parent, before any worker exists to race on DDL
+            prepare_database(app)
+        run_prefork(app, host=args.host, port=args.port, workers=args.workers)
+    elif args.command == 'asgi':
+        try:
+            import uvicorn
+        except ImportError:
+            parser.error('the asgi command needs uvicorn, aiosqlite and asgiref installed')
+        if not args.skip_migrate:
+            prepare_database(app)
+        # Workers import src.asgi themselves, so each builds its own async engines
+        uvicorn.run('src.asgi:app', host=args.host, port=args.port, workers=args.workers, log_level='warning')
+    elif args.command == 'archive':
+        from src.models.archive import archive_bookings
+        while True:
+            moved = 0
+            with app.app_context():
+                for shard in shard_names():
+                    with use_shard(shard):
+                        moved += archive_bookings(args.older_than_days, args.batch_size, verbose=True)
+            print(f"Archived {moved} bookings older than {args.older_than_days} days")
+            if not args.every:
+                break
+            time.sleep(args.every)
+    elif args.command == 'dispatch':
+        from src.models.dispatch import run_dispatch
+        from src.events import publish_booking_event
+        while True:
+            with app.app_context():
+                # Requests are matched to the providers stored in the same region shard
+                for shard in shard_names():
+                    with use_shard(shard):
+                        bookings, summary = run_dispatch(args.solver, args.batch_size, verbose=True)
+                        for booking in bookings:
+                            publish_booking_event('booking_created', booking)
+            if not args.every:
+                break
+            time.sleep(args.every)
+    elif args.command == 'rank':
+        from src.models.ranking import refresh_all_provider_ranks
+        while True:
+            with app.app_context():
+                rescored = refresh_all_provider_ranks()
+            print(f"Rescored {rescored} providers")
+            if not args.every:
+                break
+            time.sleep(args.every)
+    elif args.command == 'shard-existing':
+        from src.models.user import db
+        from src.models.migrations import migrate
+        from src.models.shard_migration import move_rows_to_shards, rebuild_shard_tables
+        from src.sharding import prepare_shards
+        if not shard_router.enabled:
+            parser.error('set SHARD_DIRECTORY to the shard files to move the rows into')
+        with app.app_context():
+            migrate(db.engine)
+            prepare_shards(db.metadata)
+            move_rows_to_shards(verbose=True)
+        prepare_database(app)
+        with app.app_context():
+            rebuild_shard_tables()
+        print("Existing rows are now in their shards")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Versioned schema migrations for the SQLite database.
+
+db.create_all() only creates missing tables; it never adds columns or
+indexes to tables that already exist. Each migration below brings an
+existing database forward by one version, and the applied version is kept
+in SQLite's PRAGMA user_version.
+
+Apply to a live database file with:
+    python -m src.models.migrations path/to/app.db
+"""
+
+import argparse
+import importlib
+from contextlib import contextmanager
+from sqlalchemy import MetaData, create_engine, inspect, text
+from sqlalchemy.schema import CreateTable
+from src.models.user import db
+
+
+def _add_rank_score(conn):
+    columns = {c['name'] for c in inspect(conn).get_columns('service_provider')}
+    if 'rank_score' not in columns:
+        # Left NULL so refresh_unranked_providers() picks these rows up
+        conn.execute(text('ALTER TABLE service_provider ADD COLUMN rank_score FLOAT'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_service_provider_rank_score ON service_provider (rank_score)'))
+
+
+def _add_hot_path_indexes(conn):
+    for statement in (
+        'CREATE INDEX IF NOT EXISTS ix_booking_customer_created ON booking (customer_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_booking_provider_created ON booking (provider_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_booking_status_created ON booking (status, created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_booking_updated_at ON booking (updated_at)',
+        'CREATE INDEX IF NOT EXISTS ix_review_provider_created ON review (provider_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_review_customer_created ON review (customer_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_review_booking_id ON review (booking_id)',
+        'CREATE INDEX IF NOT EXISTS ix_service_provider_user_id ON service_provider (user_id)',
+        'CREATE INDEX IF NOT EXISTS ix_service_provider_rating ON service_provider (rating)',
+        'CREATE INDEX IF NOT EXISTS ix_service_provider_hourly_rate ON service_provider (hourly_rate)',
+    ):
+        conn.execute(text(statement))
+    # Give the query planner statistics for the new indexes
+    conn.execute(text('ANALYZE'))
+
+
+def _add_home_shard(conn):
+    columns = {c['name'] for c in inspect(conn).get_columns('user')}
+    if 'home_shard' not in columns:
+        conn.execute(text('ALTER TABLE user ADD COLUMN home_shard VARCHAR(20)'))
+
+
+# Tables declared with sqlite_autoincrement after databases already held them
+AUTOINCREMENT_TABLES = ('service_provider', 'booking', 'review', 'provider_rollup', 'service_request')
+# Rows archived out of a table whose ids must never be handed out again
+ARCHIVED_IDS = {'booking': 'booking_archive'}
+
+
+def _rebuild_with_autoincrement(conn):
+    """Recreate the tables above with AUTOINCREMENT so ids of deleted or archived rows are never reused.
+
+    SQLite cannot add AUTOINCREMENT to an existing table, so each one is
+    copied into a new table, dropped and renamed back, and its indexes are
+    recreated. Foreign keys pointing at it keep working: they name the table,
+    which ends up with the same name.
+    """
+    existing = set(inspect(conn).get_table_names())
+    # Copy of the metadata so the rebuilt table's foreign keys resolve
+    metadata = MetaData()
+    for table in db.metadata.sorted_tables:
+        table.to_metadata(metadata)
+
+    for name in AUTOINCREMENT_TABLES:
+        if name not in existing:
+            continue
+        if f'{name}_rebuild' in existing:
+            # Left by a run that failed before migrations ran in real transactions; the original is intact
+            conn.execute(text(f'DROP TABLE {name}_rebuild'))
+        ddl = conn.execute(text('SELECT sql FROM sqlite_master WHERE type = :type AND name = :name'),
+                           {'type': 'table', 'name': name}).scalar()
+        if 'AUTOINCREMENT' in ddl.upper():
+            continue
+        table = metadata.tables[name]
+        columns = ', '.join(c['name'] for c in inspect(conn).get_columns(name) if c['name'] in table.c)
+        rebuilt = table.to_metadata(metadata, name=f'{name}_rebuild')
+
+        for index in inspect(conn).get_indexes(name):
+            conn.execute(text(f'DROP INDEX {index["name"]}'))
+        conn.execute(CreateTable(rebuilt))
+        conn.execute(text(f'INSERT INTO {name}_rebuild ({columns}) SELECT {columns} FROM {name}'))
+        conn.execute(text(f'DROP TABLE {name}'))
+        conn.execute(text(f'ALTER TABLE {name}_rebuild RENAME TO {name}'))
+        for index in table.indexes:
+            index.create(conn)
+
+        # Copying explicit ids already set the sequence to max(id); archived ids count too
+        archive = ARCHIVED_IDS.get(name)
+        if archive in existing:
+            conn.execute(text(
+                'INSERT INTO sqlite_sequence (name, seq) SELECT :table, 0 '
+                'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :table)'
+            ), {'table': name})
+            conn.execute(text(
+                f'UPDATE sqlite_sequence SET seq = MAX(seq, (SELECT COALESCE(MAX(id), 0) FROM {archive})) '
+                'WHERE name = :table'
+            ), {'table': name})
+
+
+# (version, description, function). Append only; never edit an applied migration.
+MIGRATIONS = [
+    (1, 'Add service_provider.rank_score', _add_rank_score),
+    (2, 'Indexes for hot filter and sort columns', _add_hot_path_indexes),
+    (3, 'Add user.home_shard', _add_home_shard),
+    (4, 'Rebuild id tables with AUTOINCREMENT', _rebuild_with_autoincrement),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Every module declaring tables, so create_all() sees them all even outside create_app()
+MODEL_MODULES = (
+    'src.models.user',
+    'src.models.earnings',
+    'src.models.analytics',
+    'src.models.dispatch',
+    'src.models.review_summary',
+    'src.models.listing',
+    'src.idempotency',
+)
+
+
+def import_models():
+    for name in MODEL_MODULES:
+        importlib.import_module(name)
+
+
+def get_version(conn):
+    return conn.execute(text('PRAGMA user_version')).scalar()
+
+
+def _set_version(conn, version):
+    # PRAGMA does not accept bound parameters
+    conn.execute(text(f'PRAGMA user_version = {int(version)}'))
+
+
+@contextmanager
+def _transaction(engine):
+    """A connection inside one explicit transaction, DDL included.
+
+    pysqlite left to itself commits DDL as it goes and only opens a
+    transaction before DML, so engine.begin() would not roll a failed
+    migration's schema changes back.
+    """
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level='AUTOCOMMIT')
+        conn.execute(text('BEGIN'))
+        try:
+            yield conn
+        except Exception:
+            conn.execute(text('ROLLBACK'))
+            raise
+        conn.execute(text('COMMIT'))
+
+
+def migrate(engine, verbose=False):
+    """Bring the database up to LATEST_VERSION and create any missing tables"""
+    import_models()
+    with _transaction(engine) as conn:
+        version = get_version(conn)
+        if version == 0 and not inspect(conn).has_table('user'):
+            # Fresh database: create_all() builds the current schema, indexes included
+            db.metadata.create_all(conn)
+            _set_version(conn, LATEST_VERSION)
+            if verbose:
+                print(f"Created schema at version {LATEST_VERSION}")
+            return LATEST_VERSION
+
+    for target, description, apply in MIGRATIONS:
+        if target <= version:
+            continue
+        # One transaction per migration so a failure leaves the last good version recorded
+        with _transaction(engine) as conn:
+            apply(conn)
+            _set_version(conn, target)
+        version = target
+        if verbose:
+            print(f"Applied migration {target}: {description}")
+
+    with _transaction(engine) as conn:
+        # New tables (rollups, analytics, ...) need no migration of their own
+        db.metadata.create_all(conn)
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply schema migrations to a SQLite database')
+    parser.add_argument('database', help='path to the SQLite database file')
+    args = parser.parse_args()
+
+    engine = create_engine(f'sqlite:///{args.database}')
+    with engine.connect() as conn:
+        print(f"Database at version {get_version(conn)}, latest is {LATEST_VERSION}")
+    migrate(engine, verbose=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from werkzeug.serving import make_server
+from src.models.user import db
+from src.sharding import shard_router
+
+
+def _bind(host, port, backlog=1024):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, host, port, sock):
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def run_prefork(app, host='0.0.0.0', port=5000, workers=4):
+    """Serve a preloaded app from N forked worker processes sharing one listening socket.
+
+    The app and everything it imported are built once in the parent, so each
+    worker starts with a copy-on-write view of that memory instead of
+    importing and initialising the application itself.
+    """
+    sock = _bind(host, port)
+
+    # Workers must not inherit pooled connections opened by prepare_database()
+    with app.app_context():
+        db.engine.dispose()
+    shard_router.dispose()
+
+    # Move everything allocated so far out of the GC's reach so collections in
+    # the workers do not touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(app, host, port, sock)
+            finally:
+                os._exit(0)
+        children[pid] = time.monotonic()
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        spawn()
+    print(f"Serving on http://{host}:{port} with {workers} workers (parent pid {os.getpid()})")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        print(f"Worker {pid} exited with status {status}, restarting")
+        if time.monotonic() - started < 1:
+            # Avoid a tight restart loop when workers crash on start
+            time.sleep(1)
+        spawn()
+
+    sock.close()
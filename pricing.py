@@ -0,0 +1,276 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func
+from src.models.user import db, User, ServiceProvider, ServiceCategory, Booking, ArchivedBooking
+from src.models.dispatch import category_stem
+from src.sharding import fan_out, region_for_location, shard_names, use_shard
+
+# Hours come from completed bookings scheduled within this window
+HISTORY_DAYS = 365
+# Below this many samples an area falls back to the figures for the whole country
+MIN_SAMPLES = 3
+# Completed bookings are pulled into the snapshot this often; every worker does it itself
+REFRESH_INTERVAL = 30
+# A full rebuild picks up provider edits made on other workers and drops aged-out bookings
+REBUILD_INTERVAL = 600
+
+ALL_AREAS = 'all'
+
+
+def _percentiles(values):
+    if len(values) == 0:
+        return None
+    p25, median, p75 = np.percentile(np.fromiter(values, dtype=np.float64, count=len(values)), [25, 50, 75])
+    return {'p25': round(float(p25), 2), 'median': round(float(median), 2), 'p75': round(float(p75), 2)}
+
+
+def _stats(rates, hours):
+    return {
+        'hourly_rate': _percentiles(rates),
+        'providers': len(rates),
+        'estimated_hours': _percentiles(hours),
+        'bookings': len(hours)
+    }
+
+
+class _Snapshot:
+    def __init__(self, categories, rates, hours, provider_keys, booking_keys, watermarks, stats=None):
+        self.categories = categories        # category id -> skill stem
+        self.rates = rates                  # (category id, area) -> {provider user id: hourly rate}
+        self.hours = hours                  # (category id, area) -> {booking id: estimated hours}
+        self.provider_keys = provider_keys  # provider user id -> the keys it contributes to
+        self.booking_keys = booking_keys    # booking id -> the keys it contributes to
+        self.watermarks = watermarks        # shard -> latest Booking.updated_at read
+        self.stats = stats if stats is not None else {}
+
+    def recompute(self, keys):
+        for key in keys:
+            rates, hours = self.rates.get(key, {}), self.hours.get(key, {})
+            if rates or hours:
+                self.stats[key] = _stats(list(rates.values()), list(hours.values()))
+            else:
+                self.stats.pop(key, None)
+
+
+def _keys(category_id, location):
+    return ((category_id, region_for_location(location)), (category_id, ALL_AREAS))
+
+
+def _add(samples, index, item_id, keys, value):
+    index[item_id] = keys
+    for key in keys:
+        samples.setdefault(key, {})[item_id] = value
+
+
+def _remove(samples, index, item_id):
+    keys = index.pop(item_id, ())
+    for key in keys:
+        samples[key].pop(item_id, None)
+    return keys
+
+
+class PriceIndex:
+    """Hourly rate and job length percentiles per service category and area.
+
+    Rates are the listed hourly rates of active providers offering the
+    category; hours are the estimated_hours of completed bookings. Readers
+    use a snapshot that writers never modify: a refresh copies the touched
+    groups, recomputes them and swaps the new snapshot in.
+    """
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL, rebuild_interval=REBUILD_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._snapshot = None
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    @staticmethod
+    def _load_categories():
+        categories = {}
+        for category_id, name in db.session.query(ServiceCategory.id, ServiceCategory.name).filter(ServiceCategory.is_active == True):
+            stem = category_stem(name)
+            if stem:
+                categories[category_id] = stem
+        return categories
+
+    @staticmethod
+    def _load_providers(categories, user_ids=None):
+        query = db.session.query(
+            ServiceProvider.user_id, ServiceProvider.skills, ServiceProvider.hourly_rate, User.location
+        ).join(User, ServiceProvider.user_id == User.id).filter(User.is_active == True, ServiceProvider.hourly_rate > 0)
+        if user_ids is not None:
+            query = query.filter(ServiceProvider.user_id.in_(user_ids))
+
+        providers = {}
+        for user_id, skills, hourly_rate, location in query:
+            skills = (skills or '').casefold()
+            keys = tuple(key for category_id, stem in categories.items() if stem in skills
+                         for key in _keys(category_id, location))
+            if keys:
+                providers[user_id] = (keys, hourly_rate)
+        return providers
+
+    @staticmethod
+    def _load_bookings(model, since=None, cutoff=None):
+        query = db.session.query(
+            model.id, model.service_category_id, model.estimated_hours, model.customer_location,
+            model.status, model.updated_at
+        )
+        if since is not None:
+            query = query.filter(model.updated_at >= since)
+        else:
+            query = query.filter(model.status == 'completed', model.estimated_hours > 0)
+        if cutoff is not None:
+            query = query.filter(model.scheduled_date >= cutoff)
+        return query.all()
+
+    def _load_shard(self, categories, cutoff):
+        providers = self._load_providers(categories)
+        bookings = self._load_bookings(ArchivedBooking, cutoff=cutoff) + self._load_bookings(Booking, cutoff=cutoff)
+        latest = db.session.query(func.max(Booking.updated_at)).scalar()
+        return providers, bookings, latest
+
+    def rebuild(self):
+        categories = self._load_categories()
+        cutoff = datetime.utcnow() - timedelta(days=HISTORY_DAYS)
+        rates, hours, provider_keys, booking_keys, watermarks = {}, {}, {}, {}, {}
+        for shard in shard_names():
+            with use_shard(shard):
+                providers, bookings, latest = self._load_shard(categories, cutoff)
+            for user_id, (keys, hourly_rate) in providers.items():
+                _add(rates, provider_keys, user_id, keys, hourly_rate)
+            for row in bookings:
+                if row.service_category_id in categories:
+                    _add(hours, booking_keys, row.id, _keys(row.service_category_id, row.customer_location),
+                         row.estimated_hours)
+            watermarks[shard] = latest
+
+        snapshot = _Snapshot(categories, rates, hours, provider_keys, booking_keys, watermarks)
+        snapshot.recompute(set(rates) | set(hours))
+        with self._lock:
+            self._snapshot = snapshot
+            self._built_at = self._refreshed_at = time.monotonic()
+
+    @staticmethod
+    def _copy(current, samples_name, keys):
+        """The snapshot's samples with the given groups copied, so they can be changed"""
+        samples = dict(getattr(current, samples_name))
+        for key in keys:
+            samples[key] = dict(samples.get(key, {}))
+        return samples
+
+    def update_providers(self, user_ids):
+        """Re-read the given providers (by user id) and patch their rates into the index"""
+        if self._snapshot is None:
+            return
+        user_ids = set(user_ids)
+        fresh = {}
+        for part in fan_out(lambda: self._load_providers(self._snapshot.categories, user_ids)):
+            fresh.update(part)
+        with self._lock:
+            current = self._snapshot
+            touched = {key for user_id in user_ids for key in current.provider_keys.get(user_id, ())}
+            touched |= {key for keys, _ in fresh.values() for key in keys}
+            rates = self._copy(current, 'rates', touched)
+            provider_keys = dict(current.provider_keys)
+            for user_id in user_ids:
+                _remove(rates, provider_keys, user_id)
+            for user_id, (keys, hourly_rate) in fresh.items():
+                _add(rates, provider_keys, user_id, keys, hourly_rate)
+            snapshot = _Snapshot(current.categories, rates, current.hours, provider_keys, current.booking_keys,
+                                 current.watermarks, dict(current.stats))
+            snapshot.recompute(touched)
+            self._snapshot = snapshot
+
+    def update_bookings(self):
+        """Pull bookings changed since the last read, shard by shard, and patch completed ones in"""
+        current = self._snapshot
+        changed, watermarks = [], dict(current.watermarks)
+        for shard in shard_names():
+            with use_shard(shard):
+                # >= rather than >: rows sharing the watermark timestamp are re-read; patching is idempotent
+                rows = self._load_bookings(Booking, since=watermarks.get(shard))
+            if rows:
+                changed += rows
+                watermarks[shard] = max(row.updated_at for row in rows if row.updated_at)
+
+        with self._lock:
+            current = self._snapshot
+            fresh = [(row, _keys(row.service_category_id, row.customer_location)) for row in changed]
+            touched = {key for row, keys in fresh for key in keys + current.booking_keys.get(row.id, ())}
+            hours = self._copy(current, 'hours', touched)
+            booking_keys = dict(current.booking_keys)
+            for row, keys in fresh:
+                _remove(hours, booking_keys, row.id)
+                if row.status == 'completed' and (row.estimated_hours or 0) > 0 and row.service_category_id in current.categories:
+                    _add(hours, booking_keys, row.id, keys, row.estimated_hours)
+            snapshot = _Snapshot(current.categories, current.rates, hours, current.provider_keys, booking_keys,
+                                 watermarks, dict(current.stats))
+            snapshot.recompute(touched)
+            self._snapshot = snapshot
+            self._refreshed_at = time.monotonic()
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._refreshed_at <= self.refresh_interval:
+            return
+        # One request refreshes; while it does, the others keep answering from the old snapshot
+        if not self._rebuild_lock.acquire(blocking=self._snapshot is None):
+            return
+        try:
+            if self._snapshot is None or time.monotonic() - self._built_at > self.rebuild_interval:
+                self.rebuild()
+            elif time.monotonic() - self._refreshed_at > self.refresh_interval:
+                self.update_bookings()
+        finally:
+            self._rebuild_lock.release()
+
+    def estimate(self, category_id, location=None):
+        """Rate and hours percentiles for a category in the area of location, or None for an unknown category"""
+        self.ensure_fresh()
+        snapshot = self._snapshot
+        if category_id not in snapshot.categories:
+            return None
+
+        area = region_for_location(location) if location else ALL_AREAS
+        empty = _stats([], [])
+        local = snapshot.stats.get((category_id, area), empty)
+        overall = snapshot.stats.get((category_id, ALL_AREAS), empty)
+        # Each figure falls back separately: an area may have providers but no completed jobs yet
+        rate_stats = local if local['providers'] >= MIN_SAMPLES else overall
+        hour_stats = local if local['bookings'] >= MIN_SAMPLES else overall
+        rate, hours = rate_stats['hourly_rate'], hour_stats['estimated_hours']
+
+        return {
+            'service_category_id': category_id,
+            'area': area,
+            'hourly_rate': dict(rate, providers=rate_stats['providers'],
+                                area=area if rate_stats is local else ALL_AREAS) if rate else None,
+            'estimated_hours': dict(hours, bookings=hour_stats['bookings'],
+                                    area=area if hour_stats is local else ALL_AREAS) if hours else None,
+            'estimated_total': {
+                'low': round(rate['p25'] * hours['median'], 2),
+                'typical': round(rate['median'] * hours['median'], 2),
+                'high': round(rate['p75'] * hours['median'], 2)
+            } if rate and hours else None
+        }
+
+
+price_index = PriceIndex()
+
+
+def refresh_price_estimates(user_ids):
+    """Patch committed provider changes into this worker's price index; on failure fall back to a rebuild"""
+    try:
+        price_index.update_providers(user_ids)
+    except Exception as e:
+        print(f"Error updating price estimates: {e}")
+        price_index.invalidate()
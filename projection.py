@@ -0,0 +1,319 @@
+import json
+import re
+import secrets
+from flask import current_app, jsonify
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from src.models.user import db, User, ServiceProvider, ServiceCategory, Booking, ArchivedBooking, Review
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:  # Flask < 2.2
+    DefaultJSONProvider = None
+
+
+class Field:
+    def __init__(self, key, column, is_datetime=False):
+        self.key = key
+        self.column = column
+        self.is_datetime = is_datetime
+
+
+class Nested:
+    """A nested dict that is None when its presence column is NULL (an unmatched outer join).
+
+    With a fallback Nested, the fallback's dict is used instead of None.
+    """
+
+    def __init__(self, key, presence, fields, fallback=None):
+        self.key = key
+        self.presence = presence
+        self.fields = fields
+        self.fallback = fallback
+
+
+class Projection:
+    """Column-projected equivalent of a to_dict() shape.
+
+    The selected columns and a serializer turning one result tuple into the
+    same dict as the model's to_dict() are generated once, when the
+    projection is defined, so list endpoints never hydrate ORM instances.
+    """
+
+    def __init__(self, fields):
+        self.columns = []
+        self._positions = {}
+        body = self._compile(fields)
+        namespace = {'_iso': _iso}
+        exec(f'def serialize(r):\n    return {body}\n', namespace)
+        self.serialize = namespace['serialize']
+
+    def _position(self, column):
+        # Keyed by identity: SQLAlchemy columns overload == to build SQL expressions
+        key = id(column)
+        if key not in self._positions:
+            self._positions[key] = len(self.columns)
+            self.columns.append(column)
+        return self._positions[key]
+
+    def _compile(self, fields):
+        parts = []
+        for field in fields:
+            if isinstance(field, Nested):
+                parts.append(f'{field.key!r}: {self._compile_nested(field)}')
+            elif field.is_datetime:
+                parts.append(f'{field.key!r}: _iso(r[{self._position(field.column)}])')
+            else:
+                parts.append(f'{field.key!r}: r[{self._position(field.column)}]')
+        return '{' + ', '.join(parts) + '}'
+
+    def _compile_nested(self, nested):
+        inner = self._compile(nested.fields)
+        otherwise = self._compile_nested(nested.fallback) if nested.fallback else 'None'
+        return f'({inner} if r[{self._position(nested.presence)}] is not None else {otherwise})'
+
+    def query(self):
+        return db.session.query(*self.columns)
+
+    def select(self):
+        """The same columns as a Core select, for connections outside the Flask session (src/asgi.py)"""
+        return select(*self.columns)
+
+    def serialize_all(self, rows):
+        serialize = self.serialize
+        return [serialize(row) for row in rows]
+
+
+class RawJSON:
+    """JSON encoded ahead of time (e.g. stored with the row), spliced into encode_json() output as is"""
+    __slots__ = ('json',)
+
+    def __init__(self, json):
+        self.json = json
+
+
+class FragmentProjection(Projection):
+    """A projection over one column of pre-encoded JSON; rows serialize to RawJSON"""
+
+    def __init__(self, column):
+        self.columns = [column]
+        self._positions = {id(column): 0}
+        self.serialize = lambda r: RawJSON(r[0])
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def user_fields(user):
+    """Fields of User.to_dict()"""
+    return [
+        Field('id', user.id),
+        Field('username', user.username),
+        Field('email', user.email),
+        Field('full_name', user.full_name),
+        Field('phone', user.phone),
+        Field('user_type', user.user_type),
+        Field('location', user.location),
+        Field('created_at', user.created_at, True),
+        Field('is_active', user.is_active)
+    ]
+
+
+def category_fields(category):
+    """Fields of ServiceCategory.to_dict()"""
+    return [
+        Field('id', category.id),
+        Field('name', category.name),
+        Field('description', category.description),
+        Field('icon', category.icon),
+        Field('is_active', category.is_active)
+    ]
+
+
+def provider_fields(provider, user):
+    """Fields of ServiceProvider.to_dict()"""
+    return [
+        Field('id', provider.id),
+        Field('user_id', provider.user_id),
+        Field('skills', provider.skills),
+        Field('hourly_rate', provider.hourly_rate),
+        Field('experience_years', provider.experience_years),
+        Field('description', provider.description),
+        Field('availability', provider.availability),
+        Field('rating', provider.rating),
+        Field('total_reviews', provider.total_reviews),
+        Field('is_verified', provider.is_verified),
+        Field('created_at', provider.created_at, True),
+        Nested('user', user.id, user_fields(user))
+    ]
+
+
+def booking_fields(booking, customer, provider, category):
+    """Fields of Booking.to_dict()"""
+    return [
+        Field('id', booking.id),
+        Field('customer_id', booking.customer_id),
+        Field('provider_id', booking.provider_id),
+        Field('service_category_id', booking.service_category_id),
+        Field('title', booking.title),
+        Field('description', booking.description),
+        Field('scheduled_date', booking.scheduled_date, True),
+        Field('estimated_hours', booking.estimated_hours),
+        Field('total_amount', booking.total_amount),
+        Field('status', booking.status),
+        Field('customer_location', booking.customer_location),
+        Field('created_at', booking.created_at, True),
+        Field('updated_at', booking.updated_at, True),
+        Nested('customer', customer.id, user_fields(customer)),
+        Nested('provider', provider.id, user_fields(provider)),
+        Nested('service_category', category.id, category_fields(category))
+    ]
+
+
+# ServiceProvider.to_dict(), joined to its user
+PROVIDER_PROJECTION = Projection(provider_fields(ServiceProvider, User))
+
+
+def provider_rows(core=False):
+    base = PROVIDER_PROJECTION.select() if core else PROVIDER_PROJECTION.query()
+    return base.select_from(ServiceProvider).join(User, ServiceProvider.user_id == User.id)
+
+
+# Booking.to_dict(), with customer, provider and category outer-joined
+_BookingCustomer = aliased(User, name='booking_customer')
+_BookingProvider = aliased(User, name='booking_provider')
+_BookingCategory = aliased(ServiceCategory, name='booking_category')
+
+BOOKING_PROJECTION = Projection(booking_fields(Booking, _BookingCustomer, _BookingProvider, _BookingCategory))
+
+
+def booking_rows():
+    return BOOKING_PROJECTION.query().select_from(Booking) \
+        .outerjoin(_BookingCustomer, Booking.customer_id == _BookingCustomer.id) \
+        .outerjoin(_BookingProvider, Booking.provider_id == _BookingProvider.id) \
+        .outerjoin(_BookingCategory, Booking.service_category_id == _BookingCategory.id)
+
+
+# ArchivedBooking.to_dict(), the same shape read from booking_archive
+_ArchivedCustomer = aliased(User, name='archived_customer')
+_ArchivedProvider = aliased(User, name='archived_provider')
+_ArchivedCategory = aliased(ServiceCategory, name='archived_category')
+
+ARCHIVED_BOOKING_PROJECTION = Projection(booking_fields(ArchivedBooking, _ArchivedCustomer, _ArchivedProvider, _ArchivedCategory))
+
+
+def archived_booking_rows():
+    return ARCHIVED_BOOKING_PROJECTION.query().select_from(ArchivedBooking) \
+        .outerjoin(_ArchivedCustomer, ArchivedBooking.customer_id == _ArchivedCustomer.id) \
+        .outerjoin(_ArchivedProvider, ArchivedBooking.provider_id == _ArchivedProvider.id) \
+        .outerjoin(_ArchivedCategory, ArchivedBooking.service_category_id == _ArchivedCategory.id)
+
+
+# Review.to_dict(), with the reviewer and the reviewed booking (itself nested) outer-joined;
+# bookings that were archived are read from booking_archive instead
+_Reviewer = aliased(User, name='reviewer')
+_ReviewBooking = aliased(Booking, name='review_booking')
+_ReviewBookingCustomer = aliased(User, name='review_booking_customer')
+_ReviewBookingProvider = aliased(User, name='review_booking_provider')
+_ReviewBookingCategory = aliased(ServiceCategory, name='review_booking_category')
+_ReviewArchived = aliased(ArchivedBooking, name='review_archived')
+_ReviewArchivedCustomer = aliased(User, name='review_archived_customer')
+_ReviewArchivedProvider = aliased(User, name='review_archived_provider')
+_ReviewArchivedCategory = aliased(ServiceCategory, name='review_archived_category')
+
+REVIEW_PROJECTION = Projection([
+    Field('id', Review.id),
+    Field('customer_id', Review.customer_id),
+    Field('provider_id', Review.provider_id),
+    Field('booking_id', Review.booking_id),
+    Field('rating', Review.rating),
+    Field('comment', Review.comment),
+    Field('created_at', Review.created_at, True),
+    Nested('customer', _Reviewer.id, user_fields(_Reviewer)),
+    Nested('booking', _ReviewBooking.id, booking_fields(
+        _ReviewBooking, _ReviewBookingCustomer, _ReviewBookingProvider, _ReviewBookingCategory
+    ), fallback=Nested('booking', _ReviewArchived.id, booking_fields(
+        _ReviewArchived, _ReviewArchivedCustomer, _ReviewArchivedProvider, _ReviewArchivedCategory
+    )))
+])
+
+
+def review_rows(core=False):
+    base = REVIEW_PROJECTION.select() if core else REVIEW_PROJECTION.query()
+    return base.select_from(Review) \
+        .outerjoin(_Reviewer, Review.customer_id == _Reviewer.id) \
+        .outerjoin(_ReviewBooking, Review.booking_id == _ReviewBooking.id) \
+        .outerjoin(_ReviewBookingCustomer, _ReviewBooking.customer_id == _ReviewBookingCustomer.id) \
+        .outerjoin(_ReviewBookingProvider, _ReviewBooking.provider_id == _ReviewBookingProvider.id) \
+        .outerjoin(_ReviewBookingCategory, _ReviewBooking.service_category_id == _ReviewBookingCategory.id) \
+        .outerjoin(_ReviewArchived, Review.booking_id == _ReviewArchived.id) \
+        .outerjoin(_ReviewArchivedCustomer, _ReviewArchived.customer_id == _ReviewArchivedCustomer.id) \
+        .outerjoin(_ReviewArchivedProvider, _ReviewArchived.provider_id == _ReviewArchivedProvider.id) \
+        .outerjoin(_ReviewArchivedCategory, _ReviewArchived.service_category_id == _ReviewArchivedCategory.id)
+
+
+# Shape of the admin user listing
+ADMIN_USER_PROJECTION = Projection([
+    Field('id', User.id),
+    Field('username', User.username),
+    Field('email', User.email),
+    Field('full_name', User.full_name),
+    Field('phone', User.phone),
+    Field('user_type', User.user_type),
+    Field('location', User.location),
+    Field('is_active', User.is_active),
+    Field('created_at', User.created_at, True)
+])
+
+
+# Same settings as Flask's default JSON provider, so output is byte-identical to jsonify()
+_encoder = json.JSONEncoder(ensure_ascii=True, sort_keys=True, separators=(',', ':'))
+
+
+def encode_fragment(data):
+    """JSON for one value, to be stored and later wrapped in RawJSON"""
+    return _encoder.encode(data)
+
+
+def encode_json(data):
+    """The body jsonify() produces with default settings; RawJSON values are copied in unchanged"""
+    if type(data) is list and data and all(type(item) is RawJSON for item in data):
+        return '[' + ','.join(item.json for item in data) + ']\n'
+
+    # RawJSON goes out as a placeholder string, then the quoted placeholders are swapped for the
+    # fragments; the random tag keeps a user-supplied string from ever matching one
+    raw = []
+    tag = secrets.token_hex(8)
+
+    def placeholder(value):
+        if type(value) is not RawJSON:
+            raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+        raw.append(value.json)
+        return f'{tag}:{len(raw) - 1}'
+
+    encoder = json.JSONEncoder(ensure_ascii=True, sort_keys=True, separators=(',', ':'), default=placeholder)
+    text = encoder.encode(data)
+    if raw:
+        text = re.sub(f'"{tag}:(\\d+)"', lambda m: raw[int(m.group(1))], text)
+    return text + '\n'
+
+
+def _decode_raw(data):
+    if type(data) is RawJSON:
+        return json.loads(data.json)
+    if isinstance(data, dict):
+        return {key: _decode_raw(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_decode_raw(value) for value in data]
+    return data
+
+
+def json_response(data):
+    """jsonify() for plain lists and dicts, skipping the per-call provider setup"""
+    provider = getattr(current_app, 'json', None)
+    if (current_app.debug or DefaultJSONProvider is None or type(provider) is not DefaultJSONProvider
+            or provider.compact is False or not provider.sort_keys or not provider.ensure_ascii):
+        # Pretty-printing or customised encoding: let Flask produce the exact bytes
+        return jsonify(_decode_raw(data))
+    return current_app.response_class(encode_json(data), mimetype=provider.mimetype)
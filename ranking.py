@@ -0,0 +1,163 @@
+from datetime import datetime
+import numpy as np
+from sqlalchemy import func
+from src.models.user import db, ServiceProvider, Review
+from src.models.listing import refresh_provider_listings
+from src.sharding import fan_out
+
+# Weight of the prior in the Bayesian average, in "virtual reviews"
+RATING_PRIOR_WEIGHT = 5.0
+RECENCY_HALF_LIFE_DAYS = 90.0
+BATCH_SIZE = 1000
+
+RANK_WEIGHTS = {
+    'rating': 0.55,
+    'volume': 0.15,
+    'verified': 0.10,
+    'price': 0.10,
+    'recency': 0.10
+}
+
+
+def compute_rank_scores(rating, total_reviews, is_verified, hourly_rate, last_active, now,
+                        prior_mean, median_rate, max_reviews):
+    """Vectorized ranking score for a batch of providers, in the range 0-1"""
+    rating = np.asarray(rating, dtype=np.float64)
+    total_reviews = np.asarray(total_reviews, dtype=np.float64)
+    hourly_rate = np.asarray(hourly_rate, dtype=np.float64)
+
+    # Bayesian-smoothed rating pulls providers with few reviews towards the platform mean
+    smoothed = (RATING_PRIOR_WEIGHT * prior_mean + rating * total_reviews) / (RATING_PRIOR_WEIGHT + total_reviews)
+    rating_score = smoothed / 5.0
+
+    volume_score = np.log1p(total_reviews) / np.log1p(max(max_reviews, 1))
+    verified_score = np.asarray(is_verified, dtype=np.float64)
+
+    # Cheaper than the median scores above 0.5, capped at twice as cheap
+    safe_rate = np.where(hourly_rate > 0, hourly_rate, median_rate)
+    price_score = np.clip(median_rate / safe_rate, 0.0, 2.0) / 2.0 if median_rate > 0 else np.full_like(hourly_rate, 0.5)
+
+    age_days = np.array([(now - ts).total_seconds() / 86400.0 if ts else np.inf for ts in last_active])
+    recency_score = np.exp2(-np.maximum(age_days, 0.0) / RECENCY_HALF_LIFE_DAYS)
+
+    return (RANK_WEIGHTS['rating'] * rating_score
+            + RANK_WEIGHTS['volume'] * volume_score
+            + RANK_WEIGHTS['verified'] * verified_score
+            + RANK_WEIGHTS['price'] * price_score
+            + RANK_WEIGHTS['recency'] * recency_score)
+
+
+def _shard_priors():
+    weighted, reviews, max_reviews = db.session.query(
+        func.sum(ServiceProvider.rating * ServiceProvider.total_reviews),
+        func.sum(ServiceProvider.total_reviews),
+        func.max(ServiceProvider.total_reviews)
+    ).one()
+    rates = [r for (r,) in db.session.query(ServiceProvider.hourly_rate).filter(ServiceProvider.hourly_rate > 0)]
+    return weighted or 0.0, reviews or 0, max_reviews or 0, rates
+
+
+def _platform_priors():
+    """Priors over the providers of every shard, so rank scores from different shards are comparable"""
+    parts = fan_out(_shard_priors)
+    weighted = sum(part[0] for part in parts)
+    reviews = sum(part[1] for part in parts)
+    max_reviews = max(part[2] for part in parts)
+    rates = np.array([rate for part in parts for rate in part[3]], dtype=np.float64)
+    median_rate = float(np.median(rates)) if rates.size else 0.0
+    return (weighted / reviews if reviews else 3.5), median_rate, max_reviews
+
+
+def refresh_provider_ranks(provider_ids=None):
+    """Recompute rank_score for the given ServiceProvider ids, or for every provider.
+
+    Every write to a provider goes through here, so the providers' listing
+    rows (src/models/listing.py) are rewritten too. Runs inside the caller's
+    session; the caller commits.
+    """
+    if provider_ids is not None:
+        provider_ids = sorted(set(provider_ids))
+        if not provider_ids:
+            return
+    db.session.flush()
+
+    prior_mean, median_rate, max_reviews = _platform_priors()
+    now = datetime.utcnow()
+
+    last_review = db.session.query(
+        Review.provider_id, func.max(Review.created_at).label('last_review_at')
+    ).group_by(Review.provider_id).subquery()
+
+    base = db.session.query(
+        ServiceProvider.id,
+        ServiceProvider.rating,
+        ServiceProvider.total_reviews,
+        ServiceProvider.is_verified,
+        ServiceProvider.hourly_rate,
+        ServiceProvider.created_at,
+        last_review.c.last_review_at
+    ).outerjoin(last_review, last_review.c.provider_id == ServiceProvider.user_id)
+
+    if provider_ids is None:
+        batches = _id_batches()
+    else:
+        batches = (provider_ids[i:i + BATCH_SIZE] for i in range(0, len(provider_ids), BATCH_SIZE))
+
+    for ids in batches:
+        rows = base.filter(ServiceProvider.id.in_(ids)).all()
+        if not rows:
+            continue
+        ids, rating, total_reviews, is_verified, hourly_rate, created_at, last_review_at = zip(*rows)
+        last_active = [max(filter(None, (c, r)), default=None) for c, r in zip(created_at, last_review_at)]
+        scores = compute_rank_scores(
+            [r or 0.0 for r in rating],
+            [n or 0 for n in total_reviews],
+            [bool(v) for v in is_verified],
+            [h or 0.0 for h in hourly_rate],
+            last_active, now, prior_mean, median_rate, max_reviews
+        )
+        db.session.execute(
+            ServiceProvider.__table__.update()
+            .where(ServiceProvider.__table__.c.id == db.bindparam('b_id'))
+            .values(rank_score=db.bindparam('b_score')),
+            [{'b_id': i, 'b_score': round(float(s), 6)} for i, s in zip(ids, scores)]
+        )
+
+    refresh_provider_listings(provider_ids)
+
+
+def _id_batches():
+    last_id = 0
+    while True:
+        ids = [i for (i,) in db.session.query(ServiceProvider.id)
+               .filter(ServiceProvider.id > last_id)
+               .order_by(ServiceProvider.id)
+               .limit(BATCH_SIZE)]
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def refresh_all_provider_ranks():
+    """Rescore every provider in every shard, one commit per shard; returns how many were scored.
+
+    Writes only rescore the providers they touch, against the priors of
+    that moment, so everyone else's score drifts as the platform-wide
+    priors move and their recency ages. Run periodically (python manage.py
+    rank --every 3600) to put all scores back on the same footing.
+    """
+    def rescore():
+        refresh_provider_ranks()
+        db.session.commit()
+        return db.session.query(func.count(ServiceProvider.id)).scalar()
+
+    return sum(fan_out(rescore))
+
+
+def refresh_unranked_providers():
+    """Score providers whose rank_score is still NULL, e.g. right after the column was added"""
+    ids = [i for (i,) in db.session.query(ServiceProvider.id).filter(ServiceProvider.rank_score.is_(None))]
+    if ids:
+        refresh_provider_ranks(ids)
+        db.session.commit()
@@ -0,0 +1,175 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, jsonify, request, session
+
+# Buckets idle this long are full again and carry no state worth keeping
+IDLE_SECONDS = 3600
+
+class MemoryBackend:
+    """Token buckets held in this process"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now=None):
+        """Take one token; returns 0 when allowed, else seconds until a token is available"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if tokens >= 1:
+                tokens -= 1
+            # Least recently used first, so the oldest bucket goes once the store is full
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class SQLiteBackend:
+    """Token buckets in a SQLite file shared by all workers on the host"""
+
+    def __init__(self, path, sweep_interval=300):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._pid = None
+        self._last_sweep = 0.0
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_bucket '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID'
+            )
+            self._local.conn = conn
+            self._pid = os.getpid()
+        return conn
+
+    def take(self, key, rate, burst, now=None):
+        # Wall clock, since monotonic clocks are not comparable across processes
+        now = time.time() if now is None else now
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM rate_limit_bucket WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens = min(burst, tokens + max(now - updated, 0) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if tokens >= 1:
+                tokens -= 1
+            conn.execute(
+                'INSERT INTO rate_limit_bucket (key, tokens, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                (key, tokens, now)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if now - self._last_sweep > self.sweep_interval:
+            self._last_sweep = now
+            conn.execute('DELETE FROM rate_limit_bucket WHERE updated < ?', (now - IDLE_SECONDS,))
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests per endpoint in this worker, shedding the excess"""
+
+    def __init__(self):
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, name, limit):
+        with self._lock:
+            current = self._in_flight.get(name, 0)
+            if current >= limit:
+                return False
+            self._in_flight[name] = current + 1
+            return True
+
+    def release(self, name):
+        with self._lock:
+            self._in_flight[name] -= 1
+
+
+def init_rate_limits(app):
+    """Pick the bucket store: RATE_LIMIT_STORAGE is unset for in-process, or a SQLite path shared by workers"""
+    app.config.setdefault('RATE_LIMIT_ENABLED', True)
+    app.config.setdefault('RATE_LIMITS', {})
+    storage = app.config.get('RATE_LIMIT_STORAGE')
+    app.extensions['rate_limiter'] = {
+        'buckets': SQLiteBackend(storage) if storage else MemoryBackend(),
+        'concurrency': ConcurrencyLimiter()
+    }
+
+
+def forwarded_client(forwarded_for, trusted_proxies):
+    """The client address ProxyFix picks from X-Forwarded-For behind trusted_proxies proxies, or None"""
+    if not trusted_proxies or not forwarded_for:
+        return None
+    addresses = forwarded_for.split(',')
+    if len(addresses) < trusted_proxies:
+        return None
+    return addresses[-trusted_proxies].strip()
+
+
+def _client_key():
+    if 'user_id' in session:
+        return f"user:{session['user_id']}"
+    return f"ip:{request.remote_addr}"
+
+
+def _reject(status, message, retry_after):
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limit(name, rate, burst, max_in_flight=None):
+    """Token bucket per client (user when logged in, else IP) plus an optional in-flight cap.
+
+    rate is tokens per second and burst the bucket size; both can be
+    overridden per endpoint with app.config['RATE_LIMITS'][name] = (rate, burst).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            limiter = current_app.extensions.get('rate_limiter')
+            if limiter is None or not current_app.config['RATE_LIMIT_ENABLED']:
+                return f(*args, **kwargs)
+
+            endpoint_rate, endpoint_burst = current_app.config['RATE_LIMITS'].get(name, (rate, burst))
+            try:
+                wait = limiter['buckets'].take(f'{name}:{_client_key()}', endpoint_rate, endpoint_burst)
+            except sqlite3.Error as e:
+                # Fail open: a busy limiter store must not take the endpoint down with it
+                print(f"Rate limiter unavailable: {e}")
+                wait = 0.0
+            if wait > 0:
+                return _reject(429, 'Too many requests, please slow down', wait)
+
+            if max_in_flight is None:
+                return f(*args, **kwargs)
+            if not limiter['concurrency'].acquire(name, max_in_flight):
+                return _reject(503, 'Server is busy, please retry shortly', 1)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                limiter['concurrency'].release(name)
+        return decorated_function
+    return decorator
@@ -0,0 +1,273 @@
+import json
+import math
+import re
+from datetime import datetime
+from sqlalchemy import bindparam, func, or_
+from sqlalchemy.dialects.sqlite import insert
+from src.models.user import db, Review
+
+TOP_KEYWORDS = 10
+SNIPPET_LENGTH = 160
+# Reviews with fewer content words than this are scored down, so "Good" never becomes the highlight
+FULL_SCORE_TERMS = 8
+POSITIVE_MIN_RATING = 4
+NEGATIVE_MAX_RATING = 2
+
+# Latin and Devanagari words
+_WORD = re.compile(r"[a-z\u0900-\u097f]+(?:'[a-z]+)?")
+STOPWORDS = frozenset("""
+    a about after again all also am an and any are as at be been before being but by came can could did do
+    does doing done for from get got had has have he her him his how i if in into is it its just me more
+    most my no not now of on once only or other our out over own same she should so some such than that
+    the their them then there these they this those through to too under until up us very was we were
+    what when where which while who why will with would you your really quite much many came come
+    went one two also even still well ok okay
+""".split())
+
+
+class ReviewTerm(db.Model):
+    """How many of a provider's reviews mention each keyword or two-word phrase"""
+    __tablename__ = 'review_term'
+    __table_args__ = (
+        db.Index('ix_review_term_provider_count', 'provider_id', 'review_count'),
+    )
+
+    provider_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    term = db.Column(db.String(80), primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ReviewDigest(db.Model):
+    """The terms, score and snippet of one review, kept so it can be taken out of the summary without re-reading it"""
+    __tablename__ = 'review_digest'
+    __table_args__ = (
+        db.Index('ix_review_digest_provider_score', 'provider_id', 'score'),
+    )
+
+    review_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    provider_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    rating = db.Column(db.Integer, nullable=False)
+    terms = db.Column(db.Text, nullable=False)  # JSON list
+    score = db.Column(db.Float, nullable=False, default=0.0)
+    snippet = db.Column(db.String(SNIPPET_LENGTH + 1), nullable=True)
+
+
+class ReviewSummary(db.Model):
+    """Per-provider keywords and highlight snippets, read in one row by the provider page"""
+    __tablename__ = 'review_summary'
+
+    provider_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    keywords = db.Column(db.Text, nullable=False, default='[]')  # JSON [{term, count}], most mentioned first
+    positive = db.Column(db.Text, nullable=True)  # JSON {review_id, rating, snippet}
+    negative = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'provider_id': self.provider_id,
+            'total_reviews': self.review_count,
+            'keywords': json.loads(self.keywords),
+            'highlights': {
+                'positive': json.loads(self.positive) if self.positive else None,
+                'negative': json.loads(self.negative) if self.negative else None
+            }
+        }
+
+
+def review_terms(comment):
+    """Keywords and adjacent two-word phrases of a comment, stopwords left out"""
+    words = _WORD.findall((comment or '').casefold())
+    terms = set()
+    previous = None
+    for word in words:
+        if word in STOPWORDS or len(word) < 3:
+            previous = None
+            continue
+        terms.add(word)
+        if previous:
+            terms.add(f'{previous} {word}')
+        previous = word
+    return sorted(term for term in terms if len(term) <= 80)
+
+
+def snippet(comment):
+    text = ' '.join((comment or '').split())
+    if len(text) <= SNIPPET_LENGTH:
+        return text
+    cut = text.rfind(' ', 0, SNIPPET_LENGTH)
+    return text[:cut if cut > 0 else SNIPPET_LENGTH].rstrip(' ,.;:') + '…'
+
+
+def review_snapshot(review):
+    """The fields of a review that contribute to its provider's summary"""
+    return (review.id, review.provider_id, review.rating, review.comment or '')
+
+
+def _apply_terms(provider_id, terms, sign):
+    if not terms:
+        return
+    table = ReviewTerm.__table__
+    stmt = insert(table)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['provider_id', 'term'],
+        set_={'review_count': table.c.review_count + stmt.excluded.review_count}
+    ), [{'provider_id': provider_id, 'term': term, 'review_count': sign} for term in terms])
+    if sign < 0:
+        db.session.execute(table.delete().where(table.c.provider_id == provider_id, table.c.review_count <= 0))
+
+
+def _term_score(word_counts):
+    """How much a review says what the provider's other reviews say: the mean log-count of its words"""
+    if not word_counts:
+        return 0.0
+    mean = sum(math.log1p(count) for count in word_counts) / len(word_counts)
+    return mean * min(len(word_counts), FULL_SCORE_TERMS) / FULL_SCORE_TERMS
+
+
+def _rescore_digests(provider_id, terms=None):
+    """Score a provider's digests against the current term counts.
+
+    A review's score depends on how many other reviews share its words, so a
+    write moves the scores of the reviews sharing a word whose count changed.
+    Only those are rescored when the changed terms are given, else all of them.
+    """
+    query = db.session.query(ReviewDigest.review_id, ReviewDigest.terms, ReviewDigest.score) \
+        .filter(ReviewDigest.provider_id == provider_id)
+    if terms is not None:
+        words = [term for term in terms if ' ' not in term]
+        if not words:
+            return
+        # Digests store their terms JSON-encoded, so match each word the same way
+        query = query.filter(or_(*[ReviewDigest.terms.contains(json.dumps(word), autoescape=True) for word in words]))
+    counts = dict(db.session.query(ReviewTerm.term, ReviewTerm.review_count)
+                  .filter(ReviewTerm.provider_id == provider_id, ~ReviewTerm.term.contains(' ')))
+    changed = []
+    for review_id, terms, score in query:
+        new_score = _term_score([counts.get(term, 1) for term in json.loads(terms) if ' ' not in term])
+        if new_score != score:
+            changed.append({'digest_id': review_id, 'new_score': new_score})
+    if changed:
+        table = ReviewDigest.__table__
+        db.session.execute(table.update().where(table.c.review_id == bindparam('digest_id'))
+                           .values(score=bindparam('new_score')), changed)
+
+
+def _highlight(provider_id, rating_filter):
+    digest = ReviewDigest.query.filter(ReviewDigest.provider_id == provider_id, rating_filter) \
+        .order_by(ReviewDigest.score.desc(), ReviewDigest.review_id.desc()).first()
+    if digest is None:
+        return None
+    return json.dumps({'review_id': digest.review_id, 'rating': digest.rating, 'snippet': digest.snippet})
+
+
+def refresh_review_summary(provider_id, terms=None):
+    """Rescore a provider's digests (those sharing terms, if given) and rewrite their summary row. The caller commits."""
+    db.session.flush()
+    review_count = db.session.query(func.count(ReviewDigest.review_id)) \
+        .filter(ReviewDigest.provider_id == provider_id).scalar()
+    if not review_count:
+        ReviewSummary.query.filter_by(provider_id=provider_id).delete()
+        return
+    _rescore_digests(provider_id, terms)
+
+    keywords = db.session.query(ReviewTerm.term, ReviewTerm.review_count) \
+        .filter(ReviewTerm.provider_id == provider_id) \
+        .order_by(ReviewTerm.review_count.desc(), ReviewTerm.term).limit(TOP_KEYWORDS)
+    values = {
+        'review_count': review_count,
+        'keywords': json.dumps([{'term': term, 'count': count} for term, count in keywords]),
+        'positive': _highlight(provider_id, ReviewDigest.rating >= POSITIVE_MIN_RATING),
+        'negative': _highlight(provider_id, ReviewDigest.rating <= NEGATIVE_MAX_RATING),
+        'updated_at': datetime.utcnow()
+    }
+    stmt = insert(ReviewSummary.__table__).values(provider_id=provider_id, **values)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=['provider_id'], set_=values))
+
+
+def apply_review_summary(before, after):
+    """Move one review's contribution after it was created (before=None), edited or deleted (after=None).
+
+    Only the new comment is tokenized; the old terms come from the review's
+    digest. Runs inside the caller's session; the caller commits.
+    """
+    if before == after:
+        return
+    digest = ReviewDigest.query.get(before[0]) if before is not None else None
+    old_terms = json.loads(digest.terms) if digest is not None else []
+    retokenize = digest is None or after is None or (before[1], before[3]) != (after[1], after[3])
+
+    # Terms whose counts moved, per provider; only digests sharing one of them need rescoring
+    changed_terms = {}
+    if digest is not None:
+        old_changed = changed_terms.setdefault(digest.provider_id, set())
+        if retokenize:
+            _apply_terms(digest.provider_id, old_terms, -1)
+            old_changed.update(old_terms)
+        if after is None:
+            db.session.delete(digest)
+
+    if after is not None:
+        review_id, provider_id, rating, comment = after
+        terms = review_terms(comment) if retokenize else old_terms
+        if retokenize:
+            _apply_terms(provider_id, terms, 1)
+        db.session.flush()
+        values = {
+            'provider_id': provider_id,
+            'rating': rating,
+            'terms': json.dumps(terms),
+            # Scored with the provider's other digests in refresh_review_summary()
+            'score': 0.0,
+            'snippet': snippet(comment) or None
+        }
+        stmt = insert(ReviewDigest.__table__).values(review_id=review_id, **values)
+        # Unchanged terms keep their score, since no rescore will pick this digest up
+        updated = values if retokenize else {k: v for k, v in values.items() if k != 'score'}
+        db.session.execute(stmt.on_conflict_do_update(index_elements=['review_id'], set_=updated))
+        new_changed = changed_terms.setdefault(provider_id, set())
+        if retokenize:
+            new_changed.update(terms)
+
+    for provider_id, terms in changed_terms.items():
+        refresh_review_summary(provider_id, terms)
+
+
+def rebuild_review_summaries():
+    """Recompute every summary from the review table, for existing databases"""
+    ReviewSummary.query.delete()
+    ReviewDigest.query.delete()
+    ReviewTerm.query.delete()
+
+    reviews = db.session.query(Review.id, Review.provider_id, Review.rating, Review.comment).all()
+    counts, digests = {}, []
+    for review_id, provider_id, rating, comment in reviews:
+        terms = review_terms(comment)
+        for term in terms:
+            counts[(provider_id, term)] = counts.get((provider_id, term), 0) + 1
+        digests.append((review_id, provider_id, rating, comment, terms))
+
+    db.session.bulk_insert_mappings(ReviewTerm, [
+        {'provider_id': provider_id, 'term': term, 'review_count': count}
+        for (provider_id, term), count in counts.items()
+    ])
+    # Scores are filled in per provider by refresh_review_summary(), the same as on every review write
+    db.session.bulk_insert_mappings(ReviewDigest, [
+        {
+            'review_id': review_id, 'provider_id': provider_id, 'rating': rating, 'terms': json.dumps(terms),
+            'score': 0.0, 'snippet': snippet(comment) or None
+        }
+        for review_id, provider_id, rating, comment, terms in digests
+    ])
+
+    for provider_id in {provider_id for _, provider_id, _, _, _ in digests}:
+        refresh_review_summary(provider_id)
+    db.session.commit()
+
+
+def backfill_review_summaries():
+    """Build the summaries once for databases that have reviews but no digests yet"""
+    has_digests = db.session.query(ReviewDigest.query.exists()).scalar()
+    has_reviews = db.session.query(Review.query.exists()).scalar()
+    if has_reviews and not has_digests:
+        rebuild_review_summaries()
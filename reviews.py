@@ -1,6 +1,13 @@
 from flask import Blueprint, jsonify, request, session
-from src.models.user import User, Review, Booking, ServiceProvider, db
+from src.models.user import User, Review, Booking, ArchivedBooking, ServiceProvider, db
+from src.models.ranking import refresh_provider_ranks
+from src.models.typeahead import refresh_typeahead
+from src.models.review_summary import ReviewSummary, apply_review_summary, review_snapshot
+from src.models.projection import REVIEW_PROJECTION, review_rows, json_response
+from src.idempotency import idempotent
+from src.sharding import fan_out, home_shard, select_shard, shard_for_id
 from sqlalchemy import func
+import heapq
 
 reviews_bp = Blueprint('reviews', __name__)
 
@@ -12,22 +19,34 @@ def get_reviews():
         customer_id = request.args.get('customer_id', type=int)
         booking_id = request.args.get('booking_id', type=int)
         
-        query = Review.query
+        def load():
+            query = review_rows()
+            
+            if provider_id:
+                query = query.filter(Review.provider_id == provider_id)
+            if customer_id:
+                query = query.filter(Review.customer_id == customer_id)
+            if booking_id:
+                query = query.filter(Review.booking_id == booking_id)
+            
+            rows = query.order_by(Review.created_at.desc())
+            return REVIEW_PROJECTION.serialize_all(rows)
         
+        # Reviews are stored with the reviewed provider and their bookings
         if provider_id:
-            query = query.filter_by(provider_id=provider_id)
-        if customer_id:
-            query = query.filter_by(customer_id=customer_id)
-        if booking_id:
-            query = query.filter_by(booking_id=booking_id)
-        
-        reviews = query.order_by(Review.created_at.desc()).all()
-        return jsonify([review.to_dict() for review in reviews])
+            shards = [home_shard(provider_id)]
+        elif booking_id:
+            shards = [shard_for_id(booking_id)]
+        else:
+            shards = None
+        reviews = heapq.merge(*fan_out(load, shards), key=lambda r: r['created_at'] or '', reverse=True)
+        return json_response(list(reviews))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @reviews_bp.route('/', methods=['POST'])
+@idempotent
 def create_review():
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
@@ -36,8 +55,11 @@ def create_review():
         data = request.json
         customer_id = session['user_id']
         
+        # Stored in the shard of the booking, next to the provider's profile
+        select_shard(shard_for_id(data['booking_id']))
+        
         # Validate booking exists and is completed
-        booking = Booking.query.get(data['booking_id'])
+        booking = Booking.query.get(data['booking_id']) or ArchivedBooking.query.get(data['booking_id'])
         if not booking:
             return jsonify({'error': 'Booking not found'}), 404
         
@@ -67,11 +89,14 @@ def create_review():
         )
         
         db.session.add(review)
+        db.session.flush()
+        apply_review_summary(None, review_snapshot(review))
         
         # Update service provider's rating
         update_provider_rating(booking.provider_id)
         
         db.session.commit()
+        refresh_typeahead([booking.provider_id])
         
         return jsonify(review.to_dict()), 201
         
@@ -81,6 +106,7 @@ def create_review():
 
 @reviews_bp.route('/<int:review_id>', methods=['GET'])
 def get_review(review_id):
+    select_shard(shard_for_id(review_id))
     review = Review.query.get_or_404(review_id)
     return jsonify(review.to_dict())
 
@@ -92,12 +118,15 @@ def update_review(review_id):
     try:
         data = request.json
         user_id = session['user_id']
+        select_shard(shard_for_id(review_id))
         review = Review.query.get_or_404(review_id)
         
         # Only the customer who wrote the review can update it
         if review.customer_id != user_id:
             return jsonify({'error': 'You can only update your own reviews'}), 403
         
+        before = review_snapshot(review)
+        
         # Update review fields
         if 'rating' in data:
             rating = data['rating']
@@ -108,10 +137,13 @@ def update_review(review_id):
         if 'comment' in data:
             review.comment = data['comment']
         
+        apply_review_summary(before, review_snapshot(review))
+        
         # Update service provider's rating
         update_provider_rating(review.provider_id)
         
         db.session.commit()
+        refresh_typeahead([review.provider_id])
         
         return jsonify(review.to_dict())
         
@@ -126,6 +158,7 @@ def delete_review(review_id):
     
     try:
         user_id = session['user_id']
+        select_shard(shard_for_id(review_id))
         review = Review.query.get_or_404(review_id)
         
         # Only the customer who wrote the review can delete it
@@ -133,12 +166,14 @@ def delete_review(review_id):
             return jsonify({'error': 'You can only delete your own reviews'}), 403
         
         provider_id = review.provider_id
+        apply_review_summary(review_snapshot(review), None)
         db.session.delete(review)
         
         # Update service provider's rating
         update_provider_rating(provider_id)
         
         db.session.commit()
+        refresh_typeahead([provider_id])
         
         return '', 204
         
@@ -149,6 +184,8 @@ def delete_review(review_id):
 @reviews_bp.route('/provider/<int:provider_id>/stats', methods=['GET'])
 def get_provider_review_stats(provider_id):
     try:
+        select_shard(home_shard(provider_id))
+        
         # Get rating distribution
         rating_stats = db.session.query(
             Review.rating,
@@ -174,6 +211,19 @@ def get_provider_review_stats(provider_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@reviews_bp.route('/provider/<int:provider_id>/summary', methods=['GET'])
+def get_provider_review_summary(provider_id):
+    """Top keywords and the most representative positive and negative snippets, without loading every review"""
+    try:
+        select_shard(home_shard(provider_id))
+        summary = ReviewSummary.query.get(provider_id)
+        if summary is None:
+            summary = ReviewSummary(provider_id=provider_id, review_count=0, keywords='[]')
+        return json_response(summary.to_dict())
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 def update_provider_rating(provider_id):
     """Update the cached rating for a service provider"""
     try:
@@ -186,6 +236,7 @@ def update_provider_rating(provider_id):
         if provider:
             provider.rating = round(avg_rating, 2) if avg_rating else 0.0
             provider.total_reviews = total_reviews or 0
+            refresh_provider_ranks([provider.id])
             
     except Exception as e:
         # Log error but don't raise to avoid breaking the main operation
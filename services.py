@@ -1,5 +1,14 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, abort, jsonify, request, session
 from src.models.user import User, ServiceProvider, ServiceCategory, db
+from src.models.ranking import refresh_provider_ranks
+from src.models.typeahead import typeahead_index, refresh_typeahead
+from src.models.pricing import price_index, refresh_price_estimates
+from src.models.projection import RawJSON, json_response
+from src.models.listing import ProviderListing, PROVIDER_LISTING_PROJECTION, listing_rows
+from src.ratelimit import rate_limit
+from src.sharding import fan_out, home_shard, select_shard, shard_for_id
+from itertools import islice
+import heapq
 import json
 
 services_bp = Blueprint('services', __name__)
@@ -33,53 +42,127 @@ def create_category():
         return jsonify({'error': str(e)}), 500
 
 # Service Providers
+PROVIDER_SEARCH_LIMIT = {'rate': 5, 'burst': 20, 'max_in_flight': 8}
+PROVIDER_PAGE_SIZE = 20
+MAX_PROVIDER_PAGE_SIZE = 100
+REVIEWS_PAGE_SIZE = 20
+MAX_REVIEWS_PAGE_SIZE = 100
+
+def review_page(args):
+    """(limit, offset) of the ?page and ?limit of a provider's reviews, newest first; (None, 0) lists them all"""
+    if 'page' not in args and 'limit' not in args:
+        return None, 0
+    limit = min(max(args.get('limit', REVIEWS_PAGE_SIZE, type=int), 1), MAX_REVIEWS_PAGE_SIZE)
+    page = max(args.get('page', 1, type=int), 1)
+    return limit, (page - 1) * limit
+
+def provider_search(query, args):
+    """Apply the search filters, sort and limit in args to provider listing rows, as an ORM query or a Core select.
+
+    Returns the query, the row limit and whether rows are ranked; rows end
+    with (rank_score, id) when ranked, else with id, for merge_provider_rows().
+    """
+    # Get query parameters for filtering
+    category = args.get('category')
+    location = args.get('location')
+    min_rating = args.get('min_rating', type=float)
+    max_rate = args.get('max_rate', type=float)
+    search = args.get('search')
+    sort = args.get('sort')
+    limit = args.get('limit', type=int)
+    if limit is not None:
+        limit = min(max(limit, 1), MAX_PROVIDER_PAGE_SIZE)
+    
+    # Base query
+    query = query.filter(ProviderListing.is_active == True)
+    
+    # Apply filters
+    if category:
+        # Filter by skills containing the category
+        query = query.filter(ProviderListing.skills.contains(category))
+    
+    if location:
+        query = query.filter(ProviderListing.location.contains(location))
+    
+    if min_rating:
+        query = query.filter(ProviderListing.rating >= min_rating)
+    
+    if max_rate:
+        query = query.filter(ProviderListing.hourly_rate <= max_rate)
+    
+    if search:
+        search_term = f"%{search}%"
+        query = query.filter(
+            db.or_(
+                ProviderListing.full_name.contains(search_term),
+                ProviderListing.description.contains(search_term),
+                ProviderListing.skills.contains(search_term)
+            )
+        )
+    
+    if sort == 'rank':
+        # Walks the (is_active, rank_score) index and stops after the top k matches in each shard
+        limit = limit or PROVIDER_PAGE_SIZE
+        query = query.add_columns(ProviderListing.rank_score, ProviderListing.provider_id) \
+            .order_by(ProviderListing.rank_score.desc(), ProviderListing.provider_id).limit(limit)
+    else:
+        # Listings are deleted and reinserted on every write, so only an explicit order keeps the list stable
+        query = query.add_columns(ProviderListing.provider_id).order_by(ProviderListing.provider_id)
+        if limit:
+            query = query.limit(limit)
+    return query, limit, sort == 'rank'
+
+def merge_provider_rows(results, limit, ranked):
+    """One row sequence from the per-shard results of a provider_search() query"""
+    if ranked:
+        # The projection reads its own columns by position, so the two appended ones only drive the merge
+        rows = heapq.merge(*results, key=lambda row: (-(row[-2] or 0.0), row[-1]))
+    else:
+        rows = heapq.merge(*results, key=lambda row: row[-1])
+    return islice(rows, limit) if limit else rows
+
 @services_bp.route('/providers', methods=['GET'])
+@rate_limit('provider_search', **PROVIDER_SEARCH_LIMIT)
 def get_providers():
     try:
-        # Get query parameters for filtering
-        category = request.args.get('category')
-        location = request.args.get('location')
-        min_rating = request.args.get('min_rating', type=float)
-        max_rate = request.args.get('max_rate', type=float)
-        search = request.args.get('search')
-        
-        # Base query
-        query = ServiceProvider.query.join(User).filter(User.is_active == True)
-        
-        # Apply filters
-        if category:
-            # Filter by skills containing the category
-            query = query.filter(ServiceProvider.skills.contains(category))
-        
-        if location:
-            query = query.filter(User.location.contains(location))
-        
-        if min_rating:
-            query = query.filter(ServiceProvider.rating >= min_rating)
-        
-        if max_rate:
-            query = query.filter(ServiceProvider.hourly_rate <= max_rate)
-        
-        if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                db.or_(
-                    User.full_name.contains(search_term),
-                    ServiceProvider.description.contains(search_term),
-                    ServiceProvider.skills.contains(search_term)
-                )
-            )
-        
-        providers = query.all()
-        return jsonify([provider.to_dict() for provider in providers])
+        query, limit, ranked = provider_search(listing_rows(), request.args)
+        rows = merge_provider_rows(fan_out(query.all), limit, ranked)
+        return json_response(PROVIDER_LISTING_PROJECTION.serialize_all(rows))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@services_bp.route('/providers/suggest', methods=['GET'])
+def suggest_providers():
+    """Typeahead suggestions for ?q, matched on provider name, skills and location"""
+    try:
+        suggestions = typeahead_index.search(request.args.get('q', ''), request.args.get('limit', 8, type=int))
+        return json_response(suggestions)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@services_bp.route('/estimate', methods=['GET'])
+def get_price_estimate():
+    """Typical hourly rate, job length and total for ?category_id in the area of ?location"""
+    category_id = request.args.get('category_id', type=int)
+    if category_id is None:
+        return jsonify({'error': 'category_id is required'}), 400
+    
+    try:
+        estimate = price_index.estimate(category_id, request.args.get('location'))
+        if estimate is None:
+            return jsonify({'error': 'Service category not found'}), 404
+        return json_response(estimate)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @services_bp.route('/providers/<int:provider_id>', methods=['GET'])
 def get_provider(provider_id):
-    provider = ServiceProvider.query.get_or_404(provider_id)
-    return jsonify(provider.to_dict())
+    select_shard(shard_for_id(provider_id))
+    fragment = db.session.query(ProviderListing.fragment).filter(ProviderListing.provider_id == provider_id).scalar()
+    if fragment is None:
+        abort(404)
+    return json_response(RawJSON(fragment))
 
 @services_bp.route('/providers/profile', methods=['GET'])
 def get_my_provider_profile():
@@ -90,6 +173,7 @@ def get_my_provider_profile():
     if user.user_type != 'service_provider':
         return jsonify({'error': 'Not a service provider'}), 403
     
+    select_shard(home_shard(user.id))
     if not user.service_provider_profile:
         return jsonify({'error': 'Provider profile not found'}), 404
     
@@ -105,6 +189,7 @@ def update_provider_profile():
         if user.user_type != 'service_provider':
             return jsonify({'error': 'Not a service provider'}), 403
         
+        select_shard(home_shard(user.id))
         data = request.json
         provider = user.service_provider_profile
         
@@ -125,7 +210,11 @@ def update_provider_profile():
         if 'availability' in data:
             provider.availability = json.dumps(data['availability'])
         
+        db.session.flush()
+        refresh_provider_ranks([provider.id])
         db.session.commit()
+        refresh_typeahead([user.id])
+        refresh_price_estimates([user.id])
         return jsonify(provider.to_dict())
         
     except Exception as e:
@@ -134,10 +223,14 @@ def update_provider_profile():
 
 @services_bp.route('/providers/<int:provider_id>/reviews', methods=['GET'])
 def get_provider_reviews(provider_id):
+    """A provider's reviews, newest first; one page of them with ?page or ?limit (up to MAX_REVIEWS_PAGE_SIZE)"""
     from src.models.user import Review
     
+    select_shard(shard_for_id(provider_id))
     provider = ServiceProvider.query.get_or_404(provider_id)
-    reviews = Review.query.filter_by(provider_id=provider.user_id).order_by(Review.created_at.desc()).all()
+    limit, offset = review_page(request.args)
+    reviews = Review.query.filter_by(provider_id=provider.user_id) \
+        .order_by(Review.created_at.desc(), Review.id.desc()).limit(limit).offset(offset).all()
     
     return jsonify([review.to_dict() for review in reviews])
 
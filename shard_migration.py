@@ -0,0 +1,166 @@
+"""
+Move rows written before sharding was enabled out of the main database.
+
+With SHARD_DIRECTORY set, the sharded tables are only read from the region
+shards, so rows left in the main file would vanish. Run once, with the app
+stopped, after setting SHARD_DIRECTORY:
+    python manage.py shard-existing
+"""
+
+from sqlalchemy import create_engine, text
+from src.models.user import db
+from src.models.listing import refresh_provider_listings
+from src.models.ranking import refresh_all_provider_ranks
+from src.models.review_summary import rebuild_review_summaries
+from src.sharding import shard_for_location, shard_names, shard_router, use_shard
+
+# Copied tables and how each row finds its shard: through the provider's user row, or from the customer's address
+ROUTES = {
+    'service_provider': 'user_id',
+    'booking': 'provider_id',
+    'booking_archive': 'provider_id',
+    'review': 'provider_id',
+    'provider_rollup': 'provider_id',
+    'service_request': 'customer_location',
+}
+# Archived bookings keep their booking ids, so both tables draw from booking's sequence
+ID_SPACES = {'booking_archive': 'booking'}
+# Columns holding booking ids, rewritten to the moved bookings' new ids
+BOOKING_REFERENCES = {('review', 'booking_id'), ('service_request', 'booking_id')}
+# Derived from the copied tables; emptied in the main file and rebuilt in each shard
+REBUILT_TABLES = ('provider_listing', 'review_term', 'review_digest', 'review_summary')
+# The shard may already hold totals for the same key, written while the provider's profile was still unsharded
+_ROLLUP_MERGE = (
+    'ON CONFLICT (provider_id, period_type, period_start, status) DO UPDATE SET '
+    'booking_count = booking_count + excluded.booking_count, '
+    'total_amount = total_amount + excluded.total_amount, '
+    'total_hours = total_hours + excluded.total_hours'
+)
+_MOVED_BOOKING = ("(SELECT new_id FROM temp.shard_move "
+                  "WHERE source IN ('booking', 'booking_archive') AND id = {column})")
+
+
+def _shard_of(home_shard, location):
+    return home_shard if home_shard in shard_router.names else shard_for_location(location)
+
+
+def _scalar(conn, statement, **params):
+    return conn.execute(text(statement), params).scalar() or 0
+
+
+def _route(conn):
+    # A provider's rows follow them, so their home shard is fixed here for good
+    conn.execute(text('UPDATE main.user SET home_shard = shard_of(home_shard, location) '
+                      'WHERE id IN (SELECT user_id FROM main.service_provider)'))
+    for source, column in ROUTES.items():
+        if column == 'customer_location':
+            shard, join = 'shard_of(NULL, x.customer_location)', ''
+        else:
+            shard, join = 'shard_of(u.home_shard, u.location)', f'LEFT JOIN main.user u ON u.id = x.{column}'
+        conn.execute(text(f'INSERT INTO temp.shard_move (source, id, shard) '
+                          f'SELECT :source, x.id, {shard} FROM main.{source} x {join}'), {'source': source})
+
+
+def _renumber(conn, schemas):
+    """New ids above everything each shard has handed out, inside the shard's block, so an id still names its shard"""
+    for name, schema in schemas.items():
+        for space in {ID_SPACES.get(source, source) for source in ROUTES}:
+            sources = [source for source in ROUTES if ID_SPACES.get(source, source) == space]
+            offset = max([shard_router.id_base(name),
+                          _scalar(conn, f'SELECT seq FROM {schema}.sqlite_sequence WHERE name = :name', name=space)]
+                         + [_scalar(conn, f'SELECT MAX(id) FROM {schema}.{source}') for source in sources])
+            for source in sources:
+                conn.execute(text('UPDATE temp.shard_move SET new_id = id + :offset WHERE source = :source AND shard = :shard'),
+                             {'offset': offset, 'source': source, 'shard': name})
+
+
+def _copy(conn, schemas):
+    for source in ROUTES:
+        columns = [c.name for c in db.metadata.tables[source].columns]
+        values = ['m.new_id' if c == 'id'
+                  else f'COALESCE({_MOVED_BOOKING.format(column=f"x.{c}")}, x.{c})' if (source, c) in BOOKING_REFERENCES
+                  else f'x.{c}'
+                  for c in columns]
+        conflict = _ROLLUP_MERGE if source == 'provider_rollup' else ''
+        for name, schema in schemas.items():
+            conn.execute(text(
+                f'INSERT INTO {schema}.{source} ({", ".join(columns)}) SELECT {", ".join(values)} '
+                f'FROM main.{source} x JOIN temp.shard_move m ON m.source = :source AND m.id = x.id '
+                f'WHERE m.shard = :shard {conflict}'
+            ), {'source': source, 'shard': name})
+        conn.execute(text(f'DELETE FROM main.{source} WHERE id IN (SELECT id FROM temp.shard_move WHERE source = :source)'),
+                     {'source': source})
+
+    for schema in schemas.values():
+        # Copying explicit ids advanced booking's sequence past the live bookings; archived ids count too
+        conn.execute(text(f"UPDATE {schema}.sqlite_sequence SET seq = MAX(seq, "
+                          f"(SELECT COALESCE(MAX(id), 0) FROM {schema}.booking_archive)) WHERE name = 'booking'"))
+    for table in REBUILT_TABLES:
+        conn.execute(text(f'DELETE FROM main.{table}'))
+
+
+def _update_analytics(conn):
+    # Counted bookings keep their state under the new id, so re-reading every shard below counts nothing twice
+    conn.execute(text(
+        'UPDATE main.analytics_booking_state SET booking_id = '
+        + _MOVED_BOOKING.format(column='analytics_booking_state.booking_id')
+        + " WHERE booking_id IN (SELECT id FROM temp.shard_move WHERE source IN ('booking', 'booking_archive'))"
+    ))
+    conn.execute(text("DELETE FROM main.analytics_watermark WHERE name LIKE 'booking_updated_at:%'"))
+
+
+def move_rows_to_shards(verbose=False):
+    """Move every row of the sharded tables left in the main database into its region shard.
+
+    Rows get new ids in their shard's block, and columns pointing at moved
+    bookings are rewritten to match. All files change in one transaction,
+    taken with WAL off because SQLite only commits attached WAL databases
+    atomically per file. Returns the number of rows moved per table.
+    """
+    schemas = {name: f'shard_{name}' for name in shard_router.names}
+    # Switching out of WAL needs this to be the only connection to each file
+    db.engine.dispose()
+    shard_router.dispose()
+    engine = create_engine(f'sqlite:///{shard_router.global_path}', isolation_level='AUTOCOMMIT')
+    with engine.connect() as conn:
+        conn.connection.dbapi_connection.create_function('shard_of', 2, _shard_of, deterministic=True)
+        for name, schema in schemas.items():
+            conn.execute(text(f'ATTACH DATABASE :path AS {schema}'), {'path': shard_router.path(name)})
+        for schema in ('main', *schemas.values()):
+            conn.execute(text(f'PRAGMA {schema}.journal_mode = DELETE'))
+        try:
+            conn.execute(text('BEGIN IMMEDIATE'))
+            try:
+                conn.execute(text('CREATE TEMP TABLE shard_move (source TEXT, id INTEGER, shard TEXT, new_id INTEGER, '
+                                  'PRIMARY KEY (source, id))'))
+                _route(conn)
+                _renumber(conn, schemas)
+                _copy(conn, schemas)
+                _update_analytics(conn)
+                moved = dict(conn.execute(text('SELECT source, COUNT(*) FROM temp.shard_move GROUP BY source')).all())
+                conn.execute(text('COMMIT'))
+            except Exception:
+                conn.execute(text('ROLLBACK'))
+                raise
+        finally:
+            for schema in ('main', *schemas.values()):
+                conn.execute(text(f'PRAGMA {schema}.journal_mode = WAL'))
+    engine.dispose()
+
+    if verbose:
+        for source in ROUTES:
+            print(f"Moved {moved.get(source, 0)} {source} rows into the shards")
+    return moved
+
+
+def rebuild_shard_tables():
+    """Rebuild review summaries, listings and rank scores in every shard from the rows now there"""
+    for shard in shard_names():
+        with use_shard(shard):
+            rebuild_review_summaries()
+    # Priors span every shard, so moved and existing providers are scored on one scale
+    refresh_all_provider_ranks()
+    for shard in shard_names():
+        with use_shard(shard):
+            refresh_provider_listings()
+            db.session.commit()
@@ -0,0 +1,246 @@
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event, inspect, text
+
+try:
+    from flask_sqlalchemy.session import Session as _FlaskSession
+except ImportError:  # Flask-SQLAlchemy < 3 has no pluggable session class, so sharding is unavailable
+    _FlaskSession = None
+
+# Sharded tables allocate ids from one block per shard, so an id alone names its shard
+ID_BLOCK = 10 ** 12
+
+# Region shards and the areas routed to each; locations naming none of them go to DEFAULT_REGION
+REGION_AREAS = {
+    'kathmandu': ('kathmandu', 'thamel', 'baneshwor', 'koteshwor', 'kalanki', 'boudha', 'maharajgunj',
+                  'kirtipur', 'lalitpur', 'patan', 'bhaktapur'),
+    'pokhara': ('pokhara', 'lakeside'),
+    'chitwan': ('chitwan', 'bharatpur', 'hetauda'),
+    'eastern': ('biratnagar', 'dharan', 'itahari', 'birgunj', 'janakpur'),
+    'western': ('butwal', 'bhairahawa', 'nepalgunj', 'dhangadhi')
+}
+DEFAULT_REGION = 'other'
+SHARD_NAMES = tuple(REGION_AREAS) + (DEFAULT_REGION,)
+
+# Tables that live in the region shards. Everything else (users, categories, analytics, ...)
+# stays in the global database, which every shard connection attaches
+SHARDED_TABLES = ('service_provider', 'booking', 'booking_archive', 'review', 'provider_rollup', 'service_request',
+                  'review_term', 'review_digest', 'review_summary', 'provider_listing')
+
+_current_shard = ContextVar('current_shard', default=None)
+
+
+def region_for_location(location):
+    """Region of a free-text location; the earliest area named wins, as addresses run most specific first"""
+    lowered = (location or '').casefold()
+    best = None
+    for region, areas in REGION_AREAS.items():
+        for area in areas:
+            position = lowered.find(area)
+            if position >= 0 and (best is None or position < best[0]):
+                best = (position, region)
+    return best[1] if best else DEFAULT_REGION
+
+
+class ShardRouter:
+    """Engines for the region shard files.
+
+    Each shard connection ATTACHes the global database. SQLite resolves an
+    unqualified table name in the main database first, then in attached ones,
+    so queries joining sharded tables to user or service_category work as-is.
+    A transaction writing both a shard and the global file is atomic per file only.
+    """
+
+    def __init__(self):
+        self.names = ()
+        self.directory = None
+        self.global_path = None
+        self._engines = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.names)
+
+    def configure(self, directory, global_path, names=SHARD_NAMES):
+        self.directory = directory
+        self.global_path = global_path
+        self.names = tuple(names)
+        self.dispose()
+
+    def path(self, name):
+        return os.path.join(self.directory, f'shard_{name}.db')
+
+    def id_base(self, name):
+        return (self.names.index(name) + 1) * ID_BLOCK
+
+    def shard_for_id(self, row_id):
+        index = row_id // ID_BLOCK - 1
+        return self.names[index] if 0 <= index < len(self.names) else None
+
+    def engine(self, name):
+        if self._pid != os.getpid():
+            # Pooled connections must not be shared with a forked parent
+            self._engines = {}
+            self._pid = os.getpid()
+        engine = self._engines.get(name)
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get(name)
+                if engine is None:
+                    engine = create_engine(f'sqlite:///{self.path(name)}', connect_args={'timeout': 30})
+                    event.listen(engine, 'connect', self.attach_global)
+                    self._engines[name] = engine
+        return engine
+
+    def attach_global(self, dbapi_connection, _):
+        """Connect listener; through a cursor so it also works on the async driver's adapted connections"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute('ATTACH DATABASE ? AS global_db', (self.global_path,))
+        cursor.close()
+
+    def dispose(self):
+        for engine in self._engines.values():
+            engine.dispose()
+        self._engines = {}
+
+
+shard_router = ShardRouter()
+
+
+if _FlaskSession is not None:
+    class ShardSession(_FlaskSession):
+        """Sends every statement to the shard selected for the current request or job, if any"""
+
+        def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+            shard = _current_shard.get()
+            if bind is None and shard is not None and shard_router.enabled:
+                return shard_router.engine(shard)
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+else:
+    ShardSession = None
+
+
+def session_options():
+    return {'class_': ShardSession} if ShardSession is not None else {}
+
+
+def init_sharding(app):
+    """Enable region shards when SHARD_DIRECTORY is set; the global database must be a SQLite file"""
+    directory = app.config.get('SHARD_DIRECTORY')
+    if not directory:
+        return
+    if ShardSession is None:
+        raise RuntimeError('Sharding requires Flask-SQLAlchemy 3')
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if not uri.startswith('sqlite:///') or uri == 'sqlite:///:memory:':
+        raise RuntimeError('Sharding requires the global database to be a SQLite file')
+    os.makedirs(directory, exist_ok=True)
+    shard_router.configure(directory, uri[len('sqlite:///'):], app.config.get('SHARD_NAMES', SHARD_NAMES))
+
+    @app.teardown_request
+    def clear_shard(exc):
+        _current_shard.set(None)
+
+
+def shard_for_location(location):
+    """Shard holding data for a location, or None when sharding is off"""
+    if not shard_router.enabled:
+        return None
+    region = region_for_location(location)
+    return region if region in shard_router.names else shard_router.names[-1]
+
+
+def shard_for_id(row_id):
+    return shard_router.shard_for_id(row_id) if shard_router.enabled else None
+
+
+def home_shard(user_id):
+    """Shard holding a provider's profile, bookings and reviews, or None when sharding is off"""
+    if not shard_router.enabled:
+        return None
+    from src.models.user import db, User
+    row = db.session.query(User.home_shard, User.location).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    # Fixed at registration, so the provider's rows stay put if their location text changes
+    return row.home_shard or shard_for_location(row.location)
+
+
+def shard_names():
+    """Every shard, or [None] (the single database) when sharding is off"""
+    return list(shard_router.names) if shard_router.enabled else [None]
+
+
+def select_shard(name):
+    """Route the rest of this request's statements to a shard (None is the global database)"""
+    _current_shard.set(name)
+
+
+def current_shard():
+    return _current_shard.get()
+
+
+@contextmanager
+def use_shard(name):
+    token = _current_shard.set(name)
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+
+def fan_out(fn, shards=None):
+    """Call fn() once per shard with that shard selected and return the results in shard order.
+
+    Only meaningful for sharded tables: global tables are visible from every
+    shard and would be counted once per shard. Without sharding fn runs once.
+    """
+    results = []
+    for name in shard_names() if shards is None else shards:
+        with use_shard(name):
+            results.append(fn())
+    return results
+
+
+def prepare_shards(metadata):
+    """Create the sharded tables in every shard file and start each shard's ids in its own block"""
+    if not shard_router.enabled:
+        return
+    tables = [metadata.tables[name] for name in SHARDED_TABLES if name in metadata.tables]
+    global_engine = create_engine(f'sqlite:///{shard_router.global_path}')
+    with global_engine.begin() as conn:
+        # Readers must not block the other connections writing the global file
+        conn.execute(text('PRAGMA journal_mode=WAL'))
+    global_engine.dispose()
+
+    for name in shard_router.names:
+        # Plain engine, without the global database attached, so DDL only sees the shard
+        engine = create_engine(f'sqlite:///{shard_router.path(name)}')
+        with engine.begin() as conn:
+            conn.execute(text('PRAGMA journal_mode=WAL'))
+            metadata.create_all(conn, tables=tables)
+            for table in tables:
+                if not table.dialect_options['sqlite']['autoincrement']:
+                    continue
+                conn.execute(text(
+                    'INSERT INTO sqlite_sequence (name, seq) SELECT :table, :base '
+                    'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :table)'
+                ), {'table': table.name, 'base': shard_router.id_base(name)})
+        engine.dispose()
+
+
+def rows_outside_shards(metadata):
+    """Sharded tables still holding rows in the global database, where sharded queries never look"""
+    if not shard_router.enabled:
+        return []
+    engine = create_engine(f'sqlite:///{shard_router.global_path}')
+    with engine.connect() as conn:
+        existing = set(inspect(conn).get_table_names())
+        tables = [name for name in SHARDED_TABLES if name in metadata.tables and name in existing
+                  and conn.execute(text(f'SELECT EXISTS (SELECT 1 FROM {name})')).scalar()]
+    engine.dispose()
+    return tables
@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from flask import Response, request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Vite names build output like assets/index-4f9a1c2e.js; files outside assets/ (public/ copies
+# such as apple-touch-icon.png) keep their names across builds and must be revalidated
+HASHED_NAME = re.compile(r'^assets/(?:.+/)?[^/]+-[0-9A-Za-z_-]{8}\.\w+$')
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml',
+                      'application/xml', 'application/manifest+json')
+MIN_COMPRESS_SIZE = 1024
+MAX_MEMORY_SIZE = 2 * 1024 * 1024
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+
+class StaticAsset:
+    def __init__(self, path, relpath):
+        self.path = path
+        self.mimetype = mimetypes.guess_type(relpath)[0] or 'application/octet-stream'
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.size = len(data)
+        self.etag = hashlib.sha256(data).hexdigest()[:20]
+        self.cache_control = IMMUTABLE_CACHE if HASHED_NAME.search(relpath) else REVALIDATE_CACHE
+        self.data = data if self.size <= MAX_MEMORY_SIZE else None
+        self.variants = self._load_variants(path, data)
+
+    def _load_variants(self, path, data):
+        """Compressed bodies keyed by Content-Encoding, from build output or made here once"""
+        variants = {}
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if os.path.isfile(path + suffix):
+                with open(path + suffix, 'rb') as f:
+                    variants[encoding] = f.read()
+
+        if self.size >= MIN_COMPRESS_SIZE and self.size <= MAX_MEMORY_SIZE and self.mimetype.startswith(COMPRESSIBLE_TYPES):
+            if 'gzip' not in variants:
+                variants['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+            if 'br' not in variants and brotli is not None:
+                variants['br'] = brotli.compress(data, quality=11)
+
+        # Only keep variants that actually save bytes
+        return {encoding: body for encoding, body in variants.items() if len(body) < self.size}
+
+
+class StaticManifest:
+    """Index of the static folder built once at startup, so requests never touch the filesystem"""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.assets = {}
+        if static_folder and os.path.isdir(static_folder):
+            for root, _, files in os.walk(static_folder):
+                for name in files:
+                    if name.endswith(('.gz', '.br')) and os.path.isfile(os.path.join(root, name[:-3])):
+                        continue
+                    path = os.path.join(root, name)
+                    relpath = os.path.relpath(path, static_folder).replace(os.sep, '/')
+                    self.assets[relpath] = StaticAsset(path, relpath)
+        self.index = self.assets.get('index.html')
+
+    def lookup(self, path):
+        """The asset for a request path, falling back to index.html for SPA routes"""
+        return self.assets.get(path) or self.index
+
+
+def choose_encoding(accept_encoding, available):
+    """The preferred of the available encodings (brotli first) that an Accept-Encoding header allows, or None"""
+    if not available or not accept_encoding:
+        return None
+    offered = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    for encoding in ('br', 'gzip'):
+        if encoding in available and offered.get(encoding, offered.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+def serve_asset(asset):
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''), asset.variants)
+    # Each encoding is a separate representation and needs its own strong ETag
+    etag = f'{asset.etag}-{encoding}' if encoding else asset.etag
+    headers = {
+        'ETag': f'"{etag}"',
+        'Cache-Control': asset.cache_control,
+        'Vary': 'Accept-Encoding'
+    }
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        return Response(asset.variants[encoding], mimetype=asset.mimetype, headers=headers)
+    if asset.data is not None:
+        return Response(asset.data, mimetype=asset.mimetype, headers=headers)
+
+    response = send_file(asset.path, mimetype=asset.mimetype, conditional=False, etag=False)
+    response.headers.update(headers)
+    return response
@@ -0,0 +1,181 @@
+import bisect
+import heapq
+import json
+import threading
+import time
+from src.models.user import db, User, ServiceProvider
+from src.sharding import fan_out
+
+MAX_SUGGESTIONS = 20
+# Top suggestions are cached per prefix, like the top-k lists on the nodes of a trie
+MAX_CACHED_PREFIXES = 50000
+# Incremental updates only reach the worker that made the change; others catch up on rebuild
+REBUILD_INTERVAL = 300
+
+_KIND_ORDER = {'name': 0, 'skill': 1, 'location': 2}
+
+
+def normalize(text):
+    return ' '.join(text.casefold().split()) if text else ''
+
+
+def _parse_skills(skills):
+    try:
+        parsed = json.loads(skills) if skills else []
+    except ValueError:
+        return []
+    return [s for s in parsed if isinstance(s, str)] if isinstance(parsed, list) else []
+
+
+def _terms(kind, text):
+    """Index keys for a phrase: the whole phrase and each trailing run of words,
+    so "Ram Bahadur Thapa" is found by "ram", "bahadur" and "thapa"."""
+    words = normalize(text).split(' ')
+    return [(' '.join(words[i:]), kind, text) for i in range(len(words)) if words[i]]
+
+
+class _Snapshot:
+    def __init__(self, keys, providers, top=None):
+        self.keys = keys            # sorted (term, user_id, kind, text)
+        self.providers = providers  # user_id -> (entry dict, its keys)
+        self.top = top or {}        # prefix -> its MAX_SUGGESTIONS best results
+
+
+class PrefixIndex:
+    """Sorted-array prefix index over active providers' names, skills and locations.
+
+    Readers work on a snapshot that writers never modify: an update builds a
+    new one and swaps it in, so lookups never take a lock.
+    """
+
+    def __init__(self, rebuild_interval=REBUILD_INTERVAL):
+        self.rebuild_interval = rebuild_interval
+        self._snapshot = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    def _load(self, user_ids=None):
+        providers = {}
+        for part in fan_out(lambda: self._load_shard(user_ids)):
+            providers.update(part)
+        return providers
+
+    def _load_shard(self, user_ids):
+        query = db.session.query(
+            ServiceProvider.user_id, ServiceProvider.id, ServiceProvider.skills,
+            ServiceProvider.rating, ServiceProvider.total_reviews,
+            User.full_name, User.location
+        ).join(User, ServiceProvider.user_id == User.id).filter(User.is_active == True)
+        if user_ids is not None:
+            query = query.filter(ServiceProvider.user_id.in_(user_ids))
+
+        providers = {}
+        for user_id, provider_id, skills, rating, total_reviews, full_name, location in query:
+            entry = {
+                'provider_id': provider_id,
+                'full_name': full_name,
+                'location': location,
+                'rating': rating or 0.0,
+                'total_reviews': total_reviews or 0
+            }
+            keys = [(term, user_id, kind, text)
+                    for kind, values in (('name', [full_name]), ('skill', _parse_skills(skills)), ('location', [location]))
+                    for value in values if value
+                    for term, kind, text in _terms(kind, value)]
+            providers[user_id] = (entry, tuple(sorted(set(keys))))
+        return providers
+
+    def rebuild(self):
+        providers = self._load()
+        keys = sorted(key for _, entry_keys in providers.values() for key in entry_keys)
+        with self._lock:
+            self._snapshot = _Snapshot(keys, providers)
+            self._built_at = time.monotonic()
+
+    def update(self, user_ids):
+        """Re-read the given providers (by user id) and patch them into the index"""
+        if self._snapshot is None:
+            return
+        user_ids = set(user_ids)
+        fresh = self._load(user_ids)
+        with self._lock:
+            current = self._snapshot
+            providers = dict(current.providers)
+            stale = {key for user_id in user_ids if user_id in providers for key in providers.pop(user_id)[1]}
+            keys = [key for key in current.keys if key not in stale] if stale else list(current.keys)
+            for user_id, (entry, entry_keys) in fresh.items():
+                providers[user_id] = (entry, entry_keys)
+                for key in entry_keys:
+                    bisect.insort(keys, key)
+
+            # Only prefixes of the changed providers' old or new terms can have different results
+            top = dict(current.top)
+            touched = {key[0] for key in stale} | {key[0] for _, entry_keys in fresh.values() for key in entry_keys}
+            for term in touched:
+                for end in range(1, len(term) + 1):
+                    top.pop(term[:end], None)
+            self._snapshot = _Snapshot(keys, providers, top)
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def ensure_fresh(self):
+        if self._snapshot is not None and time.monotonic() - self._built_at <= self.rebuild_interval:
+            return
+        # One request rebuilds; while it does, the others keep answering from the old snapshot
+        if not self._rebuild_lock.acquire(blocking=self._snapshot is None):
+            return
+        try:
+            if self._snapshot is None or time.monotonic() - self._built_at > self.rebuild_interval:
+                self.rebuild()
+        finally:
+            self._rebuild_lock.release()
+
+    def search(self, prefix, limit=10):
+        """Providers with a name, skill or location starting with prefix, best rated first"""
+        term = normalize(prefix)
+        limit = min(limit, MAX_SUGGESTIONS)
+        if not term or limit <= 0:
+            return []
+        self.ensure_fresh()
+        snapshot = self._snapshot
+
+        cached = snapshot.top.get(term)
+        if cached is None:
+            cached = self._top(snapshot, term, MAX_SUGGESTIONS)
+            if len(snapshot.top) < MAX_CACHED_PREFIXES:
+                snapshot.top[term] = cached
+        return cached[:limit]
+
+    @staticmethod
+    def _top(snapshot, term, limit):
+        keys = snapshot.keys
+        lo = bisect.bisect_left(keys, (term,))
+        hi = bisect.bisect_left(keys, (term + '\uffff',), lo)
+
+        # Best match per provider: a name hit beats a skill hit beats a location hit
+        best = {}
+        for _, user_id, kind, text in keys[lo:hi]:
+            current = best.get(user_id)
+            if current is None or _KIND_ORDER[kind] < _KIND_ORDER[current[0]]:
+                best[user_id] = (kind, text)
+
+        providers = snapshot.providers
+        ranked = heapq.nsmallest(limit, best, key=lambda user_id: (
+            -providers[user_id][0]['rating'], -providers[user_id][0]['total_reviews'], providers[user_id][0]['provider_id']
+        ))
+        return [dict(providers[user_id][0], matched={'type': best[user_id][0], 'text': best[user_id][1]})
+                for user_id in ranked]
+
+
+typeahead_index = PrefixIndex()
+
+
+def refresh_typeahead(user_ids):
+    """Patch committed provider changes into this worker's index; on failure fall back to a rebuild"""
+    try:
+        typeahead_index.update(user_ids)
+    except Exception as e:
+        print(f"Error updating typeahead index: {e}")
+        typeahead_index.invalidate()
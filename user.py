@@ -1,8 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
+from src.sharding import session_options
 
-db = SQLAlchemy()
+# The session routes statements to a region shard when one is selected (see src/sharding.py)
+db = SQLAlchemy(session_options=session_options())
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -15,6 +17,7 @@ class User(db.Model):
     location = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    home_shard = db.Column(db.String(20), nullable=True)  # region shard of a provider's data, set at registration
     
     # Relationships
     service_provider_profile = db.relationship('ServiceProvider', backref='user', uselist=False)
@@ -46,6 +49,14 @@ class User(db.Model):
         }
 
 class ServiceProvider(db.Model):
+    __table_args__ = (
+        db.Index('ix_service_provider_user_id', 'user_id'),
+        db.Index('ix_service_provider_rating', 'rating'),
+        db.Index('ix_service_provider_hourly_rate', 'hourly_rate'),
+        # Never reuse ids; each region shard allocates them from its own block
+        {'sqlite_autoincrement': True}
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     skills = db.Column(db.Text, nullable=False)  # JSON string of skills array
@@ -57,6 +68,7 @@ class ServiceProvider(db.Model):
     total_reviews = db.Column(db.Integer, default=0)
     is_verified = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    rank_score = db.Column(db.Float, default=0.0, index=True)  # see src/models/ranking.py
 
     def to_dict(self):
         return {
@@ -91,6 +103,15 @@ class ServiceCategory(db.Model):
         }
 
 class Booking(db.Model):
+    # Match the bookings list (one party's bookings, newest first) and the rollup/analytics scans
+    __table_args__ = (
+        db.Index('ix_booking_customer_created', 'customer_id', 'created_at'),
+        db.Index('ix_booking_provider_created', 'provider_id', 'created_at'),
+        db.Index('ix_booking_status_created', 'status', 'created_at'),
+        db.Index('ix_booking_updated_at', 'updated_at'),
+        {'sqlite_autoincrement': True}
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     provider_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -128,7 +149,46 @@ class Booking(db.Model):
             'service_category': self.service_category.to_dict() if self.service_category else None
         }
 
+class ArchivedBooking(db.Model):
+    """Completed and cancelled bookings moved out of the hot booking table (see src/models/archive.py)"""
+    __tablename__ = 'booking_archive'
+    __table_args__ = (
+        db.Index('ix_booking_archive_customer_created', 'customer_id', 'created_at'),
+        db.Index('ix_booking_archive_provider_created', 'provider_id', 'created_at'),
+    )
+
+    # Same columns as Booking; ids are kept so reviews still point at their booking
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    provider_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    service_category_id = db.Column(db.Integer, db.ForeignKey('service_category.id'), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    scheduled_date = db.Column(db.DateTime, nullable=False)
+    estimated_hours = db.Column(db.Float, nullable=True)
+    total_amount = db.Column(db.Float, nullable=True)
+    status = db.Column(db.String(20), nullable=False)
+    customer_location = db.Column(db.String(200), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    customer = db.relationship('User', foreign_keys=[customer_id])
+    provider = db.relationship('User', foreign_keys=[provider_id])
+    service_category = db.relationship('ServiceCategory')
+
+    # Archived bookings serialize exactly like live ones
+    to_dict = Booking.to_dict
+
 class Review(db.Model):
+    __table_args__ = (
+        db.Index('ix_review_provider_created', 'provider_id', 'created_at'),
+        db.Index('ix_review_customer_created', 'customer_id', 'created_at'),
+        db.Index('ix_review_booking_id', 'booking_id'),
+        {'sqlite_autoincrement': True}
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     provider_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -139,6 +199,9 @@ class Review(db.Model):
 
     # Relationships
     booking = db.relationship('Booking', backref='review')
+    archived_booking = db.relationship(
+        'ArchivedBooking', primaryjoin='foreign(Review.booking_id) == ArchivedBooking.id', viewonly=True, uselist=False
+    )
 
     def to_dict(self):
         return {
@@ -150,5 +213,7 @@ class Review(db.Model):
             'comment': self.comment,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'customer': self.reviewer.to_dict() if self.reviewer else None,
-            'booking': self.booking.to_dict() if self.booking else None
+            'booking': self.booking.to_dict() if self.booking else (
+                self.archived_booking.to_dict() if self.archived_booking else None
+            )
         }